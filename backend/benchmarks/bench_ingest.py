@@ -0,0 +1,194 @@
+"""
+Ingestion benchmark suite.
+
+    python -m benchmarks.bench_ingest --images 10000 --output bench.json
+    python -m benchmarks.bench_ingest --images 10000 --compare bench.json
+
+Each benchmark runs in a freshly spawned interpreter so the reported peak RSS
+belongs to that benchmark alone. Results are written as JSON; ``--compare``
+fails (exit code 1) when throughput drops by more than ``--tolerance``.
+"""
+
+import argparse, asyncio, json, multiprocessing, os, platform, resource, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+
+from benchmarks.fake_mongo import install
+from benchmarks.generator import generate_zip
+
+BENCHMARKS = ("extract", "validate", "parse", "upload")
+
+
+def _extract(zip_path: str, workdir: str) -> str:
+    from utils.file_processing import extract_zip_async
+    return asyncio.run(extract_zip_async(zip_path, workdir))
+
+
+def _bench_extract(zip_path, workdir):
+    start = time.perf_counter()
+    _extract(zip_path, workdir)
+    return time.perf_counter() - start
+
+
+def _bench_validate(zip_path, workdir):
+    from utils.yolo import validate_yolo_structure
+    folder = _extract(zip_path, workdir)
+    start = time.perf_counter()
+    validate_yolo_structure(folder)
+    return time.perf_counter() - start
+
+
+def _bench_parse(zip_path, workdir):
+    from utils.yolo import parse_labels
+    folder = _extract(zip_path, workdir)
+    start = time.perf_counter()
+    parse_labels(folder, "bench")
+    return time.perf_counter() - start
+
+
+def _bench_upload(zip_path, workdir):
+    from fastapi import UploadFile
+    from dataset import services
+
+    install(services)
+
+    async def run():
+        with open(zip_path, "rb") as fh:
+            return await services.handle_upload(UploadFile(file=fh, filename="bench.zip"))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def _child(name, zip_path, backend_dir, conn):
+    sys.path.insert(0, backend_dir)
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # parse_labels and handle_upload write under ./datasets
+    try:
+        seconds = globals()[f"_bench_{name}"](zip_path, workdir)
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        conn.send({"seconds": seconds, "peak_rss_mb": round(peak_kb / 1024, 1)})
+    except Exception as e:
+        conn.send({"error": repr(e)})
+    finally:
+        from utils.pool import shutdown_process_pool
+        shutdown_process_pool()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        conn.close()
+
+
+def run_benchmark(name: str, zip_path: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = ctx.Process(target=_child, args=(name, zip_path, backend_dir, child))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    previous = {r["benchmark"]: r for r in baseline["results"] if "images_per_s" in r}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["benchmark"])
+        if before is None or "images_per_s" not in result:
+            continue
+        ratio = result["images_per_s"] / before["images_per_s"]
+        result["vs_baseline"] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            regressions.append(result["benchmark"])
+    return regressions
+
+
+def _size(value: str):
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=1000)
+    parser.add_argument("--min-boxes", type=int, default=0)
+    parser.add_argument("--max-boxes", type=int, default=8)
+    parser.add_argument("--image-size", type=_size, action="append", help="WxH, repeatable (default 640x480)")
+    parser.add_argument("--splits", type=float, nargs=3, default=(0.8, 0.15, 0.05), metavar=("TRAIN", "VALID", "TEST"))
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS))
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed throughput drop vs baseline")
+    args = parser.parse_args(argv)
+
+    selected = [b.strip() for b in args.benchmarks.split(",") if b.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    config = {
+        "images": args.images,
+        "boxes_per_image": (args.min_boxes, args.max_boxes),
+        "image_sizes": args.image_size or [(640, 480)],
+        "split_ratios": tuple(args.splits),
+        "malformed_rate": args.malformed_rate,
+        "seed": args.seed,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-input-") as tmp:
+        zip_path = os.path.join(tmp, "bench.zip")
+        start = time.perf_counter()
+        summary = generate_zip(zip_path, **config)
+        archive_bytes = os.path.getsize(zip_path)
+        print(f"generated {args.images} images ({archive_bytes / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+        results = []
+        for name in selected:
+            result = {"benchmark": name, **run_benchmark(name, zip_path)}
+            if "seconds" in result:
+                result["images_per_s"] = round(args.images / result["seconds"], 1)
+                result["mb_per_s"] = round(archive_bytes / 1e6 / result["seconds"], 2)
+                result["seconds"] = round(result["seconds"], 4)
+            print(json.dumps(result))
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": config,
+        "dataset": {**summary, "archive_bytes": archive_bytes},
+        "results": results,
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(report, json.load(fh), args.tolerance)
+        for name in regressions:
+            print(f"REGRESSION: {name} is more than {args.tolerance:.0%} slower than baseline")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,503 @@
+"""
+In-memory stand-in for the subset of the Motor collection API used by the services.
+
+Good enough to drive the real routers and services without a MongoDB server:
+documents are deep-copied in and out, unique indexes are enforced, and the
+common query/update operators are supported. Not a general Mongo emulator.
+"""
+
+import asyncio, copy, re
+from collections.abc import Hashable
+
+import bson
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def _get(doc: Dict, path: str):
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set(doc: Dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc: Dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _compare(op: str, value, arg) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {"$gt": value > arg, "$gte": value >= arg, "$lt": value < arg, "$lte": value <= arg}[op]
+    except TypeError:
+        return False
+
+
+def _match_value(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            if op == "$in":
+                if not any(_equals(value, a) for a in arg):
+                    return False
+            elif op == "$nin":
+                if any(_equals(value, a) for a in arg):
+                    return False
+            elif op == "$ne":
+                if _equals(value, arg):
+                    return False
+            elif op == "$exists":
+                if (value is not _MISSING) != bool(arg):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if not _compare(op, value, arg):
+                    return False
+            elif op == "$regex":
+                pattern = arg if isinstance(arg, re.Pattern) else re.compile(arg, _regex_flags(condition.get("$options", "")))
+                if not isinstance(value, str) or not pattern.search(value):
+                    return False
+            elif op == "$options":
+                continue
+            elif op == "$size":
+                if not isinstance(value, list) or len(value) != arg:
+                    return False
+            else:
+                raise NotImplementedError(f"query operator {op}")
+        return True
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and bool(condition.search(value))
+    return _equals(value, condition)
+
+
+def _regex_flags(options: str) -> int:
+    return re.IGNORECASE if "i" in options else 0
+
+
+def _equals(value, expected) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def matches(doc: Dict, query: Optional[Dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif not _match_value(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _copy(doc: Dict) -> Dict:
+    # A BSON round trip is both faster than deepcopy and closer to what a real driver pays per document.
+    return bson.decode(bson.encode(doc))
+
+
+def _project(doc: Dict, projection) -> Dict:
+    if not projection:
+        return _copy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {}
+        for field in include:
+            value = _get(doc, field)
+            if value is not _MISSING:
+                _set(out, field, value)
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return _copy(out)
+    excluded = {field for field, flag in projection.items() if not flag}
+    out = _copy({k: v for k, v in doc.items() if k not in excluded})
+    for field in excluded:
+        if "." in field:
+            _unset(out, field)
+    return out
+
+
+def _sort_key(value):
+    # Mongo orders missing/null before numbers before strings; keep types apart so sorting never raises.
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (3, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (4, str(value))
+
+
+def _normalize_sort(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def _sorted(docs: List[Dict], spec: List[Tuple[str, int]]) -> List[Dict]:
+    for field, direction in reversed(spec):
+        docs = sorted(docs, key=lambda d: _sort_key(_get(d, field)), reverse=direction < 0)
+    return docs
+
+
+def _apply_update(doc: Dict, update: Dict, inserting: bool = False):
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                _set(doc, path, copy.deepcopy(value))
+        elif op == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    _set(doc, path, copy.deepcopy(value))
+        elif op == "$unset":
+            for path in fields:
+                _unset(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get(doc, path)
+                _set(doc, path, (0 if current is _MISSING else current) + amount)
+        elif op == "$max":
+            for path, value in fields.items():
+                current = _get(doc, path)
+                if current is _MISSING or value > current:
+                    _set(doc, path, value)
+        elif op == "$push":
+            for path, value in fields.items():
+                current = _get(doc, path)
+                items = [] if current is _MISSING else current
+                if isinstance(value, dict) and "$each" in value:
+                    items.extend(copy.deepcopy(value["$each"]))
+                else:
+                    items.append(copy.deepcopy(value))
+                _set(doc, path, items)
+        elif op.startswith("$"):
+            raise NotImplementedError(f"update operator {op}")
+        else:
+            raise ValueError("replacement documents are not supported, use update operators")
+
+
+class InMemoryCursor:
+    def __init__(self, collection: "InMemoryCollection", query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[Dict]] = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    async def _materialize(self) -> List[Dict]:
+        if self._results is None:
+            docs = self._collection._select(self._query, self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[: self._limit]
+            # Motor decodes documents off the event loop; do the same.
+            self._results = await asyncio.to_thread(lambda: [_project(d, self._projection) for d in docs])
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        docs = await self._materialize()
+        return list(docs if length is None else docs[:length])
+
+    def __aiter__(self):
+        self._iter = None
+        return self
+
+    async def __anext__(self):
+        if self._iter is None:
+            self._iter = iter(await self._materialize())
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _index_values(value) -> List:
+    if value is _MISSING:
+        return [None]
+    values = value if isinstance(value, list) else [value]
+    return [v for v in values if isinstance(v, Hashable)]
+
+
+class InMemoryCollection:
+    """
+    Stored documents are never mutated in place (updates swap in a new dict), so
+    reads can copy them off the event loop. Every created index's leading field
+    gets a hash index used for equality and ``$in`` lookups, and sorted query
+    results are cached until the next write, which keeps repeated paging cheap.
+    """
+
+    QUERY_CACHE_SIZE = 256
+
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: Dict[Any, Dict] = {}
+        self._unique: Dict[Tuple[str, ...], Dict[Tuple, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, set]] = {}
+        self._query_cache: Dict[str, List[Dict]] = {}
+
+    # Indexes -------------------------------------------------------------
+
+    async def create_index(self, keys, unique: bool = False, **kwargs):
+        fields = tuple(field for field, _ in _normalize_sort(keys, 1))
+        if fields[0] not in self._indexes:
+            index: Dict[Any, set] = {}
+            for _id, doc in self._docs.items():
+                for value in _index_values(_get(doc, fields[0])):
+                    index.setdefault(value, set()).add(_id)
+            self._indexes[fields[0]] = index
+        if unique and fields not in self._unique:
+            entries = {}
+            for _id, doc in self._docs.items():
+                key = tuple(_get(doc, f) for f in fields)
+                if key in entries:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+                entries[key] = _id
+            self._unique[fields] = entries
+        return kwargs.get("name") or "_".join(f"{f}_1" for f in fields)
+
+    async def create_indexes(self, indexes: Iterable):
+        return [
+            await self.create_index(list(i.document["key"].items()), unique=i.document.get("unique", False))
+            for i in indexes
+        ]
+
+    def _store(self, doc: Dict, previous: Optional[Dict] = None):
+        _id = doc["_id"]
+        for fields, entries in self._unique.items():
+            key = tuple(_get(doc, f) for f in fields)
+            if entries.get(key, _id) != _id:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+        if previous is not None:
+            self._forget(previous)
+        for fields, entries in self._unique.items():
+            entries[tuple(_get(doc, f) for f in fields)] = _id
+        for field, index in self._indexes.items():
+            for value in _index_values(_get(doc, field)):
+                index.setdefault(value, set()).add(_id)
+        self._docs[_id] = doc
+        self._query_cache.clear()
+
+    def _forget(self, doc: Dict):
+        _id = doc["_id"]
+        for fields, entries in self._unique.items():
+            entries.pop(tuple(_get(doc, f) for f in fields), None)
+        for field, index in self._indexes.items():
+            for value in _index_values(_get(doc, field)):
+                ids = index.get(value)
+                if ids:
+                    ids.discard(_id)
+        self._docs.pop(_id, None)
+        self._query_cache.clear()
+
+    def _candidates(self, query: Optional[Dict]) -> Iterable[Dict]:
+        for field, condition in (query or {}).items():
+            index = self._indexes.get(field)
+            if index is None and field != "_id":
+                continue
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = condition["$in"]
+            elif not isinstance(condition, (dict, list, re.Pattern)):
+                values = [condition]
+            else:
+                continue
+            if field == "_id":
+                return [self._docs[v] for v in values if v in self._docs]
+            ids = set()
+            for value in values:
+                ids.update(index.get(value, ()) if isinstance(value, Hashable) else ())
+            return [self._docs[i] for i in ids]
+        return list(self._docs.values())
+
+    def _select(self, query, sort) -> List[Dict]:
+        key = repr((query, sort))
+        cached = self._query_cache.get(key)
+        if cached is None:
+            cached = _sorted([d for d in self._candidates(query) if matches(d, query)], _normalize_sort(sort))
+            if len(self._query_cache) >= self.QUERY_CACHE_SIZE:
+                self._query_cache.clear()
+            self._query_cache[key] = cached
+        return cached
+
+    def _first(self, query, sort=None) -> Optional[Dict]:
+        if sort:
+            docs = self._select(query, sort)
+            return docs[0] if docs else None
+        return next((d for d in self._candidates(query) if matches(d, query)), None)
+
+    # Writes --------------------------------------------------------------
+
+    async def insert_one(self, document: Dict):
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._store(_copy(document))
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: Iterable[Dict], ordered: bool = True):
+        ids = []
+        for document in documents:
+            ids.append((await self.insert_one(document)).inserted_id)
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    def _upsert_doc(self, query: Dict) -> Dict:
+        doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.setdefault("_id", ObjectId())
+        return doc
+
+    def _replace(self, doc: Dict, update: Dict) -> Dict:
+        updated = _copy(doc)
+        _apply_update(updated, update)
+        self._store(updated, previous=doc)
+        return updated
+
+    async def update_one(self, query, update, upsert: bool = False):
+        doc = self._first(query)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            doc = self._upsert_doc(query)
+            _apply_update(doc, update, inserting=True)
+            await self.insert_one(doc)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        self._replace(doc, update)
+        return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+
+    async def bulk_write(self, requests, ordered: bool = True):
+        matched = upserted = 0
+        for request in requests:
+            if not isinstance(request, UpdateOne):
+                raise NotImplementedError(f"bulk_write {type(request).__name__}")
+            result = await self.update_one(request._filter, request._doc, upsert=request._upsert or False)
+            matched += result.matched_count
+            upserted += result.upserted_id is not None
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted)
+
+    async def update_many(self, query, update):
+        docs = [d for d in self._candidates(query) if matches(d, query)]
+        for doc in docs:
+            self._replace(doc, update)
+        return SimpleNamespace(matched_count=len(docs), modified_count=len(docs))
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        doc = self._first(query, sort)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self._upsert_doc(query)
+            _apply_update(doc, update, inserting=True)
+            await self.insert_one(doc)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        updated = self._replace(doc, update)
+        return _project(updated if return_document == ReturnDocument.AFTER else doc, projection)
+
+    async def delete_one(self, query):
+        doc = self._first(query)
+        if doc is not None:
+            self._forget(doc)
+        return SimpleNamespace(deleted_count=int(doc is not None))
+
+    async def delete_many(self, query):
+        docs = [d for d in self._candidates(query) if matches(d, query)]
+        for doc in docs:
+            self._forget(doc)
+        return SimpleNamespace(deleted_count=len(docs))
+
+    # Reads ---------------------------------------------------------------
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        doc = self._first(query, sort)
+        if doc is None:
+            return None
+        return await asyncio.to_thread(_project, doc, projection)
+
+    def find(self, query=None, projection=None):
+        return InMemoryCursor(self, query, projection)
+
+    async def count_documents(self, query=None):
+        if not query:
+            return len(self._docs)
+        return sum(1 for d in self._candidates(query) if matches(d, query))
+
+    async def distinct(self, key, query=None):
+        seen = []
+        for d in self._candidates(query):
+            value = _get(d, key)
+            if matches(d, query) and value is not _MISSING and value not in seen:
+                seen.append(value)
+        return seen
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+
+def install(module, database: Optional[InMemoryDatabase] = None) -> InMemoryDatabase:
+    """Swap every Motor collection held by ``module`` (e.g. ``dataset.services``) for an in-memory one."""
+    database = database or InMemoryDatabase()
+    for attr, value in list(vars(module).items()):
+        if isinstance(value, AsyncIOMotorCollection):
+            setattr(module, attr, database[value.name])
+    return database
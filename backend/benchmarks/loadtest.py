@@ -0,0 +1,296 @@
+"""
+In-process load test for the read endpoints.
+
+    python -m benchmarks.loadtest --datasets 3 --images 100000 --concurrency 64 --duration 15
+
+Drives the ASGI app through httpx at a fixed concurrency against the in-memory
+Mongo stand-in, after seeding synthetic datasets. Reports requests/s and
+p50/p95/p99 latency per endpoint plus event-loop lag, optionally as JSON.
+Client and server share one event loop, so the numbers measure server-side CPU
+cost per request rather than network behaviour.
+
+    python -m benchmarks.loadtest --url http://localhost:8000 --datasets 3 --images 20000
+
+With ``--url`` the same mix is driven over the network against a running
+server instead, after uploading generated archives through ``/datasets/upload``
+(datasets left by an earlier run are reused). Compare runs with different
+``WEB_CONCURRENCY`` or replica counts to measure scale-out; event-loop lag is
+then the client's own.
+"""
+
+import argparse, asyncio, io, json, os, random, sys, tempfile, time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+from PIL import Image
+
+from benchmarks.fake_mongo import install
+from benchmarks.generator import generate_zip
+
+ENDPOINTS = ("list", "images", "image")
+PAGE_SIZE = 20
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0) * 1000, 3),
+    }
+
+
+def _jpeg(rng: random.Random) -> bytes:
+    buffer = io.BytesIO()
+    Image.frombytes("L", (320, 240), rng.randbytes(320 * 240)).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+async def seed_dataset(db, name: str, images: int, image_files: int, rng: random.Random) -> List[str]:
+    """Insert one dataset shaped like the ingest output and write the first ``image_files`` images to disk."""
+    from dataset.services import encode_pages
+
+    names = [f"img_{i:07d}.jpg" for i in range(images)]
+    records = [
+        {
+            "dataset": name,
+            "image_name": image,
+            "split": "train",
+            "labels": [
+                {"class": str(rng.randrange(80)), "bbox": [f"{rng.random():.6f}" for _ in range(4)]}
+                for _ in range(rng.randint(0, 6))
+            ],
+            "width": None,
+            "height": None,
+            "phash": None,
+        }
+        for image in names
+    ]
+    for offset in range(0, len(records), 1000):
+        await db.images.insert_many(records[offset:offset + 1000])
+    pages = encode_pages(name, records)
+    for offset in range(0, len(pages), 1000):
+        await db.pages.insert_many(pages[offset:offset + 1000])
+    await db.datasets.insert_one({
+        "name": name,
+        "status": "completed",
+        "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+        "total_images": images,
+    })
+
+    output_dir = os.path.join("datasets", "images", name)
+    os.makedirs(output_dir, exist_ok=True)
+    payload = _jpeg(rng)
+    for image in names[:image_files]:
+        with open(os.path.join(output_dir, image), "wb") as fh:
+            fh.write(payload)
+    return names[:image_files]
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up, i.e. how long the loop was blocked."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return {
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 3),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 3),
+            "max_ms": round(max(self.samples, default=0) * 1000, 3),
+        }
+
+
+def _request(endpoint: str, rng: random.Random, datasets: Dict[str, Dict]) -> str:
+    name = rng.choice(list(datasets))
+    if endpoint == "list":
+        return "/datasets/"
+    if endpoint == "images":
+        pages = max(1, -(-datasets[name]["images"] // PAGE_SIZE))
+        return f"/datasets/{name}/images?page={rng.randint(1, pages)}"
+    return f"/datasets/{name}/image/{rng.choice(datasets[name]['files'])}"
+
+
+async def drive(client: httpx.AsyncClient, datasets, mix: Dict[str, int], concurrency: int, duration: float, seed: int):
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = {endpoint: 0 for endpoint in ENDPOINTS}
+    endpoints, weights = zip(*[(e, w) for e, w in mix.items() if w > 0])
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights=weights)[0]
+            url = _request(endpoint, rng, datasets)
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies[endpoint].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[endpoint] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def _mix(value: str) -> Dict[str, int]:
+    mix = {endpoint: 0 for endpoint in ENDPOINTS}
+    for part in value.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in mix:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {endpoint!r}, expected one of {ENDPOINTS}")
+        mix[endpoint] = int(weight or 1)
+    return mix
+
+
+async def upload_dataset(client: httpx.AsyncClient, name: str, images: int, image_files: int, seed: int) -> List[str]:
+    """Upload a generated archive as ``name`` unless it is already there; return names of images to fetch."""
+    existing = await client.get(f"/datasets/{name}/images", params={"page": 1})
+    if existing.status_code == 404:
+        with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+            zip_path = os.path.join(tmp, f"{name}.zip")
+            generate_zip(zip_path, images=images, seed=seed)
+            with open(zip_path, "rb") as fh:
+                response = await client.post(
+                    "/datasets/upload", files={"file": (f"{name}.zip", fh, "application/zip")}, timeout=None
+                )
+            response.raise_for_status()
+
+    files: List[str] = []
+    for page in range(1, max(1, -(-image_files // PAGE_SIZE)) + 1):
+        response = await client.get(f"/datasets/{name}/images", params={"page": page})
+        response.raise_for_status()
+        files.extend(image["image_name"] for image in response.json()["images"])
+    return files[:image_files]
+
+
+async def _seed_local(args, rng: random.Random) -> Dict[str, Dict]:
+    from dataset import services
+
+    db = install(services)
+    await services.ensure_indexes()
+    datasets = {}
+    for i in range(args.datasets):
+        name = f"loadtest_{i}"
+        datasets[name] = {"images": args.images, "files": await seed_dataset(db, name, args.images, args.image_files, rng)}
+    return datasets
+
+
+async def _seed_remote(client: httpx.AsyncClient, args) -> Dict[str, Dict]:
+    datasets = {}
+    for i in range(args.datasets):
+        name = f"loadtest_{i}"
+        files = await upload_dataset(client, name, args.images, args.image_files, args.seed + i)
+        datasets[name] = {"images": args.images, "files": files}
+    return datasets
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+        )
+    else:
+        from main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest")
+
+    async with client:
+        start = time.perf_counter()
+        datasets = await _seed_remote(client, args) if args.url else await _seed_local(args, rng)
+        print(f"seeded {args.datasets} x {args.images} images in {time.perf_counter() - start:.1f}s")
+
+        if args.warmup:
+            await drive(client, datasets, args.mix, args.concurrency, args.warmup, args.seed)
+        monitor = LoopLagMonitor()
+        monitor.start()
+        latencies, errors, elapsed = await drive(client, datasets, args.mix, args.concurrency, args.duration, args.seed)
+        lag = await monitor.stop()
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "target": args.url or "in-process",
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 3),
+            "datasets": args.datasets,
+            "images_per_dataset": args.images,
+            "mix": args.mix,
+        },
+        "total": _summary(everything, sum(errors.values()), elapsed),
+        "endpoints": {e: _summary(latencies[e], errors[e], elapsed) for e in ENDPOINTS if latencies[e]},
+        "event_loop_lag": lag,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", type=int, default=3)
+    parser.add_argument("--images", type=int, default=10000, help="images per dataset")
+    parser.add_argument("--image-files", type=int, default=200, help="images per dataset written to disk")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--mix", type=_mix, default=_mix("list=1,images=4,image=5"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="drive a running server at this base URL instead of the in-process app")
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    cwd = os.getcwd()
+    sys.path.insert(0, cwd)
+    os.chdir(workdir)  # images are served from ./datasets/images
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+
+    print(f"{'endpoint':<8} {'req':>8} {'err':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in {**report["endpoints"], "total": report["total"]}.items():
+        print(f"{name:<8} {row['requests']:>8} {row['errors']:>6} {row['rps']:>9} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    lag = report["event_loop_lag"]
+    print(f"event loop lag: p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+# Dataset names become directory names under datasets/, so no separators and no leading dot
+DATASET_NAME_PATTERN = r"^[A-Za-z0-9_-][A-Za-z0-9._-]{0,127}$"
 
 class ImageLabel(BaseModel):
     image_name: str
@@ -10,4 +13,12 @@ class DatasetInDB(BaseModel):
     name: str
     status: str
     created_at: datetime
-    total_images: int
\ No newline at end of file
+    total_images: int
+
+class ImageBatchRequest(BaseModel):
+    image_names: List[str] = Field(..., min_length=1, max_length=5000)
+
+class DirectorySyncRequest(BaseModel):
+    path: str = Field(..., min_length=1)
+    name: Optional[str] = Field(None, pattern=DATASET_NAME_PATTERN)
+    watch: Optional[bool] = None
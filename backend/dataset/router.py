@@ -1,34 +1,284 @@
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from dataset.services import handle_upload, get_all_datasets, get_dataset_images
-from fastapi.responses import FileResponse
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Path, Query, Request, Response
+from dataset.services import (
+    handle_upload, get_all_datasets, get_dataset_images, get_images_batch, find_duplicates,
+    get_contact_sheet, upload_progress_events, get_ingest_job, export_dataset, sync_directory, get_pyramid_dir,
+    get_image_variant, query_labels, sample_dataset
+)
+from dataset.models import DirectorySyncRequest, ImageBatchRequest
+from utils.file_processing import StreamedUpload
+from utils.phash import MAX_DISTANCE
+from utils.tiles import DESCRIPTOR
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
 router = APIRouter()
 
+UPLOAD_ID_PATTERN = "^[A-Za-z0-9_-]{1,64}$"
+
+# Re-syncing a directory dataset rewrites its sheets and tiles under the same URLs, so clients
+# keep them but revalidate against the file's ETag on every use
+SHEET_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+TILE_CACHE_HEADERS = SHEET_CACHE_HEADERS
+# One image URL may answer with the original or a WebP/AVIF derivative depending on Accept
+IMAGE_VARY_HEADERS = {"Vary": "Accept"}
+
+
+def _file_etag(path: str) -> str:
+    stat = os.stat(path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    return etag in [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+
+
+def _revalidated_file(request: Request, path: str, media_type: str, headers: dict):
+    """The file, or 304 when the client's copy carries its current ETag"""
+    headers = {"ETag": _file_etag(path), **headers}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
 
 @router.post("/upload")
-async def upload_dataset(file: UploadFile = File(...)):
-    return await handle_upload(file)
+async def upload_dataset(
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    trace_sample: float = Query(0.0, ge=0.0, le=1.0),
+    trace_format: Optional[str] = Query(None, pattern="^chrome$"),
+    upload_id: Optional[str] = Query(None, pattern=UPLOAD_ID_PATTERN),
+):
+    client = request.client.host if request.client else "unknown"
+    result = await handle_upload(file, trace_sample, trace_format, upload_id, client)
+    if "job_id" in result:
+        # Queued for a worker; follow it through the progress stream or the job endpoint
+        response.status_code = 202
+    return result
+
+
+@router.post("/upload/stream")
+async def upload_dataset_stream(
+    request: Request,
+    response: Response,
+    filename: str = Query(..., pattern=r"^[^/\\]{1,255}$"),
+    trace_sample: float = Query(0.0, ge=0.0, le=1.0),
+    trace_format: Optional[str] = Query(None, pattern="^chrome$"),
+    upload_id: Optional[str] = Query(None, pattern=UPLOAD_ID_PATTERN),
+):
+    """
+    Upload an archive as the raw request body instead of a multipart form.
+
+    Multipart bodies are spooled to a temporary file before the handler runs;
+    a raw body is handed to ingestion as it arrives, so tar archives are
+    unpacked while they are still being uploaded.
+    """
+    client = request.client.host if request.client else "unknown"
+    # Admission reserves scratch space by the body size before any of it is read, so the size must be known
+    if "content-length" not in request.headers:
+        raise HTTPException(status_code=411, detail="Content-Length is required for streamed uploads")
+    size = int(request.headers["content-length"])
+    file = StreamedUpload(filename, request.stream(), size)
+    result = await handle_upload(file, trace_sample, trace_format, upload_id, client)
+    if "job_id" in result:
+        response.status_code = 202
+    return result
+
+
+@router.post("/sync")
+async def sync_dataset_directory(request: DirectorySyncRequest, response: Response):
+    """Ingest a server-side directory in place; calling it again applies only what changed"""
+    result = await sync_directory(request.path, request.name, request.watch)
+    if "job_id" in result:
+        response.status_code = 202
+    return result
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await get_ingest_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/uploads/{upload_id}/progress")
+async def stream_upload_progress(upload_id: str = Path(..., pattern=UPLOAD_ID_PATTERN)):
+    """
+    Server-Sent Events stream of an ingest's stage and counters.
+
+    Subscribe before posting the upload with the same ``upload_id`` to see it
+    from the start; the stream ends with a ``done`` or ``failed`` event.
+    """
+    return StreamingResponse(
+        upload_progress_events(upload_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/")
-async def list_datasets():
-    return await get_all_datasets()
+async def list_datasets(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    sort: str = Query("created_at", pattern="^(created_at|name|total_images)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    prefix: Optional[str] = Query(None, max_length=200),
+    status: str = Query("completed", pattern="^(completed|processing|all)$"),
+):
+    return await get_all_datasets(limit, cursor, sort, order, prefix, status)
 
 @router.get("/{dataset_name}/images")
-async def get_images(dataset_name: str, page: int = Query(1, ge=1)):
-    images = await get_dataset_images(dataset_name, page)
+async def get_images(
+    dataset_name: str,
+    page: int = Query(1, ge=1),
+    split: Optional[str] = Query(None, pattern="^(train|valid|test)$"),
+):
+    """One page of images in name order, optionally of one split, with the image count of every split"""
+    images = await get_dataset_images(dataset_name, page, split=split)
     if images is None:
         raise HTTPException(status_code=404, detail="Dataset not found")
     return images
 
 
+@router.get("/{dataset_name}/images/sheet")
+async def get_images_sheet(
+    request: Request, dataset_name: str, page: int = Query(1, ge=1), tile: int = Query(160, ge=32, le=512)
+):
+    """One JPEG holding every thumbnail of a grid page, see /images/sheet/map for tile offsets"""
+    sheet = await get_contact_sheet(dataset_name, page, tile)
+    if sheet is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return _revalidated_file(request, sheet[0], "image/jpeg", SHEET_CACHE_HEADERS)
+
+
+@router.get("/{dataset_name}/images/sheet/map")
+async def get_images_sheet_map(
+    request: Request, dataset_name: str, page: int = Query(1, ge=1), tile: int = Query(160, ge=32, le=512)
+):
+    """Offsets and image name of every tile in the contact sheet for a page"""
+    sheet = await get_contact_sheet(dataset_name, page, tile)
+    if sheet is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    # The map is written with its sheet, so the sheet's ETag versions both
+    headers = {"ETag": _file_etag(sheet[0]), **SHEET_CACHE_HEADERS}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(sheet[1], headers=headers)
+
+
+@router.post("/{dataset_name}/images/batch")
+async def get_images_by_name(dataset_name: str, request: ImageBatchRequest):
+    """Labels and metadata for an arbitrary set of images in one round trip"""
+    images = await get_images_batch(dataset_name, request.image_names)
+    if images is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return images
+
+
+@router.get("/{dataset_name}/duplicates")
+async def get_duplicates(
+    dataset_name: str,
+    max_distance: int = Query(4, ge=0, le=MAX_DISTANCE),
+    cross_split: bool = Query(False),
+):
+    """List clusters of near-identical images, optionally only those spanning several splits"""
+    duplicates = await find_duplicates(dataset_name, max_distance, cross_split)
+    if duplicates is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return duplicates
+
+
+@router.get("/{dataset_name}/labels/{aggregation}")
+async def get_label_aggregation(
+    dataset_name: str,
+    aggregation: str = Path(..., pattern="^(class_counts|boxes_per_image|bbox_area|cooccurrence)$"),
+    split: Optional[str] = Query(None, pattern="^(train|valid|test)$"),
+    group_by: Optional[str] = Query(None, pattern="^(class|split)$"),
+):
+    """Aggregate the dataset's labels from its columnar label file: class counts, boxes per image, box areas or class co-occurrence"""
+    results = await query_labels(dataset_name, aggregation, split, group_by)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return results
+
+
+@router.get("/{dataset_name}/sample")
+async def get_sample(
+    dataset_name: str,
+    n: Optional[int] = Query(None, ge=1, le=100000),
+    per_class: Optional[int] = Query(None, ge=1, le=100000),
+    seed: int = Query(0),
+    split: Optional[str] = Query(None, pattern="^(train|valid|test)$"),
+    format: str = Query("json", pattern="^(json|coco|voc)$"),
+):
+    """Draw a seeded sample: n random images, or per_class images of every class in every split; as JSON or a streamed COCO/VOC export"""
+    if (n is None) == (per_class is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of n and per_class")
+    sample = await sample_dataset(dataset_name, seed, n, per_class, split, format)
+    if sample is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    if format == "json":
+        return sample
+    chunks, media_type, filename = sample
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/{dataset_name}/export")
+async def export_labels(
+    dataset_name: str,
+    format: str = Query("coco", pattern="^(coco|voc)$"),
+    split: Optional[str] = Query(None, pattern="^(train|valid|test)$"),
+):
+    """Download the dataset's labels, or one split's, as COCO JSON or a Pascal VOC annotation archive, streamed as generated"""
+    export = await export_dataset(dataset_name, format, split)
+    if export is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    chunks, media_type, filename = export
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/{dataset_name}/image/{image_name}")
-async def get_image_file(dataset_name: str, image_name: str):
-    """Serve individual image files from the images directory structure"""
+async def get_image_file(dataset_name: str, image_name: str, request: Request):
+    """Serve individual image files, as WebP or AVIF when the client accepts it and that is smaller"""
     # The main path where images are stored after processing
     main_path = f"datasets/images/{dataset_name}/{image_name}"
 
     if os.path.exists(main_path):
-        return FileResponse(main_path)
+        variant = await get_image_variant(dataset_name, image_name, request.headers.get("accept"))
+        if variant is None:
+            return FileResponse(main_path, headers=IMAGE_VARY_HEADERS)
+        path, media_type, etag = variant
+        headers = {"ETag": etag, **IMAGE_VARY_HEADERS}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    raise HTTPException(status_code=404, detail="Image not found")
+
+
+@router.get("/{dataset_name}/image/{image_name}/tiles")
+async def get_image_pyramid(request: Request, dataset_name: str, image_name: str):
+    """Descriptor of an image's tile pyramid (size, tile size, overlap, levels); 404 for images without one"""
+    pyramid = await get_pyramid_dir(dataset_name, image_name)
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail="Image has no tile pyramid")
+    return _revalidated_file(request, os.path.join(pyramid, DESCRIPTOR), "application/json", TILE_CACHE_HEADERS)
+
 
-    raise HTTPException(status_code=404, detail="Image not found")
\ No newline at end of file
+@router.get("/{dataset_name}/image/{image_name}/tiles/{level}/{col}_{row}.jpg")
+async def get_image_tile(request: Request, dataset_name: str, image_name: str, level: int, col: int, row: int):
+    """One tile of an image's pyramid, DeepZoom numbering: level 0 is 1x1, the last level is full size"""
+    pyramid = await get_pyramid_dir(dataset_name, image_name)
+    tile_path = pyramid and os.path.join(pyramid, str(level), f"{col}_{row}.jpg")
+    if not tile_path or not os.path.exists(tile_path):
+        raise HTTPException(status_code=404, detail="Tile not found")
+    return _revalidated_file(request, tile_path, "image/jpeg", TILE_CACHE_HEADERS)
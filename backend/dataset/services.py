@@ -1,86 +1,1777 @@
-import os, shutil, zipfile, json, aiofiles
-from utils.yolo import validate_yolo_structure, parse_labels
+import os, re, shutil, zipfile, json, aiofiles, asyncio, base64, binascii, hashlib, logging
+import bson
+import ijson
+from bson.errors import BSONError
+from utils.yolo import SPLITS, has_yolo_structure, validate_yolo_structure, parse_labels, unique_image_name
+from utils.coco import (
+    COCO_BATCH_SIZE, batched, find_coco_annotations, iter_annotations, iter_images, read_categories,
+    resolve_image, search_dirs, split_of, to_yolo_label
+)
 from utils.file_processing import extract_zip_async
-from dataset.models import DatasetInDB
+from utils.tar_stream import ChunkPipe, archive_kind, archive_stem, read_tar
+from utils.path_index import (
+    diff_index, image_path, index_path, link_images, load_index, read_labels, save_index, scan_yolo_dir, unlink_images
+)
+from utils.phash import HashIndex, fingerprint_files, format_hash, parse_hash
+from utils.metrics import INGEST_BYTES, INGEST_IMAGES, INGEST_JOBS, INGEST_REJECTED, UPLOADS_IN_FLIGHT, record_cache
+from utils.contact_sheet import SHEET_COLUMNS, map_path, render_sheet
+from utils.tiles import DESCRIPTOR, TILE_MIN_SIZE, build_pyramid
+from utils.label_store import LabelStoreWriter, label_store_path, remove_label_store, run_aggregation
+from utils.sampling import sample_images
+from utils.derivatives import FORMATS, DerivativeCache, derivative_key, negotiate, transcode
+from utils.export import VOC_SPLITS, ZipStream, coco_annotations, coco_image, voc_annotation
+from utils.pool import get_process_pool
+from utils.serialization import BSONJSONResponse, dumps
+from utils.tracing import Trace
+from utils import progress as progress_registry
+from utils.progress import PROGRESS_INTERVAL, PROGRESS_RETENTION, Progress
+from utils.admission import SCRATCH_FACTOR, AdmissionRejected, IngestScheduler
+from utils.lease import Lease, LeaseLost
+from dataset.models import DATASET_NAME_PATTERN, DatasetInDB
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
 from fastapi import HTTPException
-from fastapi.responses import JSONResponse
-from bson.json_util import dumps
 import uuid
 from math import ceil
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
 
 from motor.motor_asyncio import AsyncIOMotorClient
 
+logger = logging.getLogger(__name__)
+
 client = AsyncIOMotorClient("mongodb://mongo:27017")
 db = client.yolo
 dataset_collection = db.datasets
+image_collection = db.images
+page_collection = db.pages
+upload_collection = db.uploads
+job_collection = db.ingest_jobs
+
+INSERT_BATCH_SIZE = 1000
+# Images per row group of the columnar label file
+LABEL_BATCH_SIZE = 50000
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_PROGRESS_TTL = 3600
+PROGRESS_MIRROR_INTERVAL = 1.0
+
+# "inline" ingests inside the API process; "queue" only enqueues jobs for worker.py
+INGEST_MODE = os.getenv("INGEST_MODE", "inline")
+JOB_QUEUE_SIZE = int(os.getenv("INGEST_JOB_QUEUE_SIZE", "100"))
+JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION = 7 * 24 * 3600
+JOB_RETRY_AFTER = 30
+
+# Directories under which datasets may be ingested in place; empty disables ingest from a path
+PATH_INGEST_ROOTS = [root for root in os.getenv("INGEST_PATH_ROOTS", "").split(os.pathsep) if root]
+
+ingest_scheduler = IngestScheduler()
+PAGE_SIZE = 20
+# Only what the listing shows, so large or legacy fields never leave Mongo
+DATASET_LIST_PROJECTION = {"name": 1, "status": 1, "created_at": 1, "total_images": 1}
+SHEET_CACHE_DIR = os.path.join("datasets", "sheets")
+TILE_DIR = os.path.join("datasets", "tiles")
+
+# Streamed exports are flushed to the client in chunks of about this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Sheets currently being rendered, so concurrent requests for one page share a render
+_sheets_in_flight = {}
+
+# Label files being built for datasets ingested before they existed, so concurrent queries share a build
+_label_stores_in_flight = {}
+
+# WebP/AVIF versions of originals, encoded on first request for clients that accept them
+derivative_cache = DerivativeCache()
+_derivatives_in_flight = {}
+_derivative_maintenance: Optional[asyncio.Future] = None
+
+
+async def ensure_indexes():
+    try:
+        await dataset_collection.create_index("name", unique=True)
+    except DuplicateKeyError:
+        await _set_aside_duplicate_names()
+        await dataset_collection.create_index("name", unique=True)
+    except OperationFailure as e:
+        if e.code not in (85, 86):
+            raise
+        # Deployments from before names were reserved have a non-unique name_1 index
+        await dataset_collection.drop_index("name_1")
+        try:
+            await dataset_collection.create_index("name", unique=True)
+        except DuplicateKeyError:
+            await _set_aside_duplicate_names()
+            await dataset_collection.create_index("name", unique=True)
+    await dataset_collection.create_index("archive_sha256")
+    # Keyset paging for each listing sort within a status: (status, field, _id) in either direction
+    for field in ("created_at", "name", "total_images"):
+        await dataset_collection.create_index([("status", 1), (field, 1), ("_id", 1)])
+    # ... and across statuses (status=all), with name last so a prefix search is checked on index keys
+    for field in ("created_at", "total_images"):
+        await dataset_collection.create_index([(field, 1), ("_id", 1), ("name", 1)])
+    await dataset_collection.create_index([("name", 1), ("_id", 1)])
+    await image_collection.create_index([("dataset", 1), ("image_name", 1)], unique=True)
+    # Per-split pages, counts and exports scan one split's slice in name order
+    await image_collection.create_index([("dataset", 1), ("split", 1), ("image_name", 1)])
+    # Only records mid-way through a COCO import carry coco_ref
+    await image_collection.create_index(
+        [("dataset", 1), ("coco_ref", 1)], partialFilterExpression={"coco_ref": {"$exists": True}}
+    )
+    await page_collection.create_index([("dataset", 1), ("page_size", 1), ("page", 1)], unique=True)
+    await upload_collection.create_index("updated_at", expireAfterSeconds=UPLOAD_PROGRESS_TTL)
+    await job_collection.create_index([("status", 1), ("created_at", 1)])
+    # Only finished jobs carry finished_at, so queued and running ones never expire
+    await job_collection.create_index("finished_at", expireAfterSeconds=JOB_RETENTION)
+
+async def migrate_embedded_images():
+    """
+    Move labels of datasets ingested before the image collection into it.
+
+    Such datasets keep their labels in an embedded ``images`` dict (image name
+    to labels) and, if hashed, their split and hash in ``phashes``. Each image
+    becomes a record, with its size read from the file on disk; then the
+    embedded fields are dropped and pages and the label file are built. The
+    records are upserted, so a migration interrupted midway is redone safely.
+    """
+    async for dataset in dataset_collection.find({"images": {"$exists": True}}, {"name": 1, "images": 1, "phashes": 1}):
+        name = dataset["name"]
+        hashed = {entry["image_name"]: entry for entry in dataset.get("phashes") or []}
+        image_names = list(dataset["images"] or {})
+        image_dir = os.path.join("datasets", "images", name)
+        # Pool workers may not share our working directory, so hand them absolute paths
+        fingerprints = await asyncio.to_thread(
+            fingerprint_files, [os.path.abspath(os.path.join(image_dir, image_name)) for image_name in image_names]
+        )
+        image_docs = []
+        for image_name, (phash, width, height) in zip(image_names, fingerprints):
+            legacy = hashed.get(image_name, {})
+            image_docs.append({
+                "dataset": name,
+                "image_name": image_name,
+                "split": legacy.get("split"),
+                "labels": dataset["images"][image_name],
+                "width": width,
+                "height": height,
+                "phash": legacy.get("phash") or (format_hash(phash) if phash is not None else None)
+            })
+        for batch in batched(image_docs, INSERT_BATCH_SIZE):
+            await image_collection.bulk_write([
+                UpdateOne({"dataset": name, "image_name": doc["image_name"]}, {"$set": doc}, upsert=True)
+                for doc in batch
+            ], ordered=False)
+        await page_collection.delete_many({"dataset": name})
+        await _store_derived(name, image_docs)
+        await dataset_collection.update_one({"_id": dataset["_id"]}, {
+            "$set": {"total_images": len(image_docs), "split_counts": await _split_counts(name)},
+            "$unset": {"images": "", "phashes": ""}
+        })
+        logger.info("moved %d embedded images of '%s' into the image collection", len(image_docs), name)
+
+
+async def _set_aside_duplicate_names():
+    """
+    Make dataset names unique on databases from before names were reserved.
+
+    Uploads used to insert a document per upload, so a name can appear more
+    than once. The completed, most recently created document keeps the name;
+    the others are renamed to ``<name>.duplicate-<id>`` and marked
+    ``duplicate``, which hides them from reads without dropping their data.
+    """
+    by_name = {}
+    async for doc in dataset_collection.find({}, {"name": 1, "status": 1, "created_at": 1}):
+        by_name.setdefault(doc["name"], []).append(doc)
+    for name, docs in by_name.items():
+        if len(docs) < 2:
+            continue
+        docs.sort(key=lambda doc: (doc.get("status") == "completed", doc.get("created_at") or datetime.min), reverse=True)
+        for doc in docs[1:]:
+            await dataset_collection.update_one(
+                {"_id": doc["_id"]}, {"$set": {"name": f"{name}.duplicate-{doc['_id']}", "status": "duplicate"}}
+            )
+
+
+async def handle_upload(
+    file,
+    trace_sample: float = 0.0,
+    trace_format: Optional[str] = None,
+    upload_id: Optional[str] = None,
+    client: str = "unknown",
+):
+    kind = archive_kind(file.filename)
+    if kind is None:
+        raise HTTPException(
+            status_code=400, detail="Only ZIP files are supported, or tar archives (.tar, .tar.gz, .tgz, .tar.zst)."
+        )
+    # The name ends up in paths that are deleted and replaced, so '..' or '.' must never get through
+    if not re.match(DATASET_NAME_PATTERN, archive_stem(file.filename)):
+        raise HTTPException(
+            status_code=400,
+            detail="Archive names must start with a letter, digit, '_' or '-' and contain only those and '.'"
+        )
+
+    if INGEST_MODE == "queue":
+        return await _enqueue_upload(file, upload_id)
+
+    if upload_id:
+        progress = progress_registry.start(upload_id)
+        if progress is None:
+            raise HTTPException(status_code=409, detail=f"Upload '{upload_id}' is already in progress")
+        mirror = asyncio.create_task(_mirror_progress(progress))
+    else:
+        progress, mirror = Progress(""), None
+
+    trace = Trace(sample_rate=trace_sample)
+    try:
+        async with _admitted(client, (file.size or 0) * SCRATCH_FACTOR, progress):
+            with UPLOADS_IN_FLIGHT.track_inprogress():
+                if kind == "zip":
+                    result = await _ingest_upload(file, trace, progress)
+                else:
+                    result = await _stream_ingest(file, kind, trace, progress)
+    except HTTPException as e:
+        progress.finish(error=str(e.detail))
+        raise
+    except Exception:
+        progress.finish(error="Ingest failed")
+        raise
+    else:
+        progress.finish(result={key: value for key, value in result.items() if key != "timing"})
+    finally:
+        if mirror:
+            # Write the final state now rather than on the mirror's next tick
+            mirror.cancel()
+            await _store_progress(progress.snapshot())
+
+    result["timing"] = trace.breakdown()
+    if trace_format == "chrome":
+        result["trace"] = trace.to_chrome_trace()
+    return result
+
+
+@asynccontextmanager
+async def _admitted(client: str, scratch_bytes: int, progress: Progress):
+    try:
+        async with ingest_scheduler.admit(client, scratch_bytes, progress.set_queue_position):
+            yield
+    except AdmissionRejected as e:
+        if e.retry_after is None:
+            raise HTTPException(status_code=413, detail=e.detail)
+        raise HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+async def upload_progress_events(upload_id: str):
+    """Server-Sent Events for an ingest, ending with a ``done`` or ``failed`` event."""
+    async for snapshot in _progress_snapshots(upload_id):
+        event = {"completed": "done", "failed": "failed"}.get(snapshot["stage"], "progress")
+        yield f"event: {event}\ndata: {dumps(snapshot).decode()}\n\n"
+
+
+async def _progress_snapshots(upload_id: str):
+    """
+    Follow an ingest wherever it runs.
+
+    Ingests in this process are followed in memory; ingests on other workers or
+    replicas are followed through the snapshots they mirror into Mongo. Until
+    the upload shows up anywhere a ``pending`` snapshot is reported.
+    """
+    seen = None
+    deadline = asyncio.get_running_loop().time() + PROGRESS_RETENTION
+    while True:
+        local = progress_registry.lookup(upload_id)
+        if local is not None:
+            async for snapshot in local.updates():
+                yield snapshot
+            return
+
+        mirrored = await upload_collection.find_one({"_id": upload_id}, {"_id": 0, "updated_at": 0})
+        snapshot = mirrored or Progress(upload_id).snapshot()
+        if snapshot != seen:
+            seen = snapshot
+            yield snapshot
+        if snapshot["stage"] in ("completed", "failed"):
+            return
+        if not mirrored and asyncio.get_running_loop().time() > deadline:
+            return
+        await asyncio.sleep(PROGRESS_INTERVAL)
+
+
+async def _mirror_progress(progress: Progress):
+    # Lets subscribers connected to other workers follow this ingest
+    async for snapshot in progress.updates(interval=PROGRESS_MIRROR_INTERVAL):
+        await _store_progress(snapshot)
 
-async def handle_upload(file):
-    if not file.filename.endswith(".zip"):
-        raise HTTPException(status_code=400, detail="Only ZIP files are supported.")
 
+async def _store_progress(snapshot: dict):
+    # Best effort: a missed mirror write must never fail the ingest itself
+    try:
+        await upload_collection.update_one(
+            {"_id": snapshot["upload_id"]},
+            {"$set": {**snapshot, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    except PyMongoError:
+        pass
+
+
+async def _ingest_upload(file, trace: Trace, progress: Progress):
+    dataset_name, dataset_path, archive_path, archive_sha256 = await _receive_upload(file, trace, progress)
+    try:
+        return await _ingest_archive(dataset_name, dataset_path, archive_path, archive_sha256, trace, progress)
+    finally:
+        shutil.rmtree(dataset_path, ignore_errors=True)
+
+
+async def _receive_upload(file, trace: Trace, progress: Progress):
+    """Stream the archive into its own scratch directory, hashing it on the way."""
     unique_id = str(uuid.uuid4())
     dataset_path = f"datasets/{unique_id}"
     os.makedirs(dataset_path, exist_ok=True)
 
-    zip_path = os.path.join(dataset_path, file.filename)
-    async with aiofiles.open(zip_path, "wb") as f:
-        content = await file.read()
-        await f.write(content)
+    archive_path = os.path.join(dataset_path, file.filename)
+    digest = hashlib.sha256()
+    progress.set_stage("write")
+    with trace.span("write") as span:
+        async with aiofiles.open(archive_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await f.write(chunk)
+                span.bytes += len(chunk)
+        span.items = 1
+    INGEST_BYTES.inc(span.bytes)
+
+    if archive_kind(file.filename) == "zip" and not zipfile.is_zipfile(archive_path):
+        shutil.rmtree(dataset_path, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="File is not a zip file")
+    return archive_stem(file.filename), dataset_path, archive_path, digest.hexdigest()
+
+
+async def _stream_ingest(file, kind: str, trace: Trace, progress: Progress):
+    """
+    Ingest a tar upload while it is still being received.
+
+    The name is reserved up front and the archive is unpacked straight off the
+    upload, never written to scratch whole; its hash is only known at the end
+    and is recorded when the dataset is published. A name that is already taken
+    goes through the buffered path instead, so a re-upload of the same archive
+    is still recognised as one.
+    """
+    dataset_name = archive_stem(file.filename)
+    if await dataset_collection.find_one({"name": dataset_name}, {"_id": 1}):
+        return await _ingest_upload(file, trace, progress)
+
+    progress.set_stage("reserve")
+    with trace.span("reserve"):
+        lease = await _reserve_dataset(dataset_name, None)
+    dataset_path = f"datasets/{uuid.uuid4()}"
+    try:
+        return await _ingest_leased(
+            dataset_name, lease, _ingest_reserved(dataset_name, None, dataset_path, lease, trace, progress, (file, kind))
+        )
+    finally:
+        shutil.rmtree(dataset_path, ignore_errors=True)
+
+
+async def _ingest_archive(
+    dataset_name: str,
+    dataset_path: str,
+    archive_path: str,
+    archive_sha256: str,
+    trace: Trace,
+    progress: Progress,
+    job_id: Optional[str] = None,
+):
+    """Dedupe, reserve and ingest an archive already in scratch; the caller owns the scratch directory."""
+    progress.set_stage("dedupe")
+    with trace.span("dedupe"):
+        reused = await _reuse_archive(dataset_name, archive_sha256)
+    if reused:
+        return reused
+
+    progress.set_stage("reserve")
+    with trace.span("reserve"):
+        lease = await _reserve_dataset(dataset_name, archive_sha256, job_id)
+
+    return await _ingest_leased(
+        dataset_name, lease, _ingest_reserved(dataset_name, archive_path, dataset_path, lease, trace, progress)
+    )
+
+
+async def _ingest_leased(dataset_name: str, lease: Lease, ingest):
+    """Await ``ingest`` while holding the dataset's lease; on failure the reservation and partial data are dropped."""
+    try:
+        async with lease:
+            image_count = await ingest
+    except LeaseLost:
+        raise HTTPException(status_code=409, detail=f"Ingest of '{dataset_name}' was taken over after its lease expired")
+    except BaseException:
+        # Give the name back; records written by a process that took the lease over, or by ourselves
+        # once the dataset was published, are not ours to drop
+        if not lease.lost and not lease.released:
+            await _discard_dataset(dataset_name)
+            await dataset_collection.delete_one(lease.guard())
+        raise
+
+    INGEST_IMAGES.inc(image_count)
+    return {"message": "Upload successful", "dataset": dataset_name}
+
+
+async def _enqueue_upload(file, upload_id: Optional[str]):
+    """
+    Accept an upload and leave the ingest to a worker process (``worker.py``).
+
+    Only the archive write happens here; the job document points at the archive
+    in the shared ``datasets/`` scratch space.
+    """
+    await _check_job_queue()
+
+    progress = Progress(upload_id or "")
+    if upload_id:
+        await _store_progress(progress.snapshot())
+    dataset_name, dataset_path, archive_path, archive_sha256 = await _receive_upload(file, Trace(), progress)
+
+    job_id = str(uuid.uuid4())
+    await job_collection.insert_one({
+        "_id": job_id,
+        "status": "queued",
+        "dataset": dataset_name,
+        "dataset_path": dataset_path,
+        "archive_path": archive_path,
+        "archive_sha256": archive_sha256,
+        "upload_id": upload_id,
+        "attempts": 0,
+        "created_at": datetime.utcnow()
+    })
+    INGEST_JOBS.labels("queued").inc()
+    if upload_id:
+        progress.set_stage("queued")
+        await _store_progress(progress.snapshot())
+    return {"message": "Upload queued", "dataset": dataset_name, "job_id": job_id}
+
+
+async def _check_job_queue():
+    if await job_collection.count_documents({"status": "queued"}) >= JOB_QUEUE_SIZE:
+        INGEST_REJECTED.labels("job_queue_full").inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Too many ingest jobs are queued",
+            headers={"Retry-After": str(JOB_RETRY_AFTER)}
+        )
+
+
+async def claim_ingest_job(lease: Lease) -> Optional[dict]:
+    """
+    Atomically take the oldest runnable job, or None if there is nothing to do.
+
+    Runnable means queued, or running under a lease that expired because its
+    worker died; either way the claim bumps ``attempts``.
+    """
+    job = await job_collection.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_expires": {"$lt": datetime.utcnow()}}
+        ]},
+        {"$set": {"status": "running", "started_at": datetime.utcnow(), **lease.claim()}, "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+    if job:
+        lease.document_id = job["_id"]
+    return job
+
+
+async def run_ingest_job(job: dict, lease: Lease):
+    """
+    Run a claimed job under its lease and record the outcome on the job document.
+
+    Rejections of the archive itself (bad zip, invalid structure, name taken)
+    fail the job. Anything else is retried by putting the job back in the queue
+    until ``JOB_MAX_ATTEMPTS`` claims have been used up.
+    """
+    upload_id = job.get("upload_id")
+    progress = Progress(upload_id or "")
+    mirror = asyncio.create_task(_mirror_progress(progress)) if upload_id else None
+    trace = Trace()
+    outcome = None
+    try:
+        if job["attempts"] > JOB_MAX_ATTEMPTS:
+            raise HTTPException(status_code=500, detail=f"Ingest gave up after {JOB_MAX_ATTEMPTS} attempts")
+        if job["attempts"] > 1 and "dataset_path" in job:
+            # Leftovers of a crashed attempt; only the archive is kept
+            for leftover in ("extracted", "images"):
+                shutil.rmtree(os.path.join(job["dataset_path"], leftover), ignore_errors=True)
+        async with lease:
+            with UPLOADS_IN_FLIGHT.track_inprogress():
+                if "source_path" in job:
+                    result = await _sync_dataset(
+                        job["dataset"], job["source_path"], trace, progress, job.get("watch"), job_id=job["_id"]
+                    )
+                else:
+                    result = await _ingest_archive(
+                        job["dataset"], job["dataset_path"], job["archive_path"], job["archive_sha256"],
+                        trace, progress, job_id=job["_id"]
+                    )
+    except HTTPException as e:
+        progress.finish(error=str(e.detail))
+        outcome = {"status": "failed", "error": str(e.detail)}
+    except Exception as e:
+        if job["attempts"] < JOB_MAX_ATTEMPTS:
+            progress.set_stage("queued")
+            outcome = {"status": "queued", "error": f"{type(e).__name__}: {e}"}
+        else:
+            progress.finish(error="Ingest failed")
+            outcome = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    else:
+        progress.finish(result=result)
+        outcome = {"status": "completed", "result": {**result, "timing": trace.breakdown()}}
+    finally:
+        if mirror:
+            mirror.cancel()
+            await _store_progress(progress.snapshot())
+
+    if outcome["status"] != "queued":
+        outcome["finished_at"] = datetime.utcnow()
+        if "dataset_path" in job:
+            shutil.rmtree(job["dataset_path"], ignore_errors=True)
+    INGEST_JOBS.labels(outcome["status"]).inc()
+    # If the lease was lost another worker owns the job now and records its own outcome
+    await lease.release({"$set": outcome})
+    return outcome
+
+
+async def get_ingest_job(job_id: str) -> Optional[dict]:
+    return await job_collection.find_one(
+        {"_id": job_id},
+        {"status": 1, "dataset": 1, "attempts": 1, "error": 1, "result": 1, "created_at": 1, "finished_at": 1}
+    )
+
+
+async def sync_directory(path: str, dataset_name: Optional[str] = None, watch: Optional[bool] = None):
+    """
+    Ingest a YOLO directory the server can see in place, or bring an earlier ingest of it up to date.
+
+    Nothing is copied: image records point at the files through symlinks in the
+    image directory. Each sync persists a (size, mtime) index of the directory,
+    so the next one only reads images and labels that changed since.
+    """
+    source_path = _allowed_source(path)
+    dataset_name = dataset_name or os.path.basename(source_path)
+
+    if INGEST_MODE == "queue":
+        await _check_job_queue()
+        job_id = str(uuid.uuid4())
+        job = {
+            "_id": job_id,
+            "status": "queued",
+            "dataset": dataset_name,
+            "source_path": source_path,
+            "upload_id": None,
+            "attempts": 0,
+            "created_at": datetime.utcnow()
+        }
+        if watch is not None:
+            job["watch"] = watch
+        await job_collection.insert_one(job)
+        INGEST_JOBS.labels("queued").inc()
+        return {"message": "Sync queued", "dataset": dataset_name, "job_id": job_id}
+
+    trace = Trace()
+    with UPLOADS_IN_FLIGHT.track_inprogress():
+        result = await _sync_dataset(dataset_name, source_path, trace, Progress(""), watch)
+    result["timing"] = trace.breakdown()
+    return result
+
+
+async def sync_watched() -> List[dict]:
+    """Re-sync every dataset ingested with ``watch``; datasets another process is syncing are skipped."""
+    results = []
+    watched = await dataset_collection.find(
+        {"watch": True, "status": "completed"}, {"name": 1, "source_path": 1}
+    ).to_list(None)
+    for dataset in watched:
+        try:
+            results.append(await _sync_dataset(dataset["name"], dataset["source_path"], Trace(), Progress("")))
+        except HTTPException as e:
+            if e.status_code != 409:
+                results.append({"dataset": dataset["name"], "error": str(e.detail)})
+    return results
+
+
+def _allowed_source(path: str) -> str:
+    if not PATH_INGEST_ROOTS:
+        raise HTTPException(status_code=403, detail="Ingest from a path is disabled; set INGEST_PATH_ROOTS")
+    source_path = os.path.realpath(path)
+    roots = [os.path.realpath(root) for root in PATH_INGEST_ROOTS]
+    if not any(os.path.commonpath([root, source_path]) == root for root in roots):
+        raise HTTPException(status_code=403, detail=f"'{path}' is not under an ingest root")
+    _check_source(source_path)
+    return source_path
+
+
+def _check_source(source_path: str):
+    # Also guards re-syncs: an unmounted volume must not read as a directory whose files were all deleted
+    if not os.path.isdir(source_path):
+        raise HTTPException(status_code=400, detail=f"'{source_path}' is not a directory")
+    try:
+        validate_yolo_structure(source_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _sync_dataset(
+    dataset_name: str,
+    source_path: str,
+    trace: Trace,
+    progress: Progress,
+    watch: Optional[bool] = None,
+    job_id: Optional[str] = None,
+):
+    """First sync of a directory reserves the name like an upload; later ones lease the published dataset."""
+    stats = {}
+    existing = await dataset_collection.find_one({"name": dataset_name, "status": "completed"}, {"source_path": 1})
+    if existing is None:
+        progress.set_stage("reserve")
+        with trace.span("reserve"):
+            lease = await _reserve_dataset(dataset_name, None, job_id)
+        result = await _ingest_leased(
+            dataset_name, lease,
+            _sync_files(dataset_name, source_path, lease, trace, progress, stats, False, bool(watch))
+        )
+        return {**result, "message": "Sync successful", **stats}
 
+    if existing.get("source_path") != source_path:
+        raise HTTPException(status_code=409, detail=f"Dataset '{dataset_name}' already exists")
+    _check_source(source_path)
+    lease = await _lease_dataset(existing["_id"])
+    if lease is None:
+        raise HTTPException(status_code=409, detail=f"Dataset '{dataset_name}' is already being synced")
     try:
-        folder_path = await extract_zip_async(zip_path, dataset_path)
-        validate_yolo_structure(folder_path)
-        images, labels = parse_labels(folder_path, file.filename.replace(".zip", ""))
+        async with lease:
+            changed = await _sync_files(dataset_name, source_path, lease, trace, progress, stats, True, watch)
+    except LeaseLost:
+        raise HTTPException(status_code=409, detail=f"Sync of '{dataset_name}' was taken over after its lease expired")
+    except BaseException:
+        # The published dataset stays as it was; records already updated are redone by the next sync
+        if not lease.lost:
+            await lease.release({})
+        raise
+    INGEST_IMAGES.inc(changed)
+    return {"message": "Sync successful", "dataset": dataset_name, **stats}
+
+
+async def _lease_dataset(document_id) -> Optional[Lease]:
+    """Lease a published dataset for an in-place update; None while another process holds it."""
+    lease = Lease(dataset_collection)
+    claimed = await dataset_collection.find_one_and_update(
+        {"_id": document_id, "$or": [
+            {"lease_owner": {"$exists": False}},
+            {"lease_expires": {"$lt": datetime.utcnow()}}
+        ]},
+        {"$set": lease.claim()},
+        projection={"_id": 1}
+    )
+    if not claimed:
+        return None
+    lease.document_id = document_id
+    return lease
+
+
+async def _sync_files(
+    dataset_name: str,
+    source_path: str,
+    lease: Lease,
+    trace: Trace,
+    progress: Progress,
+    stats: dict,
+    resync: bool,
+    watch: Optional[bool],
+) -> int:
+    """
+    Apply what changed in ``source_path`` since the last sync, then publish; returns the images read.
+
+    Files are only stat'ed and compared with the persisted index, so an
+    unchanged directory costs one directory walk. New and modified images are
+    re-read and upserted, vanished ones deleted, and pages rebuilt only if
+    anything changed. Every step is idempotent, so an interrupted sync is
+    simply redone from the old index by the next one.
+    """
+    progress.set_stage("scan")
+    with trace.span("scan") as span:
+        previous = await asyncio.to_thread(load_index, index_path(dataset_name)) if resync else {}
+        current = await asyncio.to_thread(scan_yolo_dir, source_path)
+        changed, removed = diff_index(previous, current)
+        span.items = len(current)
+    added = sum(name not in previous for name in changed)
+    stats.update(
+        total_images=len(current), added=added, updated=len(changed) - added,
+        removed=len(removed), unchanged=len(current) - len(changed)
+    )
+
+    sources = {name: image_path(source_path, name, current[name]) for name in changed}
+    image_dir = os.path.join("datasets", "images", dataset_name)
+    image_docs = []
+    if changed:
+        progress.set_stage("parse")
+        with trace.span("parse") as span:
+            labels = await asyncio.to_thread(read_labels, source_path, current, changed)
+            span.items = len(changed)
+        fingerprints = await _fingerprint(list(sources.values()), trace, progress)
+        # Entries name the links, which carry the image names; the files behind them may be named otherwise
+        entries = [(os.path.join(image_dir, name), current[name][0]) for name in changed]
+        image_docs = _yolo_image_docs(dataset_name, entries, labels, fingerprints)
+
+    progress.set_stage("insert")
+    with trace.span("insert") as span:
+        progress.set_total("written", len(image_docs))
+        for batch in batched(image_docs, INSERT_BATCH_SIZE):
+            if resync:
+                await image_collection.bulk_write([
+                    UpdateOne({"dataset": dataset_name, "image_name": doc["image_name"]}, {"$set": doc}, upsert=True)
+                    for doc in batch
+                ], ordered=False)
+            else:
+                await image_collection.insert_many(batch, ordered=False)
+            progress.add("written", len(batch))
+        for names in batched(removed, INSERT_BATCH_SIZE):
+            await image_collection.delete_many({"dataset": dataset_name, "image_name": {"$in": names}})
+
+        await asyncio.to_thread(link_images, image_dir, sources)
+        await asyncio.to_thread(unlink_images, image_dir, removed)
+        tiles_dir = os.path.join(TILE_DIR, dataset_name)
+        for name in removed:
+            shutil.rmtree(os.path.join(tiles_dir, name), ignore_errors=True)
+
+        # A pyramid is replaced as a whole, so a preview never mixes tiles of two versions of an image
+        await _build_pyramids(
+            [doc["image_name"] for doc in image_docs if _needs_pyramid(doc)], image_dir, tiles_dir, trace, progress
+        )
+
+        if changed or removed or not resync:
+            # Pages shift with every insert or removal, so they are rebuilt from the records
+            await page_collection.delete_many({"dataset": dataset_name})
+            shutil.rmtree(os.path.join(SHEET_CACHE_DIR, dataset_name), ignore_errors=True)
+            await _store_pages(dataset_name)
+            await _store_labels(dataset_name)
+
+        await asyncio.to_thread(save_index, index_path(dataset_name), current)
+        published = {"status": "completed", "source_path": source_path, "total_images": len(current),
+                     "split_counts": await _split_counts(dataset_name), "synced_at": datetime.utcnow()}
+        if watch is not None:
+            published["watch"] = watch
+        if not await lease.release({"$set": published}):
+            raise LeaseLost(f"Lost the lease on '{dataset_name}' before publishing")
+        span.items = len(changed) + len(removed)
+    return len(changed)
+
+
+async def _ingest_reserved(
+    dataset_name: str,
+    archive_path: Optional[str],
+    dataset_path: str,
+    lease: Lease,
+    trace: Trace,
+    progress: Progress,
+    upload=None,
+) -> int:
+    """
+    Build a reserved dataset in scratch space, then publish it atomically.
+
+    The archive is read from ``archive_path``, or for a streamed tar ingest
+    from ``upload``, an ``(upload file, archive kind)`` pair still being received.
+    """
+    # Images are staged inside the scratch directory and moved into place on publish
+    staged_images = os.path.join(dataset_path, "images")
+    extracted = os.path.join(dataset_path, "extracted")
+    published = {"status": "completed"}
+    try:
+        progress.set_stage("extract")
+        if upload is not None:
+            contents, published["archive_sha256"] = await _read_tar_upload(*upload, staged_images, extracted, trace, progress)
+        elif archive_kind(archive_path) != "zip":
+            contents = await asyncio.to_thread(_read_tar_file, archive_path, staged_images, extracted, trace, progress)
+        else:
+            contents = None
+            folder_path = await extract_zip_async(archive_path, extracted, trace, progress)
+
+        progress.set_stage("validate")
+        with trace.span("validate"):
+            # Archives without the YOLO layout are imported from their COCO annotation files, if any
+            if contents is not None:
+                coco_root = extracted
+                annotation_files = [] if contents.images else find_coco_annotations(coco_root)
+            else:
+                coco_root = folder_path or extracted
+                annotation_files = [] if has_yolo_structure(coco_root) else find_coco_annotations(coco_root)
+            if not annotation_files and not (contents and contents.images):
+                validate_yolo_structure(folder_path if contents is None else extracted)
+
+        progress.set_stage("parse")
+        if contents is not None:
+            entries, labels = contents.images, contents.labels
+        elif not annotation_files:
+            entries, labels = await asyncio.to_thread(parse_labels, folder_path, dataset_name, trace, progress, staged_images)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    dataset_collection.insert_one({
-        "name": file.filename.replace(".zip", ""),
-        "status": "completed",
+
+    if annotation_files:
+        image_docs = None
+        image_count, published["classes"] = await _load_coco(
+            dataset_name, coco_root, annotation_files, staged_images, trace, progress
+        )
+    else:
+        fingerprints = await _fingerprint([path for path, _ in entries], trace, progress)
+        image_docs = _yolo_image_docs(dataset_name, entries, labels, fingerprints)
+        image_count = len(image_docs)
+    published["total_images"] = image_count
+
+    staged_tiles = os.path.join(dataset_path, "tiles")
+    if image_docs is None:
+        large = await _large_images({"dataset": dataset_name})
+    else:
+        large = [doc["image_name"] for doc in image_docs if _needs_pyramid(doc)]
+    await _build_pyramids(large, staged_images, staged_tiles, trace, progress)
+
+    progress.set_stage("insert")
+    with trace.span("insert") as span:
+        if image_docs is not None:
+            progress.set_total("written", image_count)
+            for start in range(0, image_count, INSERT_BATCH_SIZE):
+                batch = image_docs[start:start + INSERT_BATCH_SIZE]
+                await image_collection.insert_many(batch, ordered=False)
+                progress.add("written", len(batch))
+
+        # Make sure we still own the name before touching the shared image directory
+        await lease.renew()
+        final_images = os.path.join("datasets", "images", dataset_name)
+        shutil.rmtree(final_images, ignore_errors=True)
+        os.makedirs(os.path.dirname(final_images), exist_ok=True)
+        os.replace(staged_images, final_images)
+        final_tiles = os.path.join(TILE_DIR, dataset_name)
+        shutil.rmtree(final_tiles, ignore_errors=True)
+        if os.path.isdir(staged_tiles):
+            os.makedirs(TILE_DIR, exist_ok=True)
+            os.replace(staged_tiles, final_tiles)
+
+        published["split_counts"] = await _split_counts(dataset_name)
+        # Publishing is a single-document update, so readers see all of the dataset or none of it
+        if not await lease.release({"$set": published}):
+            raise LeaseLost(f"Lost the reservation for '{dataset_name}' before publishing")
+
+        # Pages are only derived data; until they exist reads fall back to the image records
+        await _store_derived(dataset_name, image_docs)
+        span.items = image_count
+    return image_count
+
+
+def _needs_pyramid(doc: dict) -> bool:
+    return bool(TILE_MIN_SIZE) and max(doc.get("width") or 0, doc.get("height") or 0) >= TILE_MIN_SIZE
+
+
+async def _large_images(query: dict) -> List[str]:
+    if not TILE_MIN_SIZE:
+        return []
+    cursor = image_collection.find(
+        {**query, "$or": [{"width": {"$gte": TILE_MIN_SIZE}}, {"height": {"$gte": TILE_MIN_SIZE}}]},
+        {"_id": 0, "image_name": 1}
+    )
+    return [doc["image_name"] async for doc in cursor]
+
+
+async def _build_pyramids(image_names: List[str], image_dir: str, tiles_dir: str, trace: Trace, progress: Progress):
+    """Tile pyramids for previews of large images, cut in the process pool into ``tiles_dir/<image name>``."""
+    if not image_names:
+        return
+    progress.set_stage("tile")
+    with trace.span("tile") as span:
+        loop = asyncio.get_running_loop()
+        # Pool workers may not share our working directory, so hand them absolute paths
+        await asyncio.gather(*(
+            loop.run_in_executor(
+                get_process_pool(), build_pyramid,
+                os.path.abspath(os.path.join(image_dir, name)), os.path.abspath(os.path.join(tiles_dir, name))
+            )
+            for name in image_names
+        ))
+        span.items = len(image_names)
+
+
+def _read_tar_file(archive_path: str, staged_images: str, extracted: str, trace: Trace, progress: Progress):
+    with open(archive_path, "rb") as fh:
+        return read_tar(fh, archive_kind(archive_path), staged_images, extracted, trace, progress)
+
+
+async def _read_tar_upload(file, kind: str, staged_images: str, extracted: str, trace: Trace, progress: Progress):
+    """
+    Unpack a tar upload as it is received; returns its contents and SHA-256.
+
+    Receiving runs on the event loop and unpacking in a worker thread, joined
+    by a bounded pipe, so decompression, label parsing and image placement
+    overlap with the network transfer.
+    """
+    pipe = ChunkPipe()
+
+    def unpack():
+        try:
+            contents = read_tar(pipe, kind, staged_images, extracted, trace, progress)
+        except BaseException as e:
+            pipe.close_reader(e)
+            raise
+        pipe.close_reader()
+        return contents
+
+    reader = asyncio.ensure_future(asyncio.to_thread(unpack))
+    digest = hashlib.sha256()
+    try:
+        with trace.span("write") as span:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                span.bytes += len(chunk)
+                await asyncio.to_thread(pipe.feed, chunk)
+            await asyncio.to_thread(pipe.feed, None)
+            span.items = 1
+        INGEST_BYTES.inc(span.bytes)
+        return await reader, digest.hexdigest()
+    except BaseException:
+        pipe.abort()
+        await asyncio.gather(reader, return_exceptions=True)
+        raise
+
+
+async def _fingerprint(images: List[str], trace: Trace, progress: Progress):
+    progress.set_stage("hash")
+    with trace.span("hash") as span:
+        fingerprints = await asyncio.to_thread(fingerprint_files, images)
+        span.items = len(images)
+    return fingerprints
+
+
+def _yolo_image_docs(dataset_name: str, entries: List[tuple], labels: dict, fingerprints: list) -> List[dict]:
+    # Entries are (placed path, split); the placed file's name is the image name labels are keyed by
+    image_docs = []
+    for (path, split), (phash, width, height) in zip(entries, fingerprints):
+        image_name = os.path.basename(path)
+        image_docs.append({
+            "dataset": dataset_name,
+            "image_name": image_name,
+            "split": split,
+            "labels": labels[image_name],
+            "width": width,
+            "height": height,
+            "phash": format_hash(phash) if phash is not None else None
+        })
+    return image_docs
+
+
+async def _load_coco(
+    dataset_name: str,
+    base_path: str,
+    annotation_files: List[str],
+    staged_images: str,
+    trace: Trace,
+    progress: Progress,
+):
+    """
+    Import COCO annotation files straight into the image collection.
+
+    Each file is streamed with ijson and never loaded whole: a first pass
+    places, fingerprints and inserts its images with empty labels, a second
+    converts its annotations to YOLO labels and appends them with one bulk
+    write per batch. Memory is bounded by ``COCO_BATCH_SIZE``, not the file
+    size. Returns the image count and the class names by YOLO class id.
+    """
+    try:
+        categories = {}
+        for annotation_file in annotation_files:
+            categories.update(await asyncio.to_thread(read_categories, annotation_file))
+        # YOLO class ids are dense and 0-based; COCO category ids are neither
+        class_index = {category_id: index for index, category_id in enumerate(sorted(categories))}
+
+        os.makedirs(staged_images, exist_ok=True)
+        image_count = 0
+        placed_names = set()
+        for file_index, annotation_file in enumerate(annotation_files):
+            dirs = search_dirs(base_path, annotation_file)
+            split = split_of(annotation_file)
+            async for batch in _coco_batches(iter_images(annotation_file)):
+                with trace.span("parse") as span:
+                    placed = await asyncio.to_thread(
+                        _place_coco_images, batch, base_path, dirs, staged_images, split, placed_names, progress
+                    )
+                    span.items = len(batch)
+                fingerprints = await _fingerprint([path for path, _ in placed], trace, progress)
+                progress.set_stage("parse")
+                records = [
+                    {
+                        "dataset": dataset_name,
+                        "image_name": os.path.basename(path),
+                        "split": split,
+                        "labels": [],
+                        "width": width or image["width"],
+                        "height": height or image["height"],
+                        "phash": format_hash(phash) if phash is not None else None,
+                        "coco_ref": f"{file_index}:{image['id']}"
+                    }
+                    for (path, image), (phash, width, height) in zip(placed, fingerprints)
+                ]
+                if records:
+                    await image_collection.insert_many(records, ordered=False)
+                image_count += len(records)
+                progress.add("written", len(records))
+
+            async for batch in _coco_batches(iter_annotations(annotation_file)):
+                with trace.span("parse") as span:
+                    await _append_coco_labels(dataset_name, file_index, batch, class_index)
+                    span.items = len(batch)
+                progress.add("parsed", len(batch))
+    except (ijson.JSONError, KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid COCO annotations: {e}")
+
+    # The import key has done its job; leave the records shaped like YOLO ones
+    await image_collection.update_many({"dataset": dataset_name}, {"$unset": {"coco_ref": ""}})
+    return image_count, [categories[category_id] for category_id in sorted(categories)]
+
+
+async def _coco_batches(items):
+    # ijson parses synchronously; pull each batch in a worker thread so the loop stays free
+    batches = batched(items, COCO_BATCH_SIZE)
+    while batch := await asyncio.to_thread(next, batches, None):
+        yield batch
+
+
+def _place_coco_images(
+    images: List[dict],
+    base_path: str,
+    dirs: List[str],
+    staged_images: str,
+    split: str,
+    placed_names: set,
+    progress: Progress,
+):
+    """
+    Move listed images into staging; entries without a file under ``base_path`` are skipped.
+
+    A file whose name another split already placed is stored under a
+    split-qualified name, see ``unique_image_name``.
+    """
+    placed = []
+    for image in images:
+        source = resolve_image(image["file_name"], dirs, base_path)
+        if source is None:
+            continue
+        image_name = unique_image_name(os.path.basename(source), split, placed_names)
+        placed_names.add(image_name)
+        target = os.path.join(staged_images, image_name)
+        # The extracted copy is scratch, so a rename is enough
+        os.replace(source, target)
+        placed.append((target, image))
+        progress.add("placed")
+    return placed
+
+
+async def _append_coco_labels(dataset_name: str, file_index: int, annotations: List[dict], class_index: dict):
+    refs = list({f"{file_index}:{annotation['image_id']}" for annotation in annotations})
+    sizes = {
+        doc["coco_ref"]: (doc["width"], doc["height"])
+        async for doc in image_collection.find(
+            {"dataset": dataset_name, "coco_ref": {"$in": refs}}, {"coco_ref": 1, "width": 1, "height": 1}
+        )
+    }
+    labels = {}
+    for annotation in annotations:
+        ref = f"{file_index}:{annotation['image_id']}"
+        if ref not in sizes or annotation["category_id"] not in class_index:
+            continue
+        label = to_yolo_label(class_index[annotation["category_id"]], annotation["bbox"], *sizes[ref])
+        if label:
+            labels.setdefault(ref, []).append(label)
+    if labels:
+        await image_collection.bulk_write(
+            [
+                UpdateOne({"dataset": dataset_name, "coco_ref": ref}, {"$push": {"labels": {"$each": items}}})
+                for ref, items in labels.items()
+            ],
+            ordered=False
+        )
+
+
+async def _store_pages(dataset_name: str, image_docs: Optional[List[dict]] = None, page_size: int = PAGE_SIZE):
+    """Write the precomputed page bodies, from ``image_docs`` or, if not given, from the stored image records."""
+    if image_docs is not None:
+        pages = encode_pages(dataset_name, image_docs, page_size)
+        for start in range(0, len(pages), INSERT_BATCH_SIZE):
+            await page_collection.insert_many(pages[start:start + INSERT_BATCH_SIZE], ordered=False)
+        return
+
+    # Read back in name order so only one insert batch of pages is held at a time
+    total_images = await image_collection.count_documents({"dataset": dataset_name})
+    total_pages = ceil(total_images / page_size)
+    split_counts = await _split_counts(dataset_name)
+    batch, page_docs, page = [], [], 0
+    cursor = image_collection.find({"dataset": dataset_name}, {"_id": 0, "image_name": 1, "labels": 1}).sort("image_name", 1)
+    async for doc in cursor:
+        page_docs.append(doc)
+        if len(page_docs) == page_size:
+            page += 1
+            batch.append(_encode_page(dataset_name, page_docs, page, total_images, total_pages, page_size, split_counts))
+            page_docs = []
+            if len(batch) == INSERT_BATCH_SIZE:
+                await page_collection.insert_many(batch, ordered=False)
+                batch = []
+    if page_docs:
+        batch.append(_encode_page(dataset_name, page_docs, page + 1, total_images, total_pages, page_size, split_counts))
+    if batch:
+        await page_collection.insert_many(batch, ordered=False)
+
+
+async def _split_counts(dataset_name: str) -> dict:
+    """Images per split, one count over the (dataset, split) index prefix each."""
+    return {split: await image_collection.count_documents({"dataset": dataset_name, "split": split}) for split in SPLITS}
+
+
+async def _store_derived(dataset_name: str, image_docs: Optional[List[dict]] = None):
+    """
+    Build the pages and the label file of a published dataset.
+
+    Both are derived data: reads fall back to the image records without pages
+    and build a missing label file on first use. The dataset is already
+    published, so a failure here is logged rather than failing the ingest.
+    """
+    for build in (_store_pages, _store_labels):
+        try:
+            await build(dataset_name, image_docs)
+        except Exception:
+            logger.exception("building %s for '%s' failed", build.__name__, dataset_name)
+
+
+async def _store_labels(dataset_name: str, image_docs: Optional[List[dict]] = None):
+    """Write the columnar label file, from ``image_docs`` or, if not given, from the stored image records."""
+    writer = LabelStoreWriter(label_store_path(dataset_name))
+    try:
+        if image_docs is not None:
+            for batch in batched(image_docs, LABEL_BATCH_SIZE):
+                await asyncio.to_thread(writer.write, batch)
+        else:
+            cursor = image_collection.find(
+                {"dataset": dataset_name},
+                {"_id": 0, "image_name": 1, "split": 1, "labels": 1, "width": 1, "height": 1}
+            ).sort("image_name", 1)
+            batch = []
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) == LABEL_BATCH_SIZE:
+                    await asyncio.to_thread(writer.write, batch)
+                    batch = []
+            await asyncio.to_thread(writer.write, batch)
+        await asyncio.to_thread(writer.close)
+    except BaseException:
+        writer.abort()
+        raise
+
+
+async def _reserve_dataset(dataset_name: str, archive_sha256: str, job_id: Optional[str] = None) -> Lease:
+    """
+    Claim ``dataset_name`` for one ingest across all workers and replicas.
+
+    The unique name index makes the insert the reservation. A reservation whose
+    owner stopped renewing its lease (crashed worker) is taken over and its
+    partial records are dropped, as is one left by an earlier attempt of the
+    same job.
+    """
+    lease = Lease(dataset_collection)
+    reservation = {
+        "name": dataset_name,
+        "status": "processing",
         "created_at": datetime.utcnow(),
-        "total_images": len(images),
-        "images": labels
-    })
+        "archive_sha256": archive_sha256,
+        **lease.claim()
+    }
+    if job_id:
+        reservation["job_id"] = job_id
+    try:
+        lease.document_id = (await dataset_collection.insert_one(reservation)).inserted_id
+        return lease
+    except DuplicateKeyError:
+        pass
+
+    takeover = [{"lease_expires": {"$lt": datetime.utcnow()}}]
+    if job_id:
+        takeover.append({"job_id": job_id})
+    stale = await dataset_collection.find_one_and_update(
+        {"name": dataset_name, "status": "processing", "$or": takeover},
+        {"$set": {"created_at": datetime.utcnow(), "archive_sha256": archive_sha256, **lease.claim()}},
+        projection={"_id": 1}
+    )
+    if not stale:
+        raise HTTPException(status_code=409, detail=f"Dataset '{dataset_name}' already exists")
+    lease.document_id = stale["_id"]
+    await _discard_dataset(dataset_name)
+    return lease
+
+
+async def _discard_dataset(dataset_name: str):
+    await image_collection.delete_many({"dataset": dataset_name})
+    await page_collection.delete_many({"dataset": dataset_name})
+    if os.path.exists(index_path(dataset_name)):
+        os.remove(index_path(dataset_name))
+    shutil.rmtree(os.path.join("datasets", "images", dataset_name), ignore_errors=True)
+    shutil.rmtree(os.path.join(SHEET_CACHE_DIR, dataset_name), ignore_errors=True)
+    shutil.rmtree(os.path.join(TILE_DIR, dataset_name), ignore_errors=True)
+    remove_label_store(dataset_name)
+
+
+async def _reuse_archive(dataset_name: str, archive_sha256: str) -> Optional[dict]:
+    """
+    Short-circuit uploads of an archive that was already ingested.
+
+    Re-uploading under the same name returns the existing dataset; under a new
+    name the dataset is cloned by reference (``images_from`` plus a symlinked
+    image directory) instead of being extracted and parsed again.
+    """
+    existing = await dataset_collection.find_one({"name": dataset_name}, {"archive_sha256": 1, "status": 1})
+    if existing:
+        if existing.get("status") == "completed" and existing.get("archive_sha256") == archive_sha256:
+            return {"message": "Dataset already ingested", "dataset": dataset_name, "reused": True}
+        # Different contents, or still being ingested: the reservation step decides
+        return None
+
+    source = await dataset_collection.find_one(
+        {"archive_sha256": archive_sha256, "status": "completed", "images_from": {"$exists": False}},
+        {"name": 1, "total_images": 1, "split_counts": 1}
+    )
+    if not source:
+        return None
+
+    # The clone is published in the same write that claims its name: there is no ingest, so
+    # nothing holds a lease that could expire and give an abandoned reservation back
+    try:
+        clone = await dataset_collection.insert_one({
+            "name": dataset_name,
+            "status": "completed",
+            "created_at": datetime.utcnow(),
+            "total_images": source.get("total_images", 0),
+            "split_counts": source.get("split_counts"),
+            "archive_sha256": archive_sha256,
+            "images_from": source["name"]
+        })
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"Dataset '{dataset_name}' already exists")
+
+    try:
+        images_dir = os.path.join("datasets", "images")
+        os.makedirs(images_dir, exist_ok=True)
+        link = os.path.join(images_dir, dataset_name)
+        if not os.path.lexists(link):
+            os.symlink(source["name"], link)
+    except BaseException:
+        await dataset_collection.delete_one({"_id": clone.inserted_id})
+        raise
+    return {"message": "Upload successful", "dataset": dataset_name, "cloned_from": source["name"]}
+
+
+async def _find_published(dataset_name: str, projection: dict) -> Optional[dict]:
+    # Reservations and in-flight ingests stay invisible until they are published
+    return await dataset_collection.find_one({"name": dataset_name, "status": "completed"}, projection)
+
+
+def _source_of(dataset: dict) -> str:
+    # Clones keep their image and page records under the dataset they were cloned from
+    return dataset.get("images_from") or dataset["name"]
 
-    shutil.rmtree(dataset_path)
 
-    return {"message": "Upload successful"}
+def encode_pages(dataset_name: str, image_docs: List[dict], page_size: int = PAGE_SIZE) -> List[dict]:
+    """
+    Pre-encoded response bodies for every page of ``GET /datasets/{name}/images``.
 
-async def get_all_datasets():
-    datasets_cursor = dataset_collection.find({}, {"images": 0})
-    datasets = await datasets_cursor.to_list(length=100)  # control max returned items
-    return JSONResponse(content=json.loads(dumps(datasets)))
+    Datasets are immutable after ingest, so the bodies are built once here and
+    served as-is instead of being queried and encoded on every request.
+    """
+    ordered = sorted(image_docs, key=lambda doc: doc["image_name"])
+    total_pages = ceil(len(ordered) / page_size)
+    split_counts = dict.fromkeys(SPLITS, 0)
+    for doc in ordered:
+        if doc.get("split") in split_counts:
+            split_counts[doc["split"]] += 1
+    return [
+        _encode_page(
+            dataset_name, ordered[(page - 1) * page_size:page * page_size], page, len(ordered), total_pages, page_size,
+            split_counts
+        )
+        for page in range(1, total_pages + 1)
+    ]
+
+
+def _encode_page(
+    dataset_name: str, page_docs: List[dict], page: int, total_images: int, total_pages: int, page_size: int,
+    split_counts: dict
+) -> dict:
+    return {
+        "dataset": dataset_name,
+        "page_size": page_size,
+        "page": page,
+        "body": dumps({
+            "images": [{"image_name": doc["image_name"], "labels": doc["labels"]} for doc in page_docs],
+            "total_images": total_images,
+            "total_pages": total_pages,
+            "current_page": page,
+            "page_size": page_size,
+            "split_counts": split_counts
+        })
+    }
+
+
+async def get_all_datasets(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    prefix: Optional[str] = None,
+    status: str = "completed",
+):
+    """
+    One page of the dataset listing, keyset-paged on (sort field, _id).
+
+    Only published datasets are listed unless ``status`` asks for in-flight
+    ingests (``processing``) or everything (``all``). The next page's cursor is
+    returned in the ``X-Next-Cursor`` header so the body stays the plain array
+    clients already consume.
+    """
+    direction = -1 if order == "desc" else 1
+    query = {} if status == "all" else {"status": status}
+    if prefix:
+        # Anchored, case-sensitive regexes are answered from the name index
+        query["name"] = {"$regex": "^" + re.escape(prefix)}
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort, direction)
+        op = "$lt" if direction < 0 else "$gt"
+        query["$or"] = [{sort: {op: value}}, {sort: value, "_id": {op: last_id}}]
+
+    datasets = await (
+        dataset_collection.find(query, DATASET_LIST_PROJECTION)
+        .sort([(sort, direction), ("_id", direction)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+
+    headers = {}
+    if len(datasets) > limit:
+        datasets = datasets[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(sort, direction, datasets[-1].get(sort), datasets[-1]["_id"])
+    return BSONJSONResponse(datasets, headers=headers)
 
 
-async def get_dataset_images(dataset_name, page: int, page_size: int = 20):
-    dataset = await dataset_collection.find_one({"name": dataset_name})
+def _encode_cursor(sort: str, direction: int, value, last_id) -> str:
+    # BSON keeps datetimes and ObjectIds exact across the round trip
+    raw = bson.encode({"s": sort, "d": direction, "v": value, "i": last_id})
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, direction: int):
+    try:
+        state = bson.decode(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, BSONError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # The value may be null (datasets without the sort field), so check for the keys themselves
+    if "v" not in state or "i" not in state:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if state.get("s") != sort or state.get("d") != direction:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    return state["v"], state["i"]
+
+
+async def get_dataset_images(dataset_name, page: int, page_size: int = PAGE_SIZE, split: Optional[str] = None):
+    """
+    One page of a dataset's images in name order, optionally of one split only.
+
+    Whole-dataset pages are served from the bodies precomputed at ingest. A
+    split's pages are read off the (dataset, split, image_name) index, so
+    they cost the page, not a filter over the whole dataset.
+    """
+    # Pages are stored before the dataset is published, so publication is checked first
+    dataset = await _find_published(
+        dataset_name, {"name": 1, "total_images": 1, "split_counts": 1, "images_from": 1}
+    )
     if not dataset:
         return None
 
-    images_dict = dataset.get("images", {})
-    image_items = list(images_dict.items())
+    source = _source_of(dataset)
+    if split is None:
+        precomputed = await page_collection.find_one(
+            {"dataset": source, "page_size": page_size, "page": page}, {"_id": 0, "body": 1}
+        )
+        if precomputed:
+            return BSONJSONResponse(precomputed["body"])
+
+    # Datasets published before splits were counted have no split_counts yet
+    split_counts = dataset.get("split_counts") or await _split_counts(source)
+    if split is not None:
+        return await _split_page(source, split, split_counts, page, page_size)
 
-    total_images = len(image_items)
+    total_images = dataset.get("total_images", 0)
     total_pages = ceil(total_images / page_size)
 
     # Handle page out of range
     if page > total_pages and total_pages > 0:
         raise HTTPException(status_code=400, detail=f"Page {page} out of range. Total pages: {total_pages}")
 
-    start = (page - 1) * page_size
-    end = start + page_size
-    paginated_images = image_items[start:end]
+    images_array = await _page_of_images(source, page, page_size, {"_id": 0, "image_name": 1, "labels": 1})
 
-    images_array = [
-        {"image_name": name, "labels": labels}
-        for name, labels in paginated_images
-    ]
+    return BSONJSONResponse({
+        "images": images_array,
+        "total_images": total_images,
+        "total_pages": total_pages,
+        "current_page": page,
+        "page_size": page_size,
+        "split_counts": split_counts
+    })
 
-    return {
+
+async def _split_page(source: str, split: str, split_counts: dict, page: int, page_size: int):
+    total_images = split_counts.get(split, 0)
+    total_pages = ceil(total_images / page_size)
+    if page > total_pages and total_pages > 0:
+        raise HTTPException(status_code=400, detail=f"Page {page} out of range. Total pages: {total_pages}")
+
+    images_array = await _page_of_images(
+        source, page, page_size, {"_id": 0, "image_name": 1, "labels": 1}, {"split": split}
+    )
+    return BSONJSONResponse({
         "images": images_array,
         "total_images": total_images,
         "total_pages": total_pages,
         "current_page": page,
-        "page_size": page_size
-    }
\ No newline at end of file
+        "page_size": page_size,
+        "split": split,
+        "split_counts": split_counts
+    })
+
+
+async def _page_of_images(dataset_name: str, page: int, page_size: int, projection: dict, query: Optional[dict] = None):
+    cursor = (
+        image_collection.find({"dataset": dataset_name, **(query or {})}, projection)
+        .sort("image_name", 1)
+        .skip((page - 1) * page_size)
+        .limit(page_size)
+    )
+    return await cursor.to_list(length=page_size)
+
+
+async def get_contact_sheet(dataset_name: str, page: int, tile: int, page_size: int = PAGE_SIZE):
+    """
+    Path and tile map of the contact sheet for one page of the image grid.
+
+    A rendered sheet is cached on disk, keyed by page, page size and tile size,
+    until a re-sync of the dataset drops the dataset's sheets.
+    """
+    sheet_path = os.path.join(SHEET_CACHE_DIR, dataset_name, f"p{page}_n{page_size}_t{tile}.jpg")
+    if os.path.exists(map_path(sheet_path)):
+        record_cache("contact_sheet", True)
+        async with aiofiles.open(map_path(sheet_path)) as fh:
+            return sheet_path, json.loads(await fh.read())
+
+    dataset = await _find_published(dataset_name, {"name": 1, "total_images": 1, "images_from": 1})
+    if not dataset:
+        return None
+    total_pages = ceil(dataset.get("total_images", 0) / page_size)
+    if page > total_pages and total_pages > 0:
+        raise HTTPException(status_code=400, detail=f"Page {page} out of range. Total pages: {total_pages}")
+
+    record_cache("contact_sheet", False)
+    render = _sheets_in_flight.get(sheet_path)
+    if render is None:
+        source = _source_of(dataset)
+        names = [doc["image_name"] for doc in await _page_of_images(source, page, page_size, {"_id": 0, "image_name": 1})]
+        # Pool workers may not share our working directory, so hand them absolute paths
+        render = asyncio.get_running_loop().run_in_executor(
+            get_process_pool(), render_sheet,
+            os.path.abspath(os.path.join("datasets", "images", source)), names, tile, SHEET_COLUMNS,
+            os.path.abspath(sheet_path)
+        )
+        _sheets_in_flight[sheet_path] = render
+        render.add_done_callback(lambda _: _sheets_in_flight.pop(sheet_path, None))
+    return sheet_path, await asyncio.shield(render)
+
+
+def _derivative_written(key: str, encode: asyncio.Future):
+    global _derivative_maintenance
+    _derivatives_in_flight.pop(key, None)
+    if encode.cancelled() or encode.exception() is not None or not derivative_cache.added(key):
+        return
+    # Rescanning walks the whole store, so it runs in a thread; one at a time is enough
+    if _derivative_maintenance is None or _derivative_maintenance.done():
+        _derivative_maintenance = asyncio.ensure_future(_maintain_derivatives())
+
+
+async def _maintain_derivatives():
+    derivative_cache.replace(*await asyncio.to_thread(derivative_cache.maintain))
+
+
+async def get_image_variant(dataset_name: str, image_name: str, accept: Optional[str]) -> Optional[Tuple[str, str, str]]:
+    """
+    Path, media type and ETag of a smaller encoding of an image the client accepts.
+
+    Returns None when the original should be served: the client named no
+    format we can encode, or the encoding would not be smaller. Originals are
+    never modified, so exports keep the uploaded bytes.
+    """
+    fmt = negotiate(accept)
+    if fmt is None or {dataset_name, image_name} & {".", ".."}:
+        return None
+    original = os.path.join("datasets", "images", dataset_name, image_name)
+    try:
+        stat = os.stat(original)
+    except OSError:
+        return None
+
+    key = derivative_key(original, stat.st_size, stat.st_mtime_ns, fmt)
+    path = derivative_cache.lookup(key)
+    record_cache("derivative", path is not None)
+    if path is None:
+        encode = _derivatives_in_flight.get(key)
+        if encode is None:
+            # Pool workers may not share our working directory, so hand them absolute paths
+            encode = asyncio.get_running_loop().run_in_executor(
+                get_process_pool(), transcode,
+                os.path.realpath(original), os.path.abspath(derivative_cache.path(key)), fmt
+            )
+            _derivatives_in_flight[key] = encode
+            encode.add_done_callback(lambda future: _derivative_written(key, future))
+        await asyncio.shield(encode)
+        path = derivative_cache.path(key)
+
+    try:
+        # An empty file marks an original that does not get smaller
+        if not os.path.getsize(path):
+            return None
+    except FileNotFoundError:
+        return None
+    return path, FORMATS[fmt]["media_type"], f'"{key}"'
+
+
+async def get_pyramid_dir(dataset_name: str, image_name: str) -> Optional[str]:
+    """Directory holding an image's tile pyramid, or None if the image has none."""
+    if {dataset_name, image_name} & {".", ".."}:
+        return None
+    path = os.path.join(TILE_DIR, dataset_name, image_name)
+    if os.path.exists(os.path.join(path, DESCRIPTOR)):
+        return path
+
+    # Clones share the pyramids of the dataset they were cloned from
+    dataset = await _find_published(dataset_name, {"name": 1, "images_from": 1})
+    if dataset and _source_of(dataset) != dataset_name:
+        path = os.path.join(TILE_DIR, _source_of(dataset), image_name)
+        if os.path.exists(os.path.join(path, DESCRIPTOR)):
+            return path
+    return None
+
+
+async def get_images_batch(dataset_name: str, image_names: List[str]):
+    dataset = await _find_published(dataset_name, {"name": 1, "images_from": 1})
+    if not dataset:
+        return None
+
+    wanted = list(dict.fromkeys(image_names))
+    cursor = image_collection.find(
+        {"dataset": _source_of(dataset), "image_name": {"$in": wanted}},
+        {"_id": 0, "dataset": 0, "phash": 0}
+    )
+    found = {doc["image_name"]: doc async for doc in cursor}
+
+    return BSONJSONResponse({
+        "images": [found[name] for name in wanted if name in found],
+        "missing": [name for name in wanted if name not in found]
+    })
+
+
+def _hash_clusters(entries: List[dict], max_distance: int) -> List[list]:
+    index = HashIndex(max_distance=max_distance)
+    for entry in entries:
+        index.add((entry["image_name"], entry["split"]), parse_hash(entry["phash"]))
+    return index.clusters()
+
+
+async def find_duplicates(dataset_name: str, max_distance: int = 4, cross_split: bool = False):
+    dataset = await _find_published(dataset_name, {"name": 1, "images_from": 1})
+    if not dataset:
+        return None
+
+    entries = await image_collection.find(
+        {"dataset": _source_of(dataset), "phash": {"$ne": None}},
+        {"_id": 0, "image_name": 1, "split": 1, "phash": 1}
+    ).to_list(None)
+    # Clustering is CPU-bound; keep it off the event loop so other requests are served meanwhile
+    clusters = []
+    for members in await asyncio.to_thread(_hash_clusters, entries, max_distance):
+        if cross_split and len({split for _, split in members}) < 2:
+            continue
+        clusters.append([{"image_name": name, "split": split} for name, split in sorted(members)])
+    clusters.sort(key=len, reverse=True)
+
+    return {
+        "clusters": clusters,
+        "total_clusters": len(clusters),
+        "max_distance": max_distance,
+        "cross_split": cross_split
+    }
+
+
+async def _label_store(source: str) -> str:
+    """
+    Path of a dataset's columnar label file and class index.
+
+    Both are written at ingest; datasets ingested before they existed get
+    them built from the image records on first use.
+    """
+    path = label_store_path(source)
+    record_cache("label_store", os.path.exists(path))
+    if not os.path.exists(path):
+        build = _label_stores_in_flight.get(source)
+        if build is None:
+            build = asyncio.ensure_future(_store_labels(source))
+            _label_stores_in_flight[source] = build
+            build.add_done_callback(lambda _: _label_stores_in_flight.pop(source, None))
+        await asyncio.shield(build)
+    return path
+
+
+async def query_labels(dataset_name: str, aggregation: str, split: Optional[str] = None, group_by: Optional[str] = None):
+    """Run an aggregation over the dataset's columnar label file."""
+    dataset = await _find_published(dataset_name, {"name": 1, "images_from": 1})
+    if not dataset:
+        return None
+    path = await _label_store(_source_of(dataset))
+    results = await asyncio.to_thread(run_aggregation, path, aggregation, split, group_by)
+    return BSONJSONResponse({"dataset": dataset_name, "aggregation": aggregation, "split": split, "results": results})
+
+
+async def sample_dataset(
+    dataset_name: str,
+    seed: int,
+    count: Optional[int] = None,
+    per_class: Optional[int] = None,
+    split: Optional[str] = None,
+    export_format: str = "json",
+):
+    """
+    A seeded random (``count``) or stratified (``per_class``) sample of a dataset, or None if there is no such dataset.
+
+    Images are drawn from the class index without reading any labels. As
+    JSON the sampled images come with their labels; as ``coco`` or ``voc``
+    the result is a streamed export of just the sample, like ``export_dataset``.
+    """
+    dataset = await _find_published(dataset_name, {"name": 1, "images_from": 1})
+    if not dataset:
+        return None
+    source = _source_of(dataset)
+    path = await _label_store(source)
+    sample = await asyncio.to_thread(sample_images, path, seed, count, per_class, split)
+    names = [image["image_name"] for image in sample["images"]]
+
+    if export_format != "json":
+        return _export(dataset_name, source, export_format, {"image_name": {"$in": names}}, f"{dataset_name}_sample{seed}")
+
+    labels = {}
+    for batch in batched(names, INSERT_BATCH_SIZE):
+        cursor = image_collection.find({"dataset": source, "image_name": {"$in": batch}}, {"_id": 0, "image_name": 1, "labels": 1})
+        async for doc in cursor:
+            labels[doc["image_name"]] = doc.get("labels", [])
+    for image in sample["images"]:
+        image["labels"] = labels.get(image["image_name"], [])
+    return BSONJSONResponse({
+        "dataset": dataset_name,
+        "seed": seed,
+        "total_images": len(names),
+        "strata": sample["strata"],
+        "images": sample["images"],
+    })
+
+
+async def export_dataset(dataset_name: str, export_format: str, split: Optional[str] = None):
+    """
+    A streamed export of a dataset's labels, or None if there is no such dataset.
+
+    Returns the chunk iterator with its media type and file name. Image
+    documents are read off a cursor in name order and encoded as they arrive,
+    so memory stays flat however large the dataset is. With ``split``, only
+    that split is exported, read off the (dataset, split, image_name) index.
+    """
+    dataset = await _find_published(dataset_name, {"name": 1, "images_from": 1})
+    if not dataset:
+        return None
+    if split is None:
+        return _export(dataset_name, _source_of(dataset), export_format)
+    return _export(dataset_name, _source_of(dataset), export_format, {"split": split}, f"{dataset_name}_{split}")
+
+
+def _export(dataset_name: str, source: str, export_format: str, query: Optional[dict] = None, stem: Optional[str] = None):
+    stem = stem or dataset_name
+    if export_format == "coco":
+        return _coco_export(dataset_name, source, query), "application/json", f"{stem}_coco.json"
+    return _voc_export(dataset_name, source, query), "application/zip", f"{stem}_voc.zip"
+
+
+def _export_cursor(source: str, projection: dict, query: Optional[dict] = None):
+    return image_collection.find({"dataset": source, **(query or {})}, {"_id": 0, **projection}).sort("image_name", 1)
+
+
+async def _class_names(source: str) -> List[str]:
+    # COCO imports keep their category names by class id; YOLO archives carry ids only, so those name the rest
+    dataset = await dataset_collection.find_one({"name": source}, {"_id": 0, "classes": 1}) or {}
+    return dataset.get("classes") or []
+
+
+async def _coco_export(dataset_name: str, source: str, query: Optional[dict] = None):
+    # Two passes over the same ordered cursor: images first, then their annotations.
+    # Image ids are positions in that order, so both passes agree without a lookup table.
+    chunk = bytearray(b'{"info":' + dumps({"description": dataset_name, "version": "1.0"}) + b',"images":[')
+    image_id = 0
+    async for doc in _export_cursor(source, {"image_name": 1, "width": 1, "height": 1}, query):
+        image_id += 1
+        chunk += (b"," if image_id > 1 else b"") + dumps(coco_image(image_id, doc))
+        if len(chunk) >= EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+
+    chunk += b'],"annotations":['
+    categories = set()
+    image_id = annotation_id = 0
+    async for doc in _export_cursor(source, {"image_name": 1, "width": 1, "height": 1, "labels": 1}, query):
+        image_id += 1
+        for annotation in coco_annotations(image_id, annotation_id + 1, doc):
+            chunk += (b"," if annotation_id else b"") + dumps(annotation)
+            annotation_id += 1
+            categories.add(annotation["category_id"])
+        if len(chunk) >= EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+
+    names = await _class_names(source)
+    chunk += b'],"categories":' + dumps([
+        {"id": c, "name": names[c] if 0 <= c < len(names) else str(c)} for c in sorted(categories)
+    ]) + b"}"
+    yield bytes(chunk)
+
+
+async def _voc_export(dataset_name: str, source: str, query: Optional[dict] = None):
+    archive = ZipStream()
+    pending = bytearray()
+    names = await _class_names(source)
+    async for doc in _export_cursor(source, {"image_name": 1, "width": 1, "height": 1, "labels": 1}, query):
+        stem = os.path.splitext(doc["image_name"])[0]
+        pending += archive.add(f"Annotations/{stem}.xml", voc_annotation(dataset_name, doc, names))
+        if len(pending) >= EXPORT_CHUNK_BYTES:
+            yield bytes(pending)
+            pending.clear()
+
+    # One pass per split for the image set lists, written as they are read
+    for split, image_set in VOC_SPLITS.items():
+        with archive.open(f"ImageSets/Main/{image_set}.txt") as entry:
+            async for doc in _export_cursor(source, {"image_name": 1}, {**(query or {}), "split": split}):
+                entry.write(os.path.splitext(doc["image_name"])[0].encode() + b"\n")
+                pending += archive.drain()
+                if len(pending) >= EXPORT_CHUNK_BYTES:
+                    yield bytes(pending)
+                    pending.clear()
+    pending += archive.drain() + archive.close()
+    yield bytes(pending)
@@ -1,13 +1,27 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dataset.router import router as dataset_router
+from dataset.services import ensure_indexes, migrate_embedded_images
+from utils.metrics import MetricsMiddleware, CONTENT_TYPE_LATEST, generate_latest
+from utils.pool import shutdown_process_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ensure_indexes()
+    await migrate_embedded_images()
+    yield
+    shutdown_process_pool()
+
 
 app = FastAPI(
     title="Dataset API",
     description="API for managing datasets",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -16,5 +30,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
+app.add_middleware(MetricsMiddleware)
 app.include_router(dataset_router, prefix="/datasets")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -21,6 +21,48 @@ def temp_directory():
         yield temp_dir
 
 
+@pytest.fixture
+def fake_db():
+    """Swap the service collections for the in-memory Mongo stand-in."""
+    from dataset import services
+    from benchmarks.fake_mongo import install
+
+    originals = dict(vars(services))
+    database = install(services)
+    asyncio.run(services.ensure_indexes())
+    yield database
+    for name, value in originals.items():
+        setattr(services, name, value)
+
+
+@pytest.fixture
+def workdir(temp_directory, monkeypatch, fake_db):
+    """Run in a temporary directory, so ``datasets/`` scratch space is per test, against the in-memory store."""
+    monkeypatch.chdir(temp_directory)
+    return fake_db
+
+
+@pytest.fixture
+def dataset_zip():
+    """Build a YOLO dataset ZIP rooted at ``ds/``, as an upload of ``ds.zip`` would be."""
+    def _build(images=3, label="0", split="train", stem="image{i}", files=None):
+        # ``label`` and ``split`` are either fixed or a function of the image index;
+        # ``files`` adds entries by their path below ``ds/``
+        import io
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for i in range(images):
+                folder = split(i) if callable(split) else split
+                name = stem.format(i=i)
+                zf.writestr(f"ds/{folder}/images/{name}.jpg", b"fake image data")
+                zf.writestr(f"ds/{folder}/labels/{name}.txt", f"{label(i) if callable(label) else label} 0.5 0.5 0.2 0.3")
+            for path, data in (files or {}).items():
+                zf.writestr(f"ds/{path}", data)
+        return buffer.getvalue()
+
+    return _build
+
+
 @pytest.fixture
 def create_test_zip():
     """Create a test ZIP file with YOLO structure."""
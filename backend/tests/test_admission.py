@@ -0,0 +1,148 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset import services
+from utils.admission import AdmissionRejected, IngestScheduler
+
+
+async def _hold(scheduler, client, nbytes, release, positions=None):
+    async with scheduler.admit(client, nbytes, positions.append if positions is not None else None):
+        await release.wait()
+
+
+class TestIngestScheduler:
+    """Test cases for upload admission control."""
+
+    @pytest.mark.asyncio
+    async def test_queues_beyond_concurrency(self):
+        """Uploads past the concurrency limit wait in FIFO order and learn their position."""
+        scheduler = IngestScheduler(max_concurrent=1, max_per_client=5)
+        release = asyncio.Event()
+        positions = []
+
+        first = asyncio.create_task(_hold(scheduler, "a", 1, release))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_hold(scheduler, "b", 1, release, positions))
+        await asyncio.sleep(0)
+
+        assert scheduler.running == 1
+        assert positions == [1]
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert positions == [1, None]
+        assert scheduler.running == 0 and scheduler.scratch_bytes == 0 and not scheduler.clients
+
+    @pytest.mark.asyncio
+    async def test_scratch_budget(self):
+        """An upload waits until enough scratch space is released."""
+        scheduler = IngestScheduler(max_concurrent=5, max_scratch_bytes=100, max_per_client=5)
+        release = asyncio.Event()
+
+        first = asyncio.create_task(_hold(scheduler, "a", 80, release))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_hold(scheduler, "a", 30, release))
+        await asyncio.sleep(0)
+        assert scheduler.running == 1
+
+        release.set()
+        await asyncio.gather(first, second)
+
+    @pytest.mark.asyncio
+    async def test_rejections(self):
+        """Oversized uploads, greedy clients and a full queue are turned away."""
+        scheduler = IngestScheduler(max_concurrent=1, max_scratch_bytes=100, max_per_client=1, queue_size=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(_hold(scheduler, "a", 1, release))
+        queued = asyncio.create_task(_hold(scheduler, "b", 1, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as too_large:
+            async with scheduler.admit("c", 101):
+                pass
+        with pytest.raises(AdmissionRejected) as greedy:
+            async with scheduler.admit("a", 1):
+                pass
+        with pytest.raises(AdmissionRejected) as full:
+            async with scheduler.admit("c", 1):
+                pass
+
+        assert (too_large.value.reason, too_large.value.retry_after) == ("too_large", None)
+        assert greedy.value.reason == "client"
+        assert full.value.reason == "queue_full" and full.value.retry_after >= 1
+        release.set()
+        await asyncio.gather(running, queued)
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_frees_the_place(self):
+        """A waiter that times out leaves the queue."""
+        scheduler = IngestScheduler(max_concurrent=1, queue_timeout=0.01)
+        release = asyncio.Event()
+        running = asyncio.create_task(_hold(scheduler, "a", 1, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as timeout:
+            async with scheduler.admit("b", 1):
+                pass
+
+        assert timeout.value.reason == "timeout"
+        assert not scheduler._waiters and "b" not in scheduler.clients
+        release.set()
+        await running
+
+
+class TestUploadBackpressure:
+    """Rejected uploads surface as HTTP errors."""
+
+    def test_full_queue_returns_429(self, monkeypatch):
+        """When nothing can run or queue, the upload gets 429 with Retry-After."""
+        monkeypatch.setattr(services, "ingest_scheduler", IngestScheduler(max_concurrent=0, queue_size=0))
+
+        response = TestClient(app).post(
+            "/datasets/upload", files={"file": ("ds.zip", io.BytesIO(b"PK"), "application/zip")}
+        )
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_oversized_upload_returns_413(self, monkeypatch):
+        """Uploads that could never fit the scratch budget get 413."""
+        monkeypatch.setattr(services, "ingest_scheduler", IngestScheduler(max_scratch_bytes=10))
+
+        response = TestClient(app).post(
+            "/datasets/upload", files={"file": ("ds.zip", io.BytesIO(b"x" * 100), "application/zip")}
+        )
+
+        assert response.status_code == 413
+
+    def test_stream_needs_content_length(self):
+        """Chunked bodies have no size to admit against and get 411."""
+        response = TestClient(app).post(
+            "/datasets/upload/stream?filename=ds.tar", content=iter([b"x" * 10])
+        )
+
+        assert response.status_code == 411
+
+    @pytest.mark.asyncio
+    async def test_stream_is_rejected_before_its_body_is_read(self, monkeypatch):
+        """A streamed upload that cannot be admitted never has its body read."""
+        from fastapi import HTTPException
+        from utils.file_processing import StreamedUpload
+
+        async def body():
+            pytest.fail("the body was read")
+            yield b""
+
+        monkeypatch.setattr(services, "ingest_scheduler", IngestScheduler(max_scratch_bytes=10))
+
+        with pytest.raises(HTTPException) as rejected:
+            await services.handle_upload(StreamedUpload("ds.tar", body(), 100))
+        assert rejected.value.status_code == 413
@@ -0,0 +1,68 @@
+import os
+import sys
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generator import generate_zip
+from benchmarks.bench_ingest import compare
+from utils.yolo import validate_yolo_structure, parse_labels
+
+
+class TestGenerator:
+    """Test cases for the synthetic dataset generator."""
+
+    def test_generated_archive_is_valid_yolo(self, temp_directory):
+        """Generated archives pass validation and parse to the requested image count."""
+        zip_path = Path(temp_directory) / "synthetic.zip"
+        summary = generate_zip(str(zip_path), images=30, image_sizes=[(32, 24)], seed=1)
+
+        with zipfile.ZipFile(zip_path) as zf:
+            zf.extractall(temp_directory)
+        root = Path(temp_directory) / "dataset"
+
+        validate_yolo_structure(str(root))
+        with patch("shutil.copy"), patch("os.makedirs"):
+            images, labels = parse_labels(str(root), "synthetic")
+
+        assert len(images) == 30
+        assert sum(summary["splits"].values()) == 30
+        assert sum(len(v) for v in labels.values()) == summary["label_lines"]
+
+    def test_malformed_lines_are_skipped_by_parser(self, temp_directory):
+        """Malformed label lines are generated and dropped by parse_labels."""
+        zip_path = Path(temp_directory) / "malformed.zip"
+        summary = generate_zip(
+            str(zip_path), images=20, boxes_per_image=(5, 5), image_sizes=[(16, 16)], malformed_rate=0.5, seed=2
+        )
+
+        with zipfile.ZipFile(zip_path) as zf:
+            zf.extractall(temp_directory)
+        with patch("shutil.copy"), patch("os.makedirs"):
+            _, labels = parse_labels(str(Path(temp_directory) / "dataset"), "malformed")
+
+        assert sum(len(v) for v in labels.values()) < summary["label_lines"]
+
+    def test_same_seed_is_deterministic(self, temp_directory):
+        """The same seed produces the same archive contents."""
+        a, b = Path(temp_directory) / "a.zip", Path(temp_directory) / "b.zip"
+        generate_zip(str(a), images=10, image_sizes=[(16, 16)], seed=3)
+        generate_zip(str(b), images=10, image_sizes=[(16, 16)], seed=3)
+
+        with zipfile.ZipFile(a) as za, zipfile.ZipFile(b) as zb:
+            assert za.namelist() == zb.namelist()
+            assert all(za.read(n) == zb.read(n) for n in za.namelist())
+
+
+class TestCompare:
+    """Test cases for regression detection against a baseline run."""
+
+    def test_flags_throughput_drop(self):
+        """Benchmarks slower than the tolerance are reported as regressions."""
+        baseline = {"results": [{"benchmark": "parse", "images_per_s": 1000}, {"benchmark": "extract", "images_per_s": 1000}]}
+        current = {"results": [{"benchmark": "parse", "images_per_s": 800}, {"benchmark": "extract", "images_per_s": 950}]}
+
+        assert compare(current, baseline, tolerance=0.1) == ["parse"]
+        assert current["results"][1]["vs_baseline"] == 0.95
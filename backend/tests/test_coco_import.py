@@ -0,0 +1,155 @@
+import io
+import json
+import os
+import sys
+import zipfile
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset import services
+from dataset.services import handle_upload
+from utils.coco import iter_annotations, search_dirs, resolve_image, split_of, to_yolo_label
+
+
+def _coco(images=2, annotations_first=False):
+    document = {
+        "categories": [{"id": 3, "name": "dog"}, {"id": 1, "name": "cat"}],
+        "images": [
+            {"id": 10 + i, "file_name": f"img{i}.jpg", "width": 200, "height": 100} for i in range(images)
+        ],
+        "annotations": [
+            {"id": 1, "image_id": 10, "category_id": 1, "bbox": [50, 40, 100, 20], "area": 2000, "iscrowd": 0},
+            {"id": 2, "image_id": 10, "category_id": 3, "bbox": [0, 0, 200, 100], "area": 20000, "iscrowd": 0},
+            {"id": 3, "image_id": 99, "category_id": 1, "bbox": [0, 0, 1, 1], "area": 1, "iscrowd": 0},
+        ],
+    }
+    if annotations_first:
+        document = {key: document[key] for key in ("annotations", "categories", "images")}
+    return json.dumps(document)
+
+
+def _coco_zip(annotation=None, images=2, annotation_name="annotations/instances_train.json"):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr(f"ds/{annotation_name}", annotation if annotation is not None else _coco(images))
+        for i in range(images):
+            zf.writestr(f"ds/images/img{i}.jpg", b"fake image data")
+    return buffer.getvalue()
+
+
+class TestCocoHelpers:
+    """Test cases for the COCO reading helpers."""
+
+    def test_to_yolo_label(self):
+        """Pixel top-left boxes become normalized centre boxes."""
+        assert to_yolo_label(0, [50, 40, 100, 20], 200, 100) == {
+            "class": "0", "bbox": ["0.500000", "0.500000", "0.500000", "0.200000"]
+        }
+        assert to_yolo_label(0, [50, 40, 100, 20], None, 100) is None
+
+    def test_split_of(self):
+        """The split comes from the annotation file name."""
+        assert split_of("annotations/instances_val2017.json") == "valid"
+        assert split_of("test.json") == "test"
+        assert split_of("instances_train2017.json") == "train"
+
+    def test_images_are_found_in_common_layouts(self, temp_directory):
+        """Images next to the annotations, under images/ or a split folder are all resolved."""
+        os.makedirs(os.path.join(temp_directory, "annotations"))
+        os.makedirs(os.path.join(temp_directory, "train2017"))
+        open(os.path.join(temp_directory, "train2017", "a.jpg"), "wb").close()
+        annotation = os.path.join(temp_directory, "annotations", "instances_train2017.json")
+
+        dirs = search_dirs(temp_directory, annotation)
+
+        assert resolve_image("a.jpg", dirs, temp_directory) == os.path.join(temp_directory, "train2017", "a.jpg")
+        assert resolve_image("missing.jpg", dirs, temp_directory) is None
+
+    def test_names_outside_the_archive_are_refused(self, temp_directory):
+        """Absolute names, .. and links out of the extraction root never resolve."""
+        root = os.path.join(temp_directory, "extracted")
+        victim = os.path.join(temp_directory, "images", "victim")
+        os.makedirs(os.path.join(root, "images"))
+        os.makedirs(victim)
+        open(os.path.join(victim, "secret.jpg"), "wb").close()
+        os.symlink(victim, os.path.join(root, "images", "linked"))
+        dirs = [os.path.join(root, "images")]
+
+        assert resolve_image("../../images/victim/secret.jpg", dirs, root) is None
+        assert resolve_image(os.path.join(victim, "secret.jpg"), dirs, root) is None
+        assert resolve_image("linked/secret.jpg", dirs, root) is None
+
+    def test_annotations_are_streamed(self, temp_directory):
+        """Annotations are read one by one from the file."""
+        path = os.path.join(temp_directory, "a.json")
+        with open(path, "w") as fh:
+            fh.write(_coco())
+
+        annotations = iter_annotations(path)
+
+        assert next(annotations) == {"image_id": 10, "category_id": 1, "bbox": [50.0, 40.0, 100.0, 20.0]}
+
+
+class TestCocoImport:
+    """Archives with COCO annotations instead of the YOLO layout are imported."""
+
+    @pytest.mark.asyncio
+    async def test_import(self, workdir):
+        """Images, converted labels, class names and pages are stored like a YOLO ingest."""
+        result = await handle_upload(UploadFile(file=io.BytesIO(_coco_zip()), filename="ds.zip"))
+
+        assert result["dataset"] == "ds"
+        dataset = await workdir.datasets.find_one({"name": "ds"})
+        assert dataset["status"] == "completed" and dataset["total_images"] == 2
+        assert dataset["classes"] == ["cat", "dog"]
+
+        first = await workdir.images.find_one({"dataset": "ds", "image_name": "img0.jpg"})
+        assert first["split"] == "train" and (first["width"], first["height"]) == (200, 100)
+        assert first["labels"] == [
+            {"class": "0", "bbox": ["0.500000", "0.500000", "0.500000", "0.200000"]},
+            {"class": "1", "bbox": ["0.500000", "0.500000", "1.000000", "1.000000"]},
+        ]
+        assert "coco_ref" not in first
+        assert (await workdir.images.find_one({"image_name": "img1.jpg"}))["labels"] == []
+        assert sorted(os.listdir(os.path.join("datasets", "images", "ds"))) == ["img0.jpg", "img1.jpg"]
+
+        page = json.loads((await workdir.pages.find_one({"dataset": "ds", "page": 1}))["body"])
+        assert page["total_images"] == 2 and page["images"][0]["labels"] == first["labels"]
+
+    @pytest.mark.asyncio
+    async def test_import_in_small_batches(self, workdir, monkeypatch):
+        """Batching never changes the result, whatever the key order in the file."""
+        monkeypatch.setattr(services, "COCO_BATCH_SIZE", 1)
+        payload = _coco_zip(_coco(images=45, annotations_first=True), images=45)
+
+        await handle_upload(UploadFile(file=io.BytesIO(payload), filename="ds.zip"))
+
+        assert await workdir.images.count_documents({"dataset": "ds"}) == 45
+        assert await workdir.pages.count_documents({"dataset": "ds"}) == 3
+        labelled = await workdir.images.find_one({"image_name": "img0.jpg"})
+        assert len(labelled["labels"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_annotations(self, workdir):
+        """A truncated annotation file is rejected and the name is released."""
+        payload = _coco_zip(_coco()[:60])
+
+        with pytest.raises(HTTPException) as invalid:
+            await handle_upload(UploadFile(file=io.BytesIO(payload), filename="ds.zip"))
+
+        assert invalid.value.status_code == 400
+        assert await workdir.datasets.count_documents({}) == 0
+        assert await workdir.images.count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_export_keeps_category_names(self, workdir):
+        """Exporting an imported dataset to COCO names its categories as the import did."""
+        await handle_upload(UploadFile(file=io.BytesIO(_coco_zip()), filename="ds.zip"))
+
+        chunks, _, _ = await services.export_dataset("ds", "coco")
+        exported = json.loads(b"".join([chunk async for chunk in chunks]))
+
+        assert exported["categories"] == [{"id": 0, "name": "cat"}, {"id": 1, "name": "dog"}]
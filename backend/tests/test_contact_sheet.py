@@ -0,0 +1,111 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.contact_sheet import render_sheet
+from utils.metrics import CACHE_REQUESTS
+
+
+def _write_image(path, color, size=(64, 48)):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", size, color).save(path, "JPEG")
+
+
+@pytest.fixture
+def sheet_dataset(workdir):
+    """A 23-image dataset with real JPEGs on disk; image03 has no file."""
+    names = [f"image{i:02d}.jpg" for i in range(23)]
+    for i, name in enumerate(names):
+        if i != 3:
+            _write_image(os.path.join("datasets", "images", "ds", name), (i * 10, 0, 0))
+
+    async def seed():
+        await workdir.images.insert_many([{"dataset": "ds", "image_name": name, "labels": []} for name in names])
+        await workdir.datasets.insert_one({"name": "ds", "status": "completed", "total_images": len(names)})
+
+    asyncio.run(seed())
+    return names
+
+
+class TestRenderSheet:
+    """Test cases for the contact-sheet renderer."""
+
+    def test_grid_geometry_and_tiles(self, temp_directory):
+        """Tiles are laid out row-major and the sheet is sized to whole rows."""
+        for i in range(7):
+            _write_image(os.path.join(temp_directory, "src", f"{i}.jpg"), (0, i * 30, 0))
+        output = os.path.join(temp_directory, "out", "sheet.jpg")
+
+        tile_map = render_sheet(os.path.join(temp_directory, "src"), [f"{i}.jpg" for i in range(7)], 32, 5, output)
+
+        assert (tile_map["columns"], tile_map["rows"]) == (5, 2)
+        assert (tile_map["width"], tile_map["height"]) == (160, 64)
+        assert tile_map["tiles"][6] == {"image_name": "6.jpg", "x": 32, "y": 32, "width": 32, "height": 32, "missing": False}
+        with Image.open(output) as sheet:
+            assert sheet.size == (160, 64)
+            assert os.path.exists(os.path.join(temp_directory, "out", "sheet.json"))
+
+    def test_unreadable_images_are_flagged(self, temp_directory):
+        """Missing files leave an empty tile instead of failing the sheet."""
+        output = os.path.join(temp_directory, "sheet.jpg")
+
+        tile_map = render_sheet(temp_directory, ["nope.jpg"], 32, 5, output)
+
+        assert tile_map["tiles"][0]["missing"] is True
+        assert os.path.exists(output)
+
+
+class TestSheetEndpoints:
+    """Test cases for GET /datasets/{name}/images/sheet and /sheet/map."""
+
+    def test_map_matches_page(self, sheet_dataset):
+        """The tile map lists the page's images in grid order."""
+        response = TestClient(app).get("/datasets/ds/images/sheet/map?page=1&tile=32")
+
+        assert response.status_code == 200
+        tile_map = response.json()
+        assert [t["image_name"] for t in tile_map["tiles"]] == sheet_dataset[:20]
+        assert tile_map["tiles"][3]["missing"] is True
+        assert tile_map["rows"] == 4
+
+    def test_sheet_is_cached_on_disk(self, sheet_dataset):
+        """The second request for a page is served from the on-disk cache."""
+        client = TestClient(app)
+        hits = CACHE_REQUESTS.labels("contact_sheet", "hit")
+        before = hits._value.get()
+
+        first = client.get("/datasets/ds/images/sheet?page=2&tile=32")
+        second = client.get("/datasets/ds/images/sheet?page=2&tile=32")
+
+        assert first.status_code == second.status_code == 200
+        assert first.headers["content-type"] == "image/jpeg"
+        assert first.content == second.content
+        assert hits._value.get() == before + 1
+        with Image.open(io.BytesIO(first.content)) as sheet:
+            assert sheet.size == (160, 32)
+
+    def test_sheet_and_map_are_revalidated(self, sheet_dataset):
+        """Sheets are rewritten by a re-sync, so clients revalidate them against the sheet's ETag."""
+        client = TestClient(app)
+        sheet = client.get("/datasets/ds/images/sheet?page=2&tile=32")
+        etag = sheet.headers["etag"]
+
+        assert sheet.headers["cache-control"] == "no-cache"
+        assert client.get("/datasets/ds/images/sheet/map?page=2&tile=32").headers["etag"] == etag
+        for path in ("/datasets/ds/images/sheet", "/datasets/ds/images/sheet/map"):
+            assert client.get(f"{path}?page=2&tile=32", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_unknown_dataset_and_page(self, sheet_dataset):
+        """Unknown datasets are a 404 and pages past the end a 400."""
+        client = TestClient(app)
+        assert client.get("/datasets/nope/images/sheet").status_code == 404
+        assert client.get("/datasets/ds/images/sheet/map?page=9").status_code == 400
+        assert client.get("/datasets/ds/images/sheet?tile=8").status_code == 422
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import os
+import sys
+from datetime import datetime, timedelta
+
+import bson
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+
+
+def _seed(fake_db, count=25):
+    start = datetime(2024, 1, 1)
+    docs = [
+        {
+            "name": f"{'cats' if i % 2 else 'dogs'}_{i:02d}",
+            "status": "completed",
+            # Pairs share a timestamp so paging has to break ties on _id
+            "created_at": start + timedelta(minutes=i // 2),
+            "total_images": (i * 7) % 10,
+            "images": {"legacy.jpg": []},
+        }
+        for i in range(count)
+    ]
+    asyncio.run(fake_db.datasets.insert_many(docs))
+
+
+def _walk(client, **params):
+    names, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/datasets/", params=query)
+        assert response.status_code == 200
+        names += [d["name"] for d in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return names, pages
+
+
+class TestDatasetListing:
+    """Test cases for paging, sorting and searching GET /datasets/."""
+
+    def test_default_is_newest_first_with_lean_projection(self, fake_db):
+        """Without parameters the newest datasets come first and only listing fields are returned."""
+        _seed(fake_db)
+
+        data = TestClient(app).get("/datasets/").json()
+
+        assert len(data) == 25
+        assert data[0]["name"] == "dogs_24"
+        assert set(data[0]) == {"_id", "name", "status", "created_at", "total_images"}
+
+    def test_cursor_walks_every_dataset_once(self, fake_db):
+        """Keyset paging returns each dataset exactly once, even across tied sort values."""
+        _seed(fake_db)
+        client = TestClient(app)
+
+        for sort in ("created_at", "name", "total_images"):
+            for order in ("asc", "desc"):
+                names, pages = _walk(client, limit=4, sort=sort, order=order)
+                assert sorted(names) == sorted(set(names)) and len(names) == 25
+                assert pages == 7
+
+        names, _ = _walk(client, limit=4, sort="name", order="asc")
+        assert names == sorted(names)
+
+    def test_prefix_search(self, fake_db):
+        """prefix matches the start of the name only."""
+        _seed(fake_db)
+
+        names, _ = _walk(TestClient(app), limit=5, sort="name", order="asc", prefix="cats")
+
+        assert names == [f"cats_{i:02d}" for i in range(1, 25, 2)]
+
+    def test_bad_cursor(self, fake_db):
+        """Garbage and cursors from another sort order are rejected."""
+        _seed(fake_db)
+        client = TestClient(app)
+        cursor = client.get("/datasets/", params={"limit": 2, "sort": "name"}).headers["X-Next-Cursor"]
+
+        assert client.get("/datasets/", params={"cursor": "not-a-cursor"}).status_code == 400
+        assert client.get("/datasets/", params={"cursor": cursor, "sort": "total_images"}).status_code == 400
+        assert client.get("/datasets/", params={"sort": "status"}).status_code == 422
+
+    def test_cursor_without_position(self, fake_db):
+        """A well-formed cursor that lacks the last value or id is invalid, not a server error."""
+        client = TestClient(app)
+        for state in ({"s": "created_at", "d": -1}, {"s": "created_at", "d": -1, "v": None}):
+            cursor = base64.urlsafe_b64encode(bson.encode(state)).decode().rstrip("=")
+            response = client.get("/datasets/", params={"cursor": cursor})
+            assert response.status_code == 400 and response.json()["detail"] == "Invalid cursor"
+
+    def test_listing_across_statuses_is_indexed(self, fake_db, monkeypatch):
+        """status=all sorts, with or without a prefix, have an index in their sort order."""
+        from dataset import services
+
+        created = []
+
+        async def record(keys, **kwargs):
+            created.append([field for field, _ in keys] if isinstance(keys, list) else [keys])
+
+        monkeypatch.setattr(fake_db.datasets, "create_index", record)
+        asyncio.run(services.ensure_indexes())
+
+        for sort in ("created_at", "total_images"):
+            assert [sort, "_id", "name"] in created
+        assert ["name", "_id"] in created
@@ -0,0 +1,156 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.derivatives import DerivativeCache, derivative_key, negotiate, transcode
+
+WEBP_ACCEPT = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+
+
+def _photo(size=(320, 240)):
+    # Smooth gradients compress far better as WebP than as a high-quality JPEG
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(workdir, dataset_zip):
+    client = TestClient(app)
+    payload = dataset_zip(0, files={"train/images/photo.jpg": _photo(), "train/labels/photo.txt": "0 0.5 0.5 0.2 0.3"})
+    response = client.post("/datasets/upload", files={"file": ("ds.zip", payload, "application/zip")})
+    assert response.status_code == 200
+    return client
+
+
+class TestNegotiation:
+    """Test cases for picking a derivative format from Accept."""
+
+    def test_explicit_formats_only(self):
+        """Wildcards and refused types do not select a derivative."""
+        assert negotiate(WEBP_ACCEPT, ["avif", "webp"]) == "avif"
+        assert negotiate(WEBP_ACCEPT, ["webp"]) == "webp"
+        assert negotiate("image/webp;q=0, image/avif", ["webp"]) is None
+        assert negotiate("image/*,*/*", ["avif", "webp"]) is None
+        assert negotiate(None, ["webp"]) is None
+
+
+class TestDerivativeCache:
+    """Test cases for the size-bounded derivative store."""
+
+    def _store(self, cache, key, size):
+        os.makedirs(os.path.dirname(cache.path(key)), exist_ok=True)
+        with open(cache.path(key), "wb") as fh:
+            fh.write(b"x" * size)
+        if cache.added(key):
+            cache.replace(*cache.maintain())
+
+    def test_least_recently_used_is_evicted(self, temp_directory, monkeypatch):
+        """Going over budget drops the oldest entries; hits keep an entry alive."""
+        monkeypatch.setattr("utils.derivatives.TOUCH_INTERVAL", 0)
+        cache = DerivativeCache(os.path.join(temp_directory, "derivatives"), max_bytes=250)
+        self._store(cache, "aa1.webp", 100)
+        self._store(cache, "bb2.webp", 100)
+        os.utime(cache.path("aa1.webp"), (1, 1))
+        os.utime(cache.path("bb2.webp"), (2, 2))
+        assert cache.lookup("aa1.webp")
+
+        self._store(cache, "cc3.webp", 100)
+
+        assert cache.lookup("bb2.webp") is None
+        assert cache.lookup("aa1.webp") and cache.lookup("cc3.webp")
+
+    @pytest.mark.asyncio
+    async def test_rescan_runs_off_the_event_loop(self, temp_directory, monkeypatch):
+        """The directory walk after a write happens in a worker thread, not in the done-callback."""
+        import threading
+        from dataset import services
+
+        cache = DerivativeCache(os.path.join(temp_directory, "derivatives"), max_bytes=250)
+        threads = []
+        maintain = cache.maintain
+
+        def record():
+            threads.append(threading.get_ident())
+            return maintain()
+
+        monkeypatch.setattr(cache, "maintain", record)
+        monkeypatch.setattr(services, "derivative_cache", cache)
+        os.makedirs(os.path.dirname(cache.path("aa1.webp")))
+        with open(cache.path("aa1.webp"), "wb") as fh:
+            fh.write(b"x" * 100)
+        encode = asyncio.get_running_loop().create_future()
+        encode.set_result(100)
+
+        services._derivative_written("aa1.webp", encode)
+        await services._derivative_maintenance
+
+        assert threads and threads[0] != threading.get_ident()
+        assert not cache.added("aa1.webp") and cache.lookup("aa1.webp")
+
+    def test_key_follows_the_original(self, temp_directory):
+        """Keys change with the file and are shared through links."""
+        source = os.path.join(temp_directory, "a.jpg")
+        link = os.path.join(temp_directory, "b.jpg")
+        open(source, "wb").close()
+        os.symlink(source, link)
+
+        assert derivative_key(source, 10, 1, "webp") == derivative_key(link, 10, 1, "webp")
+        assert derivative_key(source, 10, 1, "webp") != derivative_key(source, 10, 2, "webp")
+        assert derivative_key(source, 10, 1, "webp").endswith(".webp")
+
+    def test_transcode(self, temp_directory):
+        """Encodings that are not smaller leave an empty marker."""
+        source = os.path.join(temp_directory, "photo.jpg")
+        with open(source, "wb") as fh:
+            fh.write(_photo())
+        target = os.path.join(temp_directory, "out", "photo.webp")
+
+        size = transcode(source, target, "webp")
+        assert size and size < os.path.getsize(source)
+        with Image.open(target) as img:
+            assert img.format == "WEBP"
+
+        with open(source, "wb") as fh:
+            fh.write(b"not an image")
+        assert transcode(source, target, "webp") is None
+        assert os.path.getsize(target) == 0
+
+
+class TestImageNegotiationEndpoint:
+    """The image endpoint serves derivatives to clients that accept them."""
+
+    def test_webp_with_etag(self, client, monkeypatch):
+        """A WebP client gets a smaller, cacheable derivative and a 304 on revalidation."""
+        # Pin the format so the test does not depend on this Pillow build's AVIF support
+        monkeypatch.setattr("dataset.services.negotiate", lambda accept: negotiate(accept, ["webp"]))
+
+        response = client.get("/datasets/ds/image/photo.jpg", headers={"Accept": WEBP_ACCEPT})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert "Accept" in response.headers["vary"]
+        assert len(response.content) < len(_photo())
+        etag = response.headers["etag"]
+
+        again = client.get("/datasets/ds/image/photo.jpg", headers={"Accept": WEBP_ACCEPT, "If-None-Match": etag})
+        assert again.status_code == 304 and again.headers["etag"] == etag
+
+    def test_original_without_accept(self, client):
+        """Clients that name no modern format get the uploaded bytes unchanged."""
+        response = client.get("/datasets/ds/image/photo.jpg", headers={"Accept": "*/*"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.content == _photo()
+        assert "Accept" in response.headers["vary"]
+        assert not os.path.exists(os.path.join("datasets", "derivatives"))
@@ -0,0 +1,133 @@
+import asyncio
+import io
+import json
+import os
+import sys
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset import services
+from utils.export import coco_annotations, voc_annotation, yolo_to_pixels
+
+
+def _image(name, split="train", labels=None, width=200, height=100):
+    return {
+        "dataset": "ds",
+        "image_name": name,
+        "split": split,
+        "labels": labels if labels is not None else [{"class": "1", "bbox": ["0.5", "0.5", "0.5", "0.2"]}],
+        "width": width,
+        "height": height,
+        "phash": None,
+    }
+
+
+@pytest.fixture
+def exported(fake_db):
+    async def seed(images):
+        await fake_db.datasets.insert_one({"name": "ds", "status": "completed", "total_images": len(images)})
+        await fake_db.images.insert_many(images)
+    return lambda images: asyncio.run(seed(images))
+
+
+class TestConversion:
+    """Test cases for YOLO to COCO/VOC geometry."""
+
+    def test_yolo_to_pixels(self):
+        """Centre-based normalized boxes become top-left pixel boxes."""
+        assert yolo_to_pixels(["0.5", "0.5", "0.5", "0.2"], 200, 100) == (50.0, 40.0, 100.0, 20.0)
+        assert yolo_to_pixels(["0.5", "x", "0.5", "0.2"], 200, 100) is None
+
+    def test_annotations_need_dimensions(self):
+        """Images whose size is unknown and malformed labels produce no annotations."""
+        assert coco_annotations(1, 1, _image("a.jpg", width=None, height=None)) == []
+        doc = _image("a.jpg", labels=[{"class": "cat", "bbox": ["0.5"] * 4}, {"class": "2", "bbox": ["0.5"] * 4}])
+        assert [a["category_id"] for a in coco_annotations(1, 7, doc)] == [2]
+
+    def test_voc_box_is_one_based(self):
+        """VOC corners are 1-based and clipped to the image."""
+        root = ElementTree.fromstring(voc_annotation("ds", _image("a.jpg", labels=[{"class": "0", "bbox": ["0.5", "0.5", "1", "1"]}])))
+        box = root.find("object/bndbox")
+        assert [int(box.find(tag).text) for tag in ("xmin", "ymin", "xmax", "ymax")] == [1, 1, 200, 100]
+        assert root.find("size/width").text == "200"
+
+    def test_voc_objects_are_named(self):
+        """Objects carry the imported class name, or the id when the class has none."""
+        labels = [{"class": "0", "bbox": ["0.5"] * 4}, {"class": "2", "bbox": ["0.5"] * 4}]
+        root = ElementTree.fromstring(voc_annotation("ds", _image("a.jpg", labels=labels), ["cat & dog", "bird"]))
+        assert [name.text for name in root.findall("object/name")] == ["cat & dog", "2"]
+
+
+class TestExportEndpoint:
+    """Test cases for GET /datasets/{name}/export."""
+
+    def test_coco_export(self, exported):
+        """The COCO document lists every image, its annotations and the categories used."""
+        exported([_image("b.jpg"), _image("a.jpg", split="valid", labels=[]), _image("c.jpg", width=None, height=None)])
+
+        response = TestClient(app).get("/datasets/ds/export?format=coco")
+
+        assert response.status_code == 200
+        assert 'filename="ds_coco.json"' in response.headers["content-disposition"]
+        coco = response.json()
+        assert [(i["id"], i["file_name"]) for i in coco["images"]] == [(1, "a.jpg"), (2, "b.jpg"), (3, "c.jpg")]
+        assert coco["annotations"] == [
+            {"id": 1, "image_id": 2, "category_id": 1, "bbox": [50.0, 40.0, 100.0, 20.0], "area": 2000.0, "iscrowd": 0}
+        ]
+        assert coco["categories"] == [{"id": 1, "name": "1"}]
+
+    def test_voc_export(self, exported):
+        """The VOC archive holds one XML per image and the image sets per split."""
+        exported([_image("a.jpg"), _image("b.jpg", split="valid"), _image("c.jpg", split="test")])
+
+        response = TestClient(app).get("/datasets/ds/export?format=voc")
+
+        assert response.headers["content-type"] == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            assert zf.testzip() is None
+            assert sorted(n for n in zf.namelist() if n.startswith("Annotations/")) == [
+                "Annotations/a.xml", "Annotations/b.xml", "Annotations/c.xml"
+            ]
+            assert zf.read("ImageSets/Main/val.txt") == b"b\n"
+            assert zf.read("ImageSets/Main/train.txt") == b"a\n"
+            assert ElementTree.fromstring(zf.read("Annotations/a.xml")).find("object/name").text == "1"
+
+    def test_voc_export_uses_class_names(self, exported, fake_db):
+        """Datasets imported with category names export them as VOC object names."""
+        exported([_image("a.jpg")])
+        asyncio.run(fake_db.datasets.update_one({"name": "ds"}, {"$set": {"classes": ["cat", "dog"]}}))
+
+        response = TestClient(app).get("/datasets/ds/export?format=voc")
+
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            assert ElementTree.fromstring(zf.read("Annotations/a.xml")).find("object/name").text == "dog"
+
+    def test_export_is_streamed(self, exported, monkeypatch):
+        """Large exports go out in many chunks that still form one valid document."""
+        monkeypatch.setattr(services, "EXPORT_CHUNK_BYTES", 256)
+        exported([_image(f"img_{i:04d}.jpg") for i in range(200)])
+
+        async def collect(fmt):
+            chunks, _, _ = await services.export_dataset("ds", fmt)
+            return [chunk async for chunk in chunks]
+
+        coco_chunks = asyncio.run(collect("coco"))
+        assert len(coco_chunks) > 10
+        assert len(json.loads(b"".join(coco_chunks))["annotations"]) == 200
+
+        voc_chunks = asyncio.run(collect("voc"))
+        assert len(voc_chunks) > 10
+        with zipfile.ZipFile(io.BytesIO(b"".join(voc_chunks))) as zf:
+            assert len(zf.namelist()) == 203
+
+    def test_export_unknown_dataset(self, fake_db):
+        """Unknown or unpublished datasets are 404; unknown formats are rejected."""
+        client = TestClient(app)
+        assert client.get("/datasets/missing/export").status_code == 404
+        assert client.get("/datasets/missing/export?format=yolo").status_code == 422
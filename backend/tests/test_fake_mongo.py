@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+
+import pytest
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_mongo import InMemoryDatabase
+
+
+@pytest.fixture
+def collection():
+    return InMemoryDatabase().things
+
+
+class TestInMemoryCollection:
+    """Test cases for the in-memory Motor stand-in."""
+
+    @pytest.mark.asyncio
+    async def test_query_operators_and_projection(self, collection):
+        """Equality, $in, ranges, regex and projections behave like Mongo."""
+        await collection.insert_many([
+            {"name": "alpha", "n": 1, "tags": ["a", "b"]},
+            {"name": "beta", "n": 5, "tags": ["b"]},
+            {"name": "gamma", "n": 9},
+        ])
+
+        assert [d["name"] for d in await collection.find({"n": {"$gte": 5}}).sort("n", -1).to_list(None)] == ["gamma", "beta"]
+        assert await collection.count_documents({"tags": "b"}) == 2
+        assert await collection.count_documents({"name": {"$in": ["alpha", "gamma"]}}) == 2
+        assert await collection.count_documents({"name": {"$regex": "^al"}}) == 1
+        assert await collection.count_documents({"name": re.compile("a$")}) == 3
+
+        doc = await collection.find_one({"name": "alpha"}, {"tags": 0, "_id": 0})
+        assert doc == {"name": "alpha", "n": 1}
+        doc = await collection.find_one({"name": "alpha"}, {"n": 1})
+        assert set(doc) == {"_id", "n"}
+
+    @pytest.mark.asyncio
+    async def test_indexed_lookup_and_paging(self, collection):
+        """Indexed $in lookups and sort/skip/limit paging return the right slice."""
+        await collection.create_index([("dataset", 1), ("image_name", 1)], unique=True)
+        await collection.insert_many({"dataset": "d", "image_name": f"{i:03d}.jpg"} for i in range(50))
+
+        page = await collection.find({"dataset": "d"}).sort("image_name", 1).skip(20).limit(5).to_list(None)
+        assert [d["image_name"] for d in page] == [f"{i:03d}.jpg" for i in range(20, 25)]
+
+        found = await collection.find({"dataset": "d", "image_name": {"$in": ["001.jpg", "missing.jpg"]}}).to_list(None)
+        assert [d["image_name"] for d in found] == ["001.jpg"]
+
+    @pytest.mark.asyncio
+    async def test_unique_index(self, collection):
+        """Unique indexes reject duplicates on insert and update."""
+        await collection.create_index("name", unique=True)
+        await collection.insert_one({"name": "a"})
+        await collection.insert_one({"name": "b"})
+
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"name": "a"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.update_one({"name": "b"}, {"$set": {"name": "a"}})
+
+        await collection.delete_one({"name": "a"})
+        await collection.insert_one({"name": "a"})
+
+    @pytest.mark.asyncio
+    async def test_updates(self, collection):
+        """Update operators, upserts and find_one_and_update."""
+        await collection.update_one({"_id": "job"}, {"$set": {"state": "queued"}, "$setOnInsert": {"tries": 0}}, upsert=True)
+        await collection.update_one({"_id": "job"}, {"$inc": {"tries": 1}, "$push": {"log": "started"}})
+
+        doc = await collection.find_one_and_update(
+            {"state": "queued"}, {"$set": {"state": "running"}}, return_document=ReturnDocument.AFTER
+        )
+        assert doc == {"_id": "job", "state": "running", "tries": 1, "log": ["started"]}
+        assert await collection.find_one_and_update({"state": "queued"}, {"$set": {"state": "x"}}) is None
+
+    @pytest.mark.asyncio
+    async def test_returned_documents_are_copies(self, collection):
+        """Mutating a returned document does not change the stored one."""
+        await collection.insert_one({"_id": 1, "labels": [1]})
+        doc = await collection.find_one({"_id": 1})
+        doc["labels"].append(2)
+        assert (await collection.find_one({"_id": 1}))["labels"] == [1]
+
+
+class TestInstall:
+    """install() swaps the Motor collections of a module."""
+
+    def test_install_replaces_service_collections(self, fake_db):
+        """Service collections become in-memory collections with the same name."""
+        from dataset import services
+
+        assert services.dataset_collection is fake_db.datasets
+        assert services.image_collection is fake_db.images
@@ -0,0 +1,114 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset.services import handle_upload
+
+
+@pytest.fixture
+def ingested(workdir, dataset_zip):
+    """A 45-image dataset ingested through handle_upload into the in-memory store."""
+    payload = dataset_zip(45, label=lambda i: i % 3, split=lambda i: ("train", "valid")[i % 2], stem="image{i:02d}")
+    asyncio.run(handle_upload(UploadFile(file=io.BytesIO(payload), filename="ds.zip")))
+    return workdir
+
+
+class TestImageRecords:
+    """Ingest writes one record per image and pages are read from them."""
+
+    def test_ingest_writes_image_records(self, ingested):
+        """Each image gets its own document with split and label data."""
+        records = ingested.images._docs.values()
+        assert len(records) == 45
+        record = next(r for r in records if r["image_name"] == "image01.jpg")
+        assert record["split"] == "valid"
+        assert record["labels"] == [{"class": "1", "bbox": ["0.5", "0.5", "0.2", "0.3"]}]
+        assert "images" not in next(iter(ingested.datasets._docs.values()))
+
+    def test_pages_come_from_image_records(self, ingested):
+        """Paging walks the image records in name order."""
+        client = TestClient(app)
+
+        last = client.get("/datasets/ds/images?page=3").json()
+        assert last["total_images"] == 45
+        assert last["total_pages"] == 3
+        assert [i["image_name"] for i in last["images"]] == [f"image{i:02d}.jpg" for i in range(40, 45)]
+
+    def test_reupload_is_rejected(self, ingested, dataset_zip):
+        """A second upload under an existing name does not overwrite the dataset."""
+        response = TestClient(app).post(
+            "/datasets/upload", files={"file": ("ds.zip", io.BytesIO(dataset_zip(2)), "application/zip")}
+        )
+        assert response.status_code == 409
+
+
+class TestBatchLookup:
+    """Test cases for POST /datasets/{name}/images/batch."""
+
+    def test_batch_returns_labels_and_missing(self, ingested):
+        """Found images come back in request order; unknown names are listed as missing."""
+        response = TestClient(app).post(
+            "/datasets/ds/images/batch",
+            json={"image_names": ["image07.jpg", "nope.jpg", "image02.jpg", "image07.jpg"]},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [i["image_name"] for i in data["images"]] == ["image07.jpg", "image02.jpg"]
+        assert data["images"][0]["split"] == "valid"
+        assert data["images"][0]["labels"][0]["class"] == "1"
+        assert data["missing"] == ["nope.jpg"]
+
+    def test_batch_unknown_dataset(self, fake_db):
+        """Unknown datasets are a 404."""
+        response = TestClient(app).post("/datasets/nope/images/batch", json={"image_names": ["a.jpg"]})
+        assert response.status_code == 404
+
+    def test_batch_size_is_bounded(self, fake_db):
+        """Empty and oversized batches are rejected by validation."""
+        client = TestClient(app)
+        assert client.post("/datasets/ds/images/batch", json={"image_names": []}).status_code == 422
+        names = [f"{i}.jpg" for i in range(5001)]
+        assert client.post("/datasets/ds/images/batch", json={"image_names": names}).status_code == 422
+
+
+class TestLegacyMigration:
+    """Datasets with labels embedded in their document are moved into the image collection."""
+
+    def test_embedded_images_are_migrated(self, workdir):
+        """Pages and lookups read the migrated records; the embedded fields are gone."""
+        from PIL import Image
+        from dataset.services import migrate_embedded_images
+
+        os.makedirs(os.path.join("datasets", "images", "old"))
+        Image.new("RGB", (40, 30)).save(os.path.join("datasets", "images", "old", "a.jpg"))
+        label = {"class": "0", "bbox": ["0.5", "0.5", "0.2", "0.3"]}
+
+        async def migrate():
+            await workdir.datasets.insert_one({
+                "name": "old", "status": "completed", "total_images": 2,
+                "images": {"a.jpg": [label], "b.jpg": []},
+                "phashes": [{"image_name": "a.jpg", "split": "train", "phash": "00000000000000ff"}],
+            })
+            await migrate_embedded_images()
+            # Running it again finds nothing left to do
+            await migrate_embedded_images()
+        asyncio.run(migrate())
+
+        dataset = asyncio.run(workdir.datasets.find_one({"name": "old"}))
+        assert "images" not in dataset and "phashes" not in dataset
+        assert dataset["split_counts"]["train"] == 1
+        client = TestClient(app)
+        page = client.get("/datasets/old/images").json()
+        assert [image["image_name"] for image in page["images"]] == ["a.jpg", "b.jpg"]
+        batch = client.post("/datasets/old/images/batch", json={"image_names": ["a.jpg"]}).json()
+        assert batch["images"][0]["labels"] == [label]
+        assert batch["images"][0]["split"] == "train" and batch["images"][0]["width"] == 40
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import worker
+from main import app
+from dataset import services
+from utils.lease import Lease
+
+
+@pytest.fixture
+def queue_mode(workdir, monkeypatch):
+    monkeypatch.setattr(services, "INGEST_MODE", "queue")
+    return workdir
+
+
+def _enqueue(payload, upload_id=None):
+    client = TestClient(app)
+    params = {"upload_id": upload_id} if upload_id else {}
+    return client.post("/datasets/upload", files={"file": ("ds.zip", payload, "application/zip")}, params=params)
+
+
+async def _run_next_job():
+    lease = Lease(services.job_collection)
+    job = await services.claim_ingest_job(lease)
+    return await services.run_ingest_job(job, lease)
+
+
+class TestEnqueue:
+    """In queue mode the API only stores the archive and enqueues a job."""
+
+    def test_upload_is_queued(self, queue_mode, dataset_zip):
+        """The upload answers 202 with a job id and nothing is ingested yet."""
+        response = _enqueue(dataset_zip())
+
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        job = asyncio.run(queue_mode.ingest_jobs.find_one({"_id": job_id}))
+        assert job["status"] == "queued" and job["dataset"] == "ds" and job["attempts"] == 0
+        assert os.path.exists(job["archive_path"])
+        assert asyncio.run(queue_mode.datasets.count_documents({})) == 0
+
+    def test_job_status_endpoint(self, queue_mode, dataset_zip):
+        """Jobs can be looked up by id."""
+        client = TestClient(app)
+        job_id = _enqueue(dataset_zip()).json()["job_id"]
+
+        assert client.get(f"/datasets/jobs/{job_id}").json()["status"] == "queued"
+        assert client.get("/datasets/jobs/unknown").status_code == 404
+
+    def test_full_queue_is_rejected(self, queue_mode, monkeypatch, dataset_zip):
+        """Uploads get 429 once the queue holds JOB_QUEUE_SIZE jobs."""
+        monkeypatch.setattr(services, "JOB_QUEUE_SIZE", 1)
+        assert _enqueue(dataset_zip()).status_code == 202
+
+        response = _enqueue(dataset_zip())
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == str(services.JOB_RETRY_AFTER)
+
+    def test_progress_is_mirrored_as_queued(self, queue_mode, dataset_zip):
+        """Subscribers see the upload waiting in the queue."""
+        _enqueue(dataset_zip(), upload_id="queued-upload")
+
+        snapshot = asyncio.run(queue_mode.uploads.find_one({"_id": "queued-upload"}))
+        assert snapshot["stage"] == "queued"
+
+
+class TestWorker:
+    """Jobs are claimed and run by worker processes."""
+
+    def test_job_is_ingested(self, queue_mode, dataset_zip):
+        """A claimed job publishes the dataset, records its outcome and clears its scratch space."""
+        job_id = _enqueue(dataset_zip(), upload_id="job-upload").json()["job_id"]
+
+        outcome = asyncio.run(_run_next_job())
+
+        assert outcome["status"] == "completed"
+        job = asyncio.run(queue_mode.ingest_jobs.find_one({"_id": job_id}))
+        assert job["status"] == "completed" and "lease_owner" not in job and job["finished_at"]
+        assert "timing" in job["result"]
+        assert not os.path.exists(job["dataset_path"])
+        dataset = asyncio.run(queue_mode.datasets.find_one({"name": "ds"}))
+        assert dataset["status"] == "completed" and dataset["total_images"] == 3
+        assert asyncio.run(queue_mode.uploads.find_one({"_id": "job-upload"}))["stage"] == "completed"
+
+    def test_invalid_archive_fails_without_retry(self, queue_mode, dataset_zip):
+        """Archives that can never ingest fail the job on the first attempt."""
+        job_id = _enqueue(dataset_zip(split="misc")).json()["job_id"]
+
+        outcome = asyncio.run(_run_next_job())
+
+        assert outcome["status"] == "failed"
+        job = asyncio.run(queue_mode.ingest_jobs.find_one({"_id": job_id}))
+        assert job["status"] == "failed" and job["attempts"] == 1
+        assert asyncio.run(queue_mode.datasets.count_documents({})) == 0
+
+    def test_unexpected_error_is_retried(self, queue_mode, monkeypatch, dataset_zip):
+        """A transient failure puts the job back in the queue for another attempt."""
+        job_id = _enqueue(dataset_zip()).json()["job_id"]
+        original = services._ingest_reserved
+        calls = []
+
+        async def flaky(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("mongo went away")
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(services, "_ingest_reserved", flaky)
+
+        assert asyncio.run(_run_next_job())["status"] == "queued"
+        assert asyncio.run(_run_next_job())["status"] == "completed"
+        job = asyncio.run(queue_mode.ingest_jobs.find_one({"_id": job_id}))
+        assert job["attempts"] == 2 and job["status"] == "completed"
+
+    def test_attempts_are_bounded(self, queue_mode, monkeypatch, dataset_zip):
+        """A job that keeps failing is given up after JOB_MAX_ATTEMPTS claims."""
+        monkeypatch.setattr(services, "JOB_MAX_ATTEMPTS", 2)
+
+        async def broken(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(services, "_ingest_reserved", broken)
+        _enqueue(dataset_zip())
+
+        assert asyncio.run(_run_next_job())["status"] == "queued"
+        assert asyncio.run(_run_next_job())["status"] == "failed"
+        assert asyncio.run(services.claim_ingest_job(Lease(services.job_collection))) is None
+
+    def test_crashed_job_is_reclaimed(self, queue_mode, dataset_zip):
+        """A job whose worker died mid-ingest is claimed again and takes over its own reservation."""
+        job_id = _enqueue(dataset_zip()).json()["job_id"]
+
+        async def crash_then_recover():
+            crashed = await services.claim_ingest_job(Lease(services.job_collection))
+            # The dead worker had reserved the name and its dataset lease is still live
+            await queue_mode.datasets.insert_one({
+                "name": "ds", "status": "processing", "job_id": crashed["_id"],
+                "lease_owner": "dead", "lease_expires": datetime.utcnow() + timedelta(minutes=1),
+            })
+            assert await services.claim_ingest_job(Lease(services.job_collection)) is None
+
+            await queue_mode.ingest_jobs.update_one(
+                {"_id": job_id}, {"$set": {"lease_expires": datetime.utcnow() - timedelta(seconds=1)}}
+            )
+            return await _run_next_job()
+
+        assert asyncio.run(crash_then_recover())["status"] == "completed"
+        job = asyncio.run(queue_mode.ingest_jobs.find_one({"_id": job_id}))
+        assert job["attempts"] == 2
+        assert asyncio.run(queue_mode.datasets.find_one({"name": "ds"}))["status"] == "completed"
+
+    def test_worker_loop_drains_the_queue(self, queue_mode, dataset_zip):
+        """worker.work runs queued jobs until it is told to stop."""
+        for name in ("a", "b"):
+            TestClient(app).post("/datasets/upload", files={"file": (f"{name}.zip", dataset_zip(), "application/zip")})
+
+        async def drain():
+            stop = asyncio.Event()
+            task = asyncio.create_task(worker.work(stop, poll_interval=0.01))
+            while await queue_mode.ingest_jobs.count_documents({"status": "completed"}) < 2:
+                await asyncio.sleep(0.01)
+            stop.set()
+            return await task
+
+        assert asyncio.run(drain()) == 2
+        assert sorted(asyncio.run(queue_mode.datasets.distinct("name"))) == ["a", "b"]
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.label_store import LabelStoreWriter, label_store_path, run_aggregation
+
+
+def _box(cls, w=0.5, h=0.5):
+    return {"class": str(cls), "bbox": ["0.5", "0.5", str(w), str(h)]}
+
+
+DOCS = [
+    {"image_name": "a.jpg", "split": "train", "labels": [_box(0), _box(0), _box(1, 0.1, 0.1)], "width": 100, "height": 100},
+    {"image_name": "b.jpg", "split": "train", "labels": [_box(1), _box(2)], "width": 100, "height": 100},
+    {"image_name": "c.jpg", "split": "valid", "labels": [], "width": 100, "height": 100},
+    {"image_name": "d.jpg", "split": "valid", "labels": [_box(0), {"class": "x", "bbox": ["0.5"] * 4}], "width": None, "height": None},
+]
+
+
+@pytest.fixture
+def store(temp_directory):
+    path = os.path.join(temp_directory, "labels", "ds.parquet")
+    writer = LabelStoreWriter(path)
+    writer.write(DOCS[:3])
+    writer.write(DOCS[3:])
+    writer.close()
+    return path
+
+
+class TestAggregations:
+    """Test cases for aggregations over the columnar label file."""
+
+    def test_class_counts(self, store):
+        """Boxes and distinct images per class; malformed labels are left out."""
+        assert run_aggregation(store, "class_counts") == [
+            {"class": 0, "boxes": 3, "images": 2},
+            {"class": 1, "boxes": 2, "images": 2},
+            {"class": 2, "boxes": 1, "images": 1},
+        ]
+        assert run_aggregation(store, "class_counts", split="valid") == [{"class": 0, "boxes": 1, "images": 1}]
+
+    def test_boxes_per_image(self, store):
+        """Images without boxes count as zero."""
+        results = {row["split"]: row for row in run_aggregation(store, "boxes_per_image")}
+        assert (results["train"]["images"], results["train"]["boxes"], results["train"]["max"]) == (2, 5, 3)
+        assert (results["valid"]["images"], results["valid"]["boxes"], results["valid"]["min"]) == (2, 1, 0)
+
+    def test_bbox_area(self, store):
+        """Pixel areas skip images of unknown size; groups get one entry each."""
+        [overall] = run_aggregation(store, "bbox_area")
+        assert overall["boxes"] == 6 and overall["mean"] == pytest.approx(2020)
+        assert overall["p50"] == pytest.approx(2500)
+
+        by_split = run_aggregation(store, "bbox_area", group_by="split")
+        assert [(row["split"], row["boxes"]) for row in by_split] == [("train", 5), ("valid", 1)]
+        assert by_split[1]["mean"] is None
+
+    def test_cooccurrence(self, store):
+        """Pairs are counted once per image, most frequent first."""
+        assert run_aggregation(store, "cooccurrence") == [
+            {"classes": [0, 1], "images": 1},
+            {"classes": [1, 2], "images": 1},
+        ]
+        assert run_aggregation(store, "cooccurrence", split="valid") == []
+
+
+# a.jpg in train with classes 0 and 1, b.jpg in valid with class 1
+LAYOUT = {
+    "train/images/a.jpg": "fake image data",
+    "train/labels/a.txt": "0 0.5 0.5 0.2 0.3\n1 0.5 0.5 0.2 0.3",
+    "valid/images/b.jpg": "fake image data",
+    "valid/labels/b.txt": "1 0.5 0.5 0.2 0.3",
+}
+
+
+class TestLabelEndpoint:
+    """The label store is written at ingest and queried over HTTP."""
+
+    def test_written_at_ingest(self, workdir, dataset_zip):
+        """Uploads leave a label file behind that the endpoint aggregates."""
+        client = TestClient(app)
+        assert client.post("/datasets/upload", files={"file": ("ds.zip", dataset_zip(0, files=LAYOUT), "application/zip")}).status_code == 200
+        assert os.path.exists(label_store_path("ds"))
+
+        response = client.get("/datasets/ds/labels/class_counts")
+        assert response.status_code == 200
+        assert response.json()["results"] == [{"class": 0, "boxes": 1, "images": 1}, {"class": 1, "boxes": 2, "images": 2}]
+
+        response = client.get("/datasets/ds/labels/class_counts?split=valid")
+        assert response.json()["results"] == [{"class": 1, "boxes": 1, "images": 1}]
+
+        assert client.get("/datasets/ds/labels/median").status_code == 422
+        assert client.get("/datasets/missing/labels/class_counts").status_code == 404
+
+    def test_built_on_first_query(self, workdir):
+        """Datasets ingested before label files existed get one from their image records."""
+
+        async def seed():
+            await workdir.datasets.insert_one({"name": "old", "status": "completed", "total_images": 2})
+            await workdir.images.insert_many([{"dataset": "old", **doc} for doc in DOCS[:2]])
+        asyncio.run(seed())
+
+        response = TestClient(app).get("/datasets/old/labels/cooccurrence")
+
+        assert response.status_code == 200
+        assert response.json()["results"] == [{"classes": [0, 1], "images": 1}, {"classes": [1, 2], "images": 1}]
+        assert os.path.exists(label_store_path("old"))
+
+    def test_class_ids_beyond_int32_are_skipped(self, temp_directory):
+        """A class id the int32 column cannot hold is not a box, rather than failing the write."""
+        path = os.path.join(temp_directory, "labels", "big.parquet")
+        writer = LabelStoreWriter(path)
+        writer.write([{"image_name": "a.jpg", "split": "train", "labels": [_box(3000000000), _box(1)]}])
+        writer.close()
+
+        assert run_aggregation(path, "class_counts") == [{"class": 1, "boxes": 1, "images": 1}]
+
+    def test_failed_label_file_keeps_the_published_dataset(self, workdir, dataset_zip, monkeypatch):
+        """Derived data failing after publish is logged; the dataset and its images stay."""
+        from dataset import services
+
+        async def broken(*args):
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(services, "_store_labels", broken)
+        client = TestClient(app)
+
+        assert client.post("/datasets/upload", files={"file": ("ds.zip", dataset_zip(0, files=LAYOUT), "application/zip")}).status_code == 200
+        assert len(client.get("/datasets/ds/images").json()["images"]) == 2
+        assert asyncio.run(workdir.images.count_documents({"dataset": "ds"})) == 2
+        assert os.path.exists(os.path.join("datasets", "images", "ds", "a.jpg"))
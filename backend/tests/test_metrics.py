@@ -0,0 +1,53 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.metrics import observe_stage, record_cache, INGEST_STAGE_SECONDS, CACHE_REQUESTS
+
+
+class TestMetricsEndpoint:
+    """Test cases for the /metrics exposition endpoint."""
+
+    def test_metrics_exposes_route_latency(self):
+        """Requests are recorded under their route template, not the raw path."""
+        client = TestClient(app)
+        client.get("/datasets/some_dataset/image/missing.jpg")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/datasets/{dataset_name}/image/{image_name}",status="404"}'
+        ) in response.text
+        assert "some_dataset" not in response.text
+
+    def test_metrics_lists_ingest_collectors(self):
+        """Ingest collectors are exported even before the first upload."""
+        response = TestClient(app).get("/metrics")
+
+        assert "ingest_uploads_in_flight" in response.text
+        assert "ingest_bytes_total" in response.text
+
+
+class TestCollectors:
+    """Test cases for the collector helpers."""
+
+    def test_observe_stage(self):
+        """Stage durations accumulate per stage label."""
+        before = INGEST_STAGE_SECONDS.labels("unit-test")._sum.get()
+        observe_stage("unit-test", 0.5)
+        assert INGEST_STAGE_SECONDS.labels("unit-test")._sum.get() == before + 0.5
+
+    def test_record_cache(self):
+        """Cache hits and misses are counted separately."""
+        hits = CACHE_REQUESTS.labels("unit-test", "hit")._value.get()
+        record_cache("unit-test", True)
+        record_cache("unit-test", False)
+        assert CACHE_REQUESTS.labels("unit-test", "hit")._value.get() == hits + 1
+        assert CACHE_REQUESTS.labels("unit-test", "miss")._value.get() == 1
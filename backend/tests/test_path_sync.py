@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset import services
+from dataset.services import sync_directory, sync_watched
+from utils.lease import Lease
+from utils.path_index import diff_index, scan_yolo_dir
+import worker
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fh:
+        fh.write(data)
+
+
+def _touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def source(temp_directory, monkeypatch, fake_db):
+    """A YOLO directory under an allowed root, with the process working in a separate directory."""
+    root = os.path.join(temp_directory, "volume")
+    base = os.path.join(root, "shots")
+    for i in range(3):
+        _write(os.path.join(base, "train", "images", f"image{i}.jpg"), "fake image data")
+        _write(os.path.join(base, "train", "labels", f"image{i}.txt"), "0 0.5 0.5 0.2 0.3")
+    workdir = os.path.join(temp_directory, "work")
+    os.makedirs(workdir)
+    monkeypatch.chdir(workdir)
+    monkeypatch.setattr(services, "PATH_INGEST_ROOTS", [root])
+    return base
+
+
+class TestPathIndex:
+    """Test cases for the directory index."""
+
+    def test_scan_and_diff(self, source):
+        """Only files whose size or mtime moved show up as changed."""
+        previous = scan_yolo_dir(source)
+        assert sorted(previous) == ["image0.jpg", "image1.jpg", "image2.jpg"]
+        assert previous["image0.jpg"][0] == "train"
+
+        _touch_later(os.path.join(source, "train", "labels", "image1.txt"))
+        os.remove(os.path.join(source, "train", "images", "image2.jpg"))
+
+        assert diff_index(previous, scan_yolo_dir(source)) == (["image1.jpg"], ["image2.jpg"])
+
+
+class TestDirectorySync:
+    """Datasets ingested in place from a server-side directory."""
+
+    @pytest.mark.asyncio
+    async def test_first_sync(self, source):
+        """The directory is published with links to its images instead of copies."""
+        result = await sync_directory(source)
+
+        assert result["dataset"] == "shots" and result["added"] == 3
+        dataset = await services.dataset_collection.find_one({"name": "shots"})
+        assert dataset["status"] == "completed" and dataset["total_images"] == 3
+        assert dataset["source_path"] == os.path.realpath(source) and "lease_owner" not in dataset
+        link = os.path.join("datasets", "images", "shots", "image0.jpg")
+        assert os.path.islink(link) and open(link).read() == "fake image data"
+        page = json.loads((await services.page_collection.find_one({"dataset": "shots", "page": 1}))["body"])
+        assert page["total_images"] == 3
+
+    @pytest.mark.asyncio
+    async def test_resync_applies_changes(self, source):
+        """Only new, modified and deleted files are touched on a re-sync."""
+        await sync_directory(source)
+        _write(os.path.join(source, "train", "labels", "image0.txt"), "1 0.1 0.1 0.1 0.1\n2 0.2 0.2 0.2 0.2")
+        _touch_later(os.path.join(source, "train", "labels", "image0.txt"))
+        _write(os.path.join(source, "valid", "images", "new.jpg"), "fake image data")
+        _write(os.path.join(source, "valid", "labels", "new.txt"), "")
+        os.remove(os.path.join(source, "train", "images", "image2.jpg"))
+
+        result = await sync_directory(source)
+
+        assert (result["added"], result["updated"], result["removed"], result["unchanged"]) == (1, 1, 1, 1)
+        images = {doc["image_name"]: doc async for doc in services.image_collection.find({"dataset": "shots"})}
+        assert sorted(images) == ["image0.jpg", "image1.jpg", "new.jpg"]
+        assert len(images["image0.jpg"]["labels"]) == 2 and images["new.jpg"]["split"] == "valid"
+        assert not os.path.lexists(os.path.join("datasets", "images", "shots", "image2.jpg"))
+        assert (await services.dataset_collection.find_one({"name": "shots"}))["total_images"] == 3
+        assert await services.page_collection.count_documents({"dataset": "shots"}) == 1
+
+    @pytest.mark.asyncio
+    async def test_unchanged_resync_reads_nothing(self, source, monkeypatch):
+        """An unchanged directory is only stat'ed."""
+        await sync_directory(source)
+        monkeypatch.setattr(services, "read_labels", lambda *args: pytest.fail("labels were read"))
+
+        result = await sync_directory(source)
+
+        assert (result["added"], result["updated"], result["removed"], result["unchanged"]) == (0, 0, 0, 3)
+
+    @pytest.mark.asyncio
+    async def test_missing_source_keeps_dataset(self, source):
+        """A directory that vanished (unmounted volume) fails the sync instead of emptying the dataset."""
+        await sync_directory(source)
+        shutil.rmtree(source)
+
+        with pytest.raises(HTTPException) as missing:
+            await services._sync_dataset("shots", os.path.realpath(source), services.Trace(), services.Progress(""))
+
+        assert missing.value.status_code == 400
+        assert await services.image_collection.count_documents({"dataset": "shots"}) == 3
+        assert "lease_owner" not in await services.dataset_collection.find_one({"name": "shots"})
+
+    @pytest.mark.asyncio
+    async def test_paths_outside_roots(self, source, temp_directory, monkeypatch):
+        """Only directories under INGEST_PATH_ROOTS can be ingested."""
+        with pytest.raises(HTTPException) as outside:
+            await sync_directory(os.path.join(source, "..", "..", "work"))
+        assert outside.value.status_code == 403
+
+        monkeypatch.setattr(services, "PATH_INGEST_ROOTS", [])
+        with pytest.raises(HTTPException) as disabled:
+            await sync_directory(source)
+        assert disabled.value.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_watched_datasets_are_resynced(self, source):
+        """sync_watched picks up changes of datasets ingested with watch."""
+        await sync_directory(source, watch=True)
+        _write(os.path.join(source, "train", "images", "late.jpg"), "fake image data")
+
+        results = await sync_watched()
+
+        assert [(r["dataset"], r["added"]) for r in results] == [("shots", 1)]
+
+    @pytest.mark.asyncio
+    async def test_watch_loop(self, source):
+        """worker.watch re-syncs until it is told to stop."""
+        await sync_directory(source, watch=True)
+        _write(os.path.join(source, "train", "images", "late.jpg"), "fake image data")
+        stop = asyncio.Event()
+
+        task = asyncio.create_task(worker.watch(stop, interval=0.01))
+        while not await services.image_collection.find_one({"image_name": "late.jpg"}):
+            await asyncio.sleep(0.01)
+        stop.set()
+
+        assert await task >= 1
+
+    def test_sync_endpoint_in_queue_mode(self, source, monkeypatch):
+        """In queue mode the endpoint enqueues the sync for a worker."""
+        monkeypatch.setattr(services, "INGEST_MODE", "queue")
+
+        response = TestClient(app).post("/datasets/sync", json={"path": source, "name": "shots-v1"})
+
+        assert response.status_code == 202
+
+        async def run_job():
+            lease = Lease(services.job_collection)
+            job = await services.claim_ingest_job(lease)
+            return await services.run_ingest_job(job, lease)
+
+        outcome = asyncio.run(run_job())
+        assert outcome["status"] == "completed"
+        assert asyncio.run(services.image_collection.count_documents({"dataset": "shots-v1"})) == 3
+
+    def test_endpoint_rejects_unsafe_names(self, source):
+        """Dataset names cannot escape the image directory."""
+        response = TestClient(app).post("/datasets/sync", json={"path": source, "name": ".."})
+
+        assert response.status_code == 422
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.phash import MAX_DISTANCE, HashIndex, dhash, fingerprint_file, fingerprint_files, hamming, format_hash, parse_hash
+
+
+def _gradient_image(size=(64, 48), seed=0):
+    rng = random.Random(seed)
+    image = Image.new("RGB", size)
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle([x0, y0, x0 + 15, y0 + 10], fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image
+
+
+class TestDhash:
+    """Test cases for the perceptual hash."""
+
+    def test_resized_copy_is_near_identical(self):
+        """A rescaled copy of an image should hash within a few bits of the original."""
+        image = _gradient_image()
+        resized = image.resize((128, 96))
+        assert hamming(dhash(image), dhash(resized)) <= 4
+
+    def test_different_images_are_far_apart(self):
+        """Unrelated images should not collide."""
+        assert hamming(dhash(_gradient_image(seed=1)), dhash(_gradient_image(seed=2))) > 8
+
+    def test_hash_file_skips_unreadable_images(self, temp_directory):
+        """Files that are not decodable images fingerprint to None instead of failing the ingest."""
+        bad = Path(temp_directory) / "bad.jpg"
+        bad.write_bytes(b"fake image data")
+        good = Path(temp_directory) / "good.jpg"
+        _gradient_image().save(good)
+
+        assert fingerprint_file(str(bad)) == (None, None, None)
+        value, width, height = fingerprint_file(str(good))
+        assert isinstance(value, int)
+        assert (width, height) == (64, 48)
+        assert fingerprint_files([str(bad), str(good)])[0] == (None, None, None)
+
+    def test_hash_roundtrip(self):
+        """Hex formatting keeps the full 64-bit value."""
+        value = (1 << 63) | 5
+        assert parse_hash(format_hash(value)) == value
+
+
+class TestHashIndex:
+    """Test cases for the multi-index Hamming-radius index."""
+
+    def test_query_matches_brute_force(self):
+        """Radius queries return exactly what a linear scan would."""
+        rng = random.Random(42)
+        base = [rng.getrandbits(64) for _ in range(200)]
+        values = base + [v ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for v in base[:50]]
+
+        index = HashIndex(max_distance=3)
+        for i, v in enumerate(values):
+            index.add(i, v)
+
+        probe = values[0]
+        expected = sorted(i for i, v in enumerate(values) if hamming(probe, v) <= 3)
+        assert sorted(key for _, key in index.query(probe)) == expected
+
+    def test_clusters_group_transitively(self):
+        """Chains of near-duplicates form a single cluster, singletons are dropped."""
+        index = HashIndex(max_distance=2)
+        index.add("a", 0b0000)
+        index.add("b", 0b0011)
+        index.add("c", 0b1111)
+        index.add("d", (1 << 63) - 1)
+        index.add("e", 0b0000)
+
+        clusters = [sorted(c) for c in index.clusters()]
+        assert clusters == [["a", "b", "c", "e"]]
+
+    def test_radius_is_bounded(self):
+        """Radii past MAX_DISTANCE are refused rather than silently degrading to a scan."""
+        HashIndex(max_distance=MAX_DISTANCE)
+        with pytest.raises(ValueError):
+            HashIndex(max_distance=MAX_DISTANCE + 1)
+
+    def test_query_radius_cannot_exceed_index(self):
+        """The index only guarantees recall up to the distance it was built for."""
+        index = HashIndex(max_distance=2)
+        with pytest.raises(ValueError):
+            index.query(0, radius=3)
+
+
+class TestDuplicatesEndpoint:
+    """Test cases for GET /datasets/{name}/duplicates."""
+
+    def test_clusters_and_radius_bound(self, fake_db):
+        """Near-identical hashes are clustered; radii the index cannot serve are rejected."""
+        async def seed():
+            await fake_db.datasets.insert_one({"name": "ds", "status": "completed", "total_images": 3})
+            await fake_db.images.insert_many([
+                {"dataset": "ds", "image_name": "a.jpg", "split": "train", "phash": format_hash(0b1111)},
+                {"dataset": "ds", "image_name": "b.jpg", "split": "valid", "phash": format_hash(0b0111)},
+                {"dataset": "ds", "image_name": "c.jpg", "split": "train", "phash": format_hash((1 << 63) - 1)},
+            ])
+        asyncio.run(seed())
+        client = TestClient(app)
+
+        response = client.get("/datasets/ds/duplicates?cross_split=true")
+        assert response.json()["clusters"] == [[{"image_name": "a.jpg", "split": "train"}, {"image_name": "b.jpg", "split": "valid"}]]
+        assert client.get(f"/datasets/ds/duplicates?max_distance={MAX_DISTANCE + 1}").status_code == 422
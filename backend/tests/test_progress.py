@@ -0,0 +1,88 @@
+import asyncio
+import io
+import json
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset.services import handle_upload, upload_progress_events
+from utils import progress as progress_registry
+from utils.progress import Progress
+
+
+def _parse(event):
+    kind, data = event.strip().split("\n")
+    return kind.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+class TestProgress:
+    """Test cases for the coalescing progress state."""
+
+    @pytest.mark.asyncio
+    async def test_updates_coalesce(self):
+        """Many updates between two samples produce a single snapshot."""
+        progress = Progress("x")
+        updates = progress.updates(interval=0.01)
+
+        first = await updates.__anext__()
+        for _ in range(1000):
+            progress.add("extracted")
+        second = await updates.__anext__()
+        progress.finish(result={"ok": True})
+        last = await updates.__anext__()
+
+        assert first["stage"] == "pending"
+        assert second["counters"]["extracted"] == 1000
+        assert last["stage"] == "completed"
+        with pytest.raises(StopAsyncIteration):
+            await updates.__anext__()
+
+    def test_upload_id_is_claimed_once(self):
+        """A second ingest cannot reuse a running upload id."""
+        assert progress_registry.start("claimed-once") is not None
+        assert progress_registry.start("claimed-once") is None
+
+
+class TestProgressStream:
+    """An ingest reports its stages and counters to subscribers."""
+
+    @pytest.mark.asyncio
+    async def test_stream_follows_ingest(self, workdir, dataset_zip):
+        """A subscriber sees stage transitions and ends with the upload result."""
+        events = []
+
+        async def listen():
+            async for event in upload_progress_events("stream-test"):
+                events.append(_parse(event))
+
+        listener = asyncio.create_task(listen())
+        await asyncio.sleep(0)
+        upload = UploadFile(file=io.BytesIO(dataset_zip(5)), filename="ds.zip")
+        await handle_upload(upload, upload_id="stream-test")
+        await asyncio.wait_for(listener, 5)
+
+        kind, final = events[-1]
+        assert kind == "done"
+        assert final["counters"] == {"extracted": 10, "parsed": 5, "placed": 5, "written": 5}
+        assert final["totals"] == {"extracted": 10, "written": 5}
+        assert final["result"]["dataset"] == "ds"
+        assert events[0][1]["stage"] in ("pending", "queued", "write")
+
+    @pytest.mark.asyncio
+    async def test_failed_ingest_is_reported(self, workdir):
+        """A rejected upload ends the stream with a failed event."""
+        upload = UploadFile(file=io.BytesIO(b"not a zip"), filename="ds.zip")
+
+        with pytest.raises(HTTPException):
+            await handle_upload(upload, upload_id="fail-test")
+
+        events = [_parse(e) async for e in upload_progress_events("fail-test")]
+        assert events == [("failed", {
+            "upload_id": "fail-test", "stage": "failed",
+            "counters": {"extracted": 0, "parsed": 0, "placed": 0, "written": 0},
+            "totals": {}, "error": "File is not a zip file",
+        })]
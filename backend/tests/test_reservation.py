@@ -0,0 +1,177 @@
+import asyncio
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset.services import handle_upload, upload_progress_events
+from utils.lease import Lease, LeaseLost
+
+
+def _upload_file(payload, name="ds.zip"):
+    return UploadFile(file=io.BytesIO(payload), filename=name)
+
+
+class TestNameReservation:
+    """Dataset names are reserved across workers before any work is done."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_uploads_of_one_name(self, workdir, dataset_zip):
+        """Two different archives racing for one name: one wins, the other gets 409."""
+        results = await asyncio.gather(
+            handle_upload(_upload_file(dataset_zip(label="0"))),
+            handle_upload(_upload_file(dataset_zip(label="1"))),
+            return_exceptions=True,
+        )
+
+        conflicts = [r for r in results if isinstance(r, HTTPException)]
+        assert len(conflicts) == 1 and conflicts[0].status_code == 409
+        assert await workdir.datasets.count_documents({"name": "ds"}) == 1
+        assert await workdir.images.count_documents({"dataset": "ds"}) == 3
+
+    @pytest.mark.asyncio
+    async def test_live_reservation_blocks_the_name(self, workdir, dataset_zip):
+        """A name held by a running ingest elsewhere is a conflict."""
+        await workdir.datasets.insert_one({
+            "name": "ds", "status": "processing",
+            "lease_owner": "other", "lease_expires": datetime.utcnow() + timedelta(minutes=1),
+        })
+
+        with pytest.raises(HTTPException) as conflict:
+            await handle_upload(_upload_file(dataset_zip()))
+        assert conflict.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_stale_reservation_is_taken_over(self, workdir, dataset_zip):
+        """An expired lease from a crashed worker is reclaimed and its partial records dropped."""
+        await workdir.datasets.insert_one({
+            "name": "ds", "status": "processing",
+            "lease_owner": "crashed", "lease_expires": datetime.utcnow() - timedelta(seconds=1),
+        })
+        await workdir.images.insert_one({"dataset": "ds", "image_name": "orphan.jpg", "labels": []})
+
+        result = await handle_upload(_upload_file(dataset_zip()))
+
+        assert result["dataset"] == "ds"
+        dataset = await workdir.datasets.find_one({"name": "ds"})
+        assert dataset["status"] == "completed" and "lease_owner" not in dataset
+        assert sorted(await workdir.images.distinct("image_name")) == ["image0.jpg", "image1.jpg", "image2.jpg"]
+
+    @pytest.mark.asyncio
+    async def test_failed_ingest_releases_the_name(self, workdir, dataset_zip):
+        """An archive that fails validation leaves no reservation or files behind."""
+        with pytest.raises(HTTPException) as invalid:
+            await handle_upload(_upload_file(dataset_zip(split="misc")))
+
+        assert invalid.value.status_code == 400
+        assert await workdir.datasets.count_documents({}) == 0
+        assert not os.path.exists(os.path.join("datasets", "images", "ds"))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("name", ["...zip", "..zip", ".hidden.zip", "a b.zip"])
+    async def test_unsafe_names_are_rejected(self, workdir, dataset_zip, name):
+        """Names that are not plain directory names never reach the file system."""
+        await handle_upload(_upload_file(dataset_zip(), name="other.zip"))
+
+        with pytest.raises(HTTPException) as invalid:
+            await handle_upload(_upload_file(dataset_zip(label="1"), name=name))
+        assert invalid.value.status_code == 400
+        assert len(os.listdir(os.path.join("datasets", "images", "other"))) == 3
+
+    def test_unsafe_stream_name_is_rejected(self, workdir):
+        """The raw-body upload checks the name before reading the body."""
+        response = TestClient(app).post("/datasets/upload/stream?filename=..tar", content=b"")
+        assert response.status_code == 400
+
+
+class TestNameIndexMigration:
+    """Databases with duplicate names from before reservations still start."""
+
+    @pytest.mark.asyncio
+    async def test_duplicates_are_set_aside(self, fake_db, monkeypatch):
+        """The completed, newest document keeps the name; the others are renamed and hidden."""
+        from benchmarks.fake_mongo import InMemoryDatabase
+        from dataset import services
+
+        # A dataset collection without the unique index, as older deployments have
+        database = InMemoryDatabase()
+        monkeypatch.setattr(services, "dataset_collection", database.datasets)
+        await database.datasets.insert_many([
+            {"name": "ds", "status": "completed", "created_at": datetime(2024, 1, 1), "total_images": 1},
+            {"name": "ds", "status": "completed", "created_at": datetime(2024, 2, 1), "total_images": 2},
+            {"name": "ds", "status": "processing", "created_at": datetime(2024, 3, 1), "total_images": 0},
+        ])
+
+        await services.ensure_indexes()
+
+        kept = await database.datasets.find_one({"name": "ds"})
+        assert kept["total_images"] == 2
+        others = await database.datasets.find({"status": "duplicate"}).to_list(None)
+        assert sorted(doc["total_images"] for doc in others) == [0, 1]
+        assert all(doc["name"].startswith("ds.duplicate-") for doc in others)
+
+
+class TestAtomicPublish:
+    """Datasets are invisible until their ingest publishes them."""
+
+    def test_processing_dataset_is_hidden(self, workdir):
+        """Reads treat an unpublished dataset as missing; the listing can still show it on request."""
+        asyncio.run(workdir.datasets.insert_one({"name": "ds", "status": "processing", "total_images": 0}))
+        client = TestClient(app)
+
+        assert client.get("/datasets/").json() == []
+        assert client.get("/datasets/ds/images").status_code == 404
+        assert [d["name"] for d in client.get("/datasets/?status=processing").json()] == ["ds"]
+
+    @pytest.mark.asyncio
+    async def test_published_dataset_is_complete(self, workdir, dataset_zip):
+        """Once published, records, pages and image files are all in place."""
+        await handle_upload(_upload_file(dataset_zip(25)))
+
+        dataset = await workdir.datasets.find_one({"name": "ds"})
+        assert dataset["status"] == "completed" and dataset["total_images"] == 25
+        assert await workdir.pages.count_documents({"dataset": "ds"}) == 2
+        assert len(os.listdir(os.path.join("datasets", "images", "ds"))) == 25
+
+
+class TestLease:
+    """Test cases for the Mongo-backed lease."""
+
+    @pytest.mark.asyncio
+    async def test_renew_detects_takeover(self, fake_db):
+        """Renewing fails once another owner has claimed the document."""
+        lease = Lease(fake_db.datasets, ttl=30)
+        lease.document_id = (await fake_db.datasets.insert_one({"name": "ds", **lease.claim()})).inserted_id
+        await lease.renew()
+
+        await fake_db.datasets.update_one({"_id": lease.document_id}, {"$set": {"lease_owner": "someone-else"}})
+
+        with pytest.raises(LeaseLost):
+            await lease.renew()
+        assert not await lease.release({"$set": {"status": "completed"}})
+
+
+class TestProgressAcrossWorkers:
+    """Progress of an ingest on another worker is followed through Mongo."""
+
+    @pytest.mark.asyncio
+    async def test_mirrored_progress_is_streamed(self, fake_db):
+        """A subscriber on this worker sees the snapshot mirrored by another one."""
+        await fake_db.uploads.insert_one({
+            "_id": "remote", "upload_id": "remote", "stage": "completed",
+            "counters": {"extracted": 2, "parsed": 1, "placed": 1, "written": 1}, "totals": {},
+            "updated_at": datetime.utcnow(),
+        })
+
+        events = [event async for event in upload_progress_events("remote")]
+
+        assert len(events) == 1 and events[0].startswith("event: done")
+        assert json.loads(events[0].split("data: ")[1])["counters"]["written"] == 1
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.label_store import LabelStoreWriter, class_index_paths
+from utils.sampling import sample_images
+
+
+def _docs():
+    # Class 0 is everywhere, class 1 in every third image, class 2 in two images; some images have no boxes
+    docs = []
+    for i in range(60):
+        classes = [0] + ([1] if i % 3 == 0 else []) + ([2] if i in (5, 55) else [])
+        docs.append({
+            "image_name": f"img{i:02d}.jpg",
+            "split": "train" if i < 40 else "valid",
+            "labels": [{"class": str(c), "bbox": ["0.5", "0.5", "0.1", "0.1"]} for c in classes] if i % 10 else [],
+            "width": 100,
+            "height": 100,
+        })
+    return docs
+
+
+@pytest.fixture
+def store(temp_directory):
+    path = os.path.join(temp_directory, "labels", "ds.parquet")
+    writer = LabelStoreWriter(path)
+    writer.write(_docs())
+    writer.close()
+    return path
+
+
+class TestSampleImages:
+    """Test cases for sampling from the class index."""
+
+    def test_index_written_with_store(self, store):
+        """The image table and class index land next to the label file."""
+        assert all(os.path.exists(path) for path in class_index_paths(store))
+
+    def test_random_is_seeded(self, store):
+        """The same seed draws the same images; another seed draws others."""
+        first = sample_images(store, seed=1, count=10)
+        assert len(first["images"]) == 10
+        assert first == sample_images(store, seed=1, count=10)
+        assert first != sample_images(store, seed=2, count=10)
+        assert len(sample_images(store, seed=1, count=1000)["images"]) == 60
+
+    def test_random_within_split(self, store):
+        """A split limits the draw to its images."""
+        sample = sample_images(store, seed=3, count=15, split="valid")
+        assert len(sample["images"]) == 15 and {image["split"] for image in sample["images"]} == {"valid"}
+
+    def test_stratified(self, store):
+        """Every class gets its quota in every split, rare classes first, each image picked once."""
+        sample = sample_images(store, seed=4, per_class=3)
+        strata = {(s["split"], s["class"]): s["images"] for s in sample["strata"]}
+        assert strata == {
+            ("train", 0): 3, ("train", 1): 3, ("train", 2): 1,
+            ("valid", 0): 3, ("valid", 1): 3, ("valid", 2): 1,
+        }
+        names = [image["image_name"] for image in sample["images"]]
+        assert len(names) == len(set(names)) == 14
+        assert {"img05.jpg", "img55.jpg"} <= set(names)
+        assert sample == sample_images(store, seed=4, per_class=3)
+
+
+class TestSampleEndpoint:
+    """The sample endpoint returns labels or a streamed export of the sample."""
+
+    @pytest.fixture
+    def client(self, workdir, dataset_zip):
+        payload = dataset_zip(6, label=lambda i: i % 2, split=lambda i: "train" if i < 4 else "valid", stem="img{i}")
+        client = TestClient(app)
+        assert client.post("/datasets/upload", files={"file": ("ds.zip", payload, "application/zip")}).status_code == 200
+        return client
+
+    def test_json_with_labels(self, client):
+        """Sampled images come with their split and labels."""
+        response = client.get("/datasets/ds/sample?per_class=1&seed=5")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total_images"] == 4 and body["seed"] == 5
+        assert all(image["labels"][0]["class"] == str(int(image["image_name"][3]) % 2) for image in body["images"])
+
+    def test_coco_export_of_sample(self, client):
+        """Exports contain only the sampled images."""
+        response = client.get("/datasets/ds/sample?n=2&seed=5&format=coco")
+
+        assert response.status_code == 200
+        assert "ds_sample5_coco.json" in response.headers["content-disposition"]
+        coco = json.loads(response.content)
+        expected = [image["image_name"] for image in client.get("/datasets/ds/sample?n=2&seed=5").json()["images"]]
+        assert [image["file_name"] for image in coco["images"]] == expected
+
+    def test_needs_one_mode(self, client):
+        """Exactly one of n and per_class is required."""
+        assert client.get("/datasets/ds/sample").status_code == 400
+        assert client.get("/datasets/ds/sample?n=1&per_class=1").status_code == 400
+        assert client.get("/datasets/missing/sample?n=1").status_code == 404
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId, json_util
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset.services import encode_pages
+from utils.serialization import BSONJSONResponse, dumps
+
+
+def _image_docs(count):
+    return [
+        {"dataset": "ds", "image_name": f"image{i:03d}.jpg", "split": "train",
+         "labels": [{"class": str(i % 3), "bbox": ["0.5", "0.5", "0.2", "0.3"]}]}
+        for i in range(count)
+    ]
+
+
+class TestDumps:
+    """dumps() produces the same JSON as bson.json_util in relaxed mode."""
+
+    def test_matches_json_util(self):
+        """ObjectIds, datetimes and nested values encode like json_util."""
+        docs = [{
+            "_id": ObjectId(),
+            "name": "ds",
+            "created_at": datetime(2024, 1, 1, 12, 30, 5, 123456),
+            "midnight": datetime(2024, 1, 1),
+            "aware": datetime(2024, 1, 1, 3, tzinfo=timezone.utc),
+            "old": datetime(1960, 6, 1),
+            "nested": {"labels": [{"class": "0", "bbox": ["0.1"]}], "total": 3, "ratio": 0.5, "none": None},
+        }]
+
+        assert json.loads(dumps(docs)) == json.loads(json_util.dumps(docs))
+
+    def test_response_passes_bytes_through(self):
+        """Pre-encoded bodies are sent unchanged."""
+        response = BSONJSONResponse(b'{"a":1}')
+        assert response.body == b'{"a":1}'
+        assert response.headers["content-type"] == "application/json"
+
+
+class TestPrecomputedPages:
+    """Page bodies built at ingest match what the query path returns."""
+
+    def test_encode_pages(self):
+        """Pages are sorted by name and carry the paging totals."""
+        pages = encode_pages("ds", list(reversed(_image_docs(45))))
+
+        assert [p["page"] for p in pages] == [1, 2, 3]
+        body = json.loads(pages[2]["body"])
+        assert body["total_images"] == 45
+        assert body["total_pages"] == 3
+        assert body["current_page"] == 3
+        assert [i["image_name"] for i in body["images"]] == [f"image{i:03d}.jpg" for i in range(40, 45)]
+
+    def test_precomputed_page_matches_query(self, fake_db):
+        """The endpoint serves the stored body, identical to the computed one."""
+        docs = _image_docs(45)
+
+        async def seed():
+            await fake_db.images.insert_many(docs)
+            await fake_db.datasets.insert_one({"name": "ds", "status": "completed", "total_images": 45})
+
+        asyncio.run(seed())
+        client = TestClient(app)
+        computed = client.get("/datasets/ds/images?page=2").json()
+
+        asyncio.run(fake_db.pages.insert_many(encode_pages("ds", docs)))
+        precomputed = client.get("/datasets/ds/images?page=2")
+
+        assert precomputed.status_code == 200
+        assert precomputed.json() == computed
+
+    def test_precomputed_page_of_unpublished_dataset(self, fake_db):
+        """Stored pages stay hidden until the dataset they belong to is published."""
+        docs = _image_docs(3)
+
+        async def seed():
+            await fake_db.datasets.insert_one({"name": "ds", "status": "processing", "total_images": 3})
+            await fake_db.pages.insert_many(encode_pages("ds", docs))
+
+        asyncio.run(seed())
+
+        assert TestClient(app).get("/datasets/ds/images").status_code == 404
+
+    def test_list_datasets_shape(self, fake_db):
+        """Listing keeps the json_util shapes for ids and dates."""
+        asyncio.run(fake_db.datasets.insert_one(
+            {"name": "ds", "status": "completed", "created_at": datetime(2024, 1, 1), "total_images": 1}
+        ))
+
+        data = TestClient(app).get("/datasets/").json()
+
+        assert data[0]["created_at"] == {"$date": "2024-01-01T00:00:00Z"}
+        assert set(data[0]["_id"]) == {"$oid"}
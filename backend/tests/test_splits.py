@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import sys
+import tarfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from utils.path_index import image_path, read_labels, scan_yolo_dir
+from utils.tar_stream import read_tar
+from utils.yolo import parse_labels, unique_image_name
+
+# The same file name in two splits, with different labels
+LAYOUT = {
+    "train/images/shared.jpg": b"train image",
+    "train/labels/shared.txt": b"0 0.5 0.5 0.2 0.3",
+    "train/images/own.jpg": b"train image",
+    "train/labels/own.txt": b"0 0.5 0.5 0.2 0.3",
+    "valid/images/shared.jpg": b"valid image",
+    "valid/labels/shared.txt": b"1 0.3 0.7 0.1 0.2",
+}
+
+
+@pytest.fixture
+def source(temp_directory):
+    base = Path(temp_directory) / "source"
+    for name, data in LAYOUT.items():
+        (base / name).parent.mkdir(parents=True, exist_ok=True)
+        (base / name).write_bytes(data)
+    return str(base)
+
+
+class TestSameNamedImages:
+    """Images of the same file name in different splits are all kept."""
+
+    def test_unique_image_name(self):
+        """Only a taken name is qualified with the split."""
+        assert unique_image_name("a.jpg", "valid", set()) == "a.jpg"
+        assert unique_image_name("a.jpg", "valid", {"a.jpg"}) == "valid_a.jpg"
+        assert unique_image_name("a.jpg", "valid", {"a.jpg", "valid_a.jpg"}) == "valid_valid_a.jpg"
+
+    def test_parse_labels(self, source, temp_directory):
+        """Both images are placed, each with its own split's labels."""
+        output = os.path.join(temp_directory, "out")
+        images, labels = parse_labels(source, "ds", output_dir=output)
+
+        assert sorted((os.path.basename(path), split) for path, split in images) == [
+            ("own.jpg", "train"), ("shared.jpg", "train"), ("valid_shared.jpg", "valid")
+        ]
+        assert labels["shared.jpg"][0]["class"] == "0" and labels["valid_shared.jpg"][0]["class"] == "1"
+        assert Path(output, "valid_shared.jpg").read_bytes() == b"valid image"
+        assert Path(output, "shared.jpg").read_bytes() == b"train image"
+
+    def test_read_tar(self, temp_directory):
+        """The streamed tar reader names and labels them the same way."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name, data in LAYOUT.items():
+                info = tarfile.TarInfo(f"ds/{name}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        buffer.seek(0)
+        staged = os.path.join(temp_directory, "staged")
+        contents = read_tar(buffer, "tar", staged, os.path.join(temp_directory, "extracted"))
+
+        assert sorted(os.listdir(staged)) == ["own.jpg", "shared.jpg", "valid_shared.jpg"]
+        assert ("valid_shared.jpg", "valid") in [(os.path.basename(path), split) for path, split in contents.images]
+        assert contents.labels["valid_shared.jpg"][0]["class"] == "1"
+
+    def test_path_index(self, source):
+        """The directory index keeps the qualified image pointing at its own files."""
+        index = scan_yolo_dir(source)
+
+        assert sorted(index) == ["own.jpg", "shared.jpg", "valid_shared.jpg"]
+        assert image_path(source, "valid_shared.jpg", index["valid_shared.jpg"]).endswith(
+            os.path.join("valid", "images", "shared.jpg")
+        )
+        assert read_labels(source, index, ["valid_shared.jpg"])["valid_shared.jpg"][0]["class"] == "1"
+
+
+class TestSplitEndpoints:
+    """Paging and exports limited to one split."""
+
+    @pytest.fixture
+    def client(self, workdir, dataset_zip):
+        payload = dataset_zip(3, label="2", split="test", stem="img{i}", files=LAYOUT)
+        client = TestClient(app)
+        assert client.post("/datasets/upload", files={"file": ("ds.zip", payload, "application/zip")}).status_code == 200
+        return client
+
+    def test_split_counts(self, client):
+        """Counts are stored at publish and returned with every page."""
+        expected = {"train": 2, "valid": 1, "test": 3}
+        dataset = client.get("/datasets/ds/images").json()
+
+        assert dataset["total_images"] == 6 and dataset["split_counts"] == expected
+        assert client.get("/datasets/ds/images?split=train").json()["split_counts"] == expected
+
+    def test_page_of_split(self, client):
+        """A split's page holds its images only, with the split's totals."""
+        page = client.get("/datasets/ds/images?split=valid").json()
+
+        assert [image["image_name"] for image in page["images"]] == ["valid_shared.jpg"]
+        assert page["images"][0]["labels"][0]["class"] == "1"
+        assert page["total_images"] == 1 and page["total_pages"] == 1 and page["split"] == "valid"
+        assert client.get("/datasets/ds/image/valid_shared.jpg").content == b"valid image"
+        assert client.get("/datasets/ds/images?split=other").status_code == 422
+        assert client.get("/datasets/missing/images?split=train").status_code == 404
+
+    def test_export_of_split(self, client):
+        """Exports can be limited to one split."""
+        response = client.get("/datasets/ds/export?format=coco&split=test")
+
+        assert response.status_code == 200
+        assert "ds_test_coco.json" in response.headers["content-disposition"]
+        coco = json.loads(response.content)
+        assert [image["file_name"] for image in coco["images"]] == ["img0.jpg", "img1.jpg", "img2.jpg"]
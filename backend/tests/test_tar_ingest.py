@@ -0,0 +1,179 @@
+import asyncio
+import io
+import os
+import sys
+import tarfile
+import threading
+
+import pytest
+import zstandard
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset.services import handle_upload
+from utils.file_processing import StreamedUpload
+from utils.tar_stream import ChunkPipe, archive_kind, archive_stem, read_tar
+
+
+def _dataset_tar(compression="", images=3):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=f"w:{compression}") as tar:
+        def add(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+        for i in range(images):
+            add(f"ds/train/images/image{i}.jpg", b"fake image data")
+            add(f"ds/train/labels/image{i}.txt", b"0 0.5 0.5 0.2 0.3\n1 0.1 0.1 0.1 0.1")
+        add("ds/valid/images/unlabelled.jpg", b"fake image data")
+        add("ds/README.txt", b"notes")
+    return buffer.getvalue()
+
+
+def _zst(payload):
+    return zstandard.ZstdCompressor().compress(payload)
+
+
+async def _chunks(payload, size=7):
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+
+
+class TestArchiveNames:
+    """Test cases for recognising archive file names."""
+
+    def test_kinds(self):
+        """Zip and every tar flavour are recognised, anything else is not."""
+        assert archive_kind("a.zip") == "zip"
+        assert archive_kind("a.tar") == "tar"
+        assert archive_kind("a.TGZ") == "tar.gz"
+        assert archive_kind("a.tar.gz") == "tar.gz"
+        assert archive_kind("a.tar.zst") == "tar.zst"
+        assert archive_kind("a.rar") is None
+
+    def test_stem(self):
+        """The dataset name drops the whole archive suffix."""
+        assert archive_stem("coco.v2.tar.zst") == "coco.v2"
+        assert archive_stem("ds.zip") == "ds"
+
+
+class TestReadTar:
+    """Test cases for the single-pass tar reader."""
+
+    def test_yolo_members_are_placed(self, temp_directory):
+        """Images land in staging with their labels; splits without labels are dropped."""
+        staged, extracted = os.path.join(temp_directory, "images"), os.path.join(temp_directory, "extracted")
+
+        contents = read_tar(io.BytesIO(_dataset_tar("gz")), "tar.gz", staged, extracted)
+
+        assert sorted(os.path.basename(path) for path, _ in contents.images) == [
+            "image0.jpg", "image1.jpg", "image2.jpg"
+        ]
+        assert {split for _, split in contents.images} == {"train"}
+        assert sorted(os.listdir(staged)) == ["image0.jpg", "image1.jpg", "image2.jpg"]
+        assert contents.labels["image0.jpg"][1] == {"class": "1", "bbox": ["0.1", "0.1", "0.1", "0.1"]}
+        assert os.path.exists(os.path.join(extracted, "ds", "README.txt"))
+
+    def test_reads_through_pipe(self, temp_directory):
+        """A zstd archive is unpacked from a pipe while it is still being fed."""
+        pipe = ChunkPipe(max_chunks=2)
+        payload = _zst(_dataset_tar())
+        result = {}
+
+        def reader():
+            result["contents"] = read_tar(
+                pipe, "tar.zst", os.path.join(temp_directory, "images"), os.path.join(temp_directory, "x")
+            )
+            pipe.close_reader()
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for start in range(0, len(payload), 16):
+            pipe.feed(payload[start:start + 16])
+        pipe.feed(None)
+        thread.join(timeout=10)
+
+        assert len(result["contents"].images) == 3
+
+    def test_abort_fails_reader(self):
+        """An interrupted upload makes the reader fail instead of waiting forever."""
+        pipe = ChunkPipe()
+        pipe.abort()
+
+        with pytest.raises(OSError):
+            pipe.read(10)
+
+
+class TestTarIngest:
+    """Tar archives are ingested like zip archives."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("suffix, payload", [
+        (".tar", _dataset_tar()),
+        (".tar.gz", _dataset_tar("gz")),
+        (".tar.zst", _zst(_dataset_tar())),
+    ])
+    async def test_upload(self, workdir, suffix, payload):
+        """Every flavour is published with its images, labels and hash."""
+        result = await handle_upload(UploadFile(file=io.BytesIO(payload), filename=f"ds{suffix}"))
+
+        assert result["dataset"] == "ds"
+        dataset = await workdir.datasets.find_one({"name": "ds"})
+        assert dataset["status"] == "completed" and dataset["total_images"] == 3
+        assert len(dataset["archive_sha256"]) == 64
+        image = await workdir.images.find_one({"image_name": "image0.jpg"})
+        assert image["split"] == "train" and len(image["labels"]) == 2
+        assert sorted(os.listdir(os.path.join("datasets", "images", "ds"))) == [
+            "image0.jpg", "image1.jpg", "image2.jpg"
+        ]
+        # Nothing is left behind in scratch space
+        assert sorted(os.listdir("datasets")) == ["images", "labels"]
+
+    @pytest.mark.asyncio
+    async def test_reupload_is_recognised(self, workdir):
+        """A taken name falls back to the buffered path, which sees the same archive again."""
+        payload = _dataset_tar("gz")
+        await handle_upload(UploadFile(file=io.BytesIO(payload), filename="ds.tgz"))
+
+        again = await handle_upload(UploadFile(file=io.BytesIO(payload), filename="ds.tgz"))
+
+        assert again["reused"] is True
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("filename, payload", [
+        ("ds.tar.gz", _dataset_tar("gz")),
+        ("ds.tar.zst", _zst(_dataset_tar())),
+    ])
+    async def test_truncated_archive(self, workdir, filename, payload):
+        """An archive cut short, even just before its trailer, is rejected and the name is released."""
+        with pytest.raises(HTTPException) as invalid:
+            await handle_upload(StreamedUpload(filename, _chunks(payload[:-6])))
+
+        assert invalid.value.status_code == 400
+        assert await workdir.datasets.count_documents({}) == 0
+        assert await workdir.images.count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_not_an_archive(self, workdir):
+        """Other file types are still refused."""
+        with pytest.raises(HTTPException) as invalid:
+            await handle_upload(UploadFile(file=io.BytesIO(b"x"), filename="ds.rar"))
+
+        assert invalid.value.status_code == 400
+        assert "Only ZIP files are supported" in invalid.value.detail
+
+    def test_stream_endpoint(self, workdir):
+        """The raw-body endpoint ingests the archive as it is received."""
+        client = TestClient(app)
+
+        response = client.post(
+            "/datasets/upload/stream", params={"filename": "ds.tar.zst"}, content=_zst(_dataset_tar())
+        )
+
+        assert response.status_code == 200
+        assert response.json()["dataset"] == "ds"
+        assert asyncio.run(workdir.images.count_documents({"dataset": "ds"})) == 3
@@ -0,0 +1,95 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from dataset import services
+from utils.tiles import build_pyramid, max_level
+
+
+def _jpeg(size, color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def tiled(workdir, dataset_zip, monkeypatch):
+    monkeypatch.setattr(services, "TILE_MIN_SIZE", 500)
+    payload = dataset_zip(0, files={
+        "train/images/aerial.jpg": _jpeg((600, 300)),
+        "train/images/small.jpg": _jpeg((64, 48)),
+        "train/labels/aerial.txt": "0 0.5 0.5 0.2 0.3",
+        "train/labels/small.txt": "",
+    })
+    client = TestClient(app)
+    response = client.post("/datasets/upload", files={"file": ("ds.zip", payload, "application/zip")})
+    assert response.status_code == 200
+    return client
+
+
+class TestBuildPyramid:
+    """Test cases for cutting tile pyramids."""
+
+    def test_levels_and_tiles(self, temp_directory):
+        """Every level halves the previous one and edge tiles are clipped, with overlap inside."""
+        source = os.path.join(temp_directory, "big.jpg")
+        with open(source, "wb") as fh:
+            fh.write(_jpeg((600, 300)))
+        output = os.path.join(temp_directory, "tiles", "big.jpg")
+
+        descriptor = build_pyramid(source, output, tile_size=256, overlap=1)
+
+        assert descriptor == {
+            "width": 600, "height": 300, "tile_size": 256, "overlap": 1, "format": "jpg", "levels": 11
+        }
+        assert max_level(600, 300) == 10
+        assert sorted(os.listdir(os.path.join(output, "10"))) == ["0_0.jpg", "0_1.jpg", "1_0.jpg", "1_1.jpg", "2_0.jpg", "2_1.jpg"]
+        with Image.open(os.path.join(output, "10", "1_0.jpg")) as tile:
+            assert tile.size == (258, 257)
+        with Image.open(os.path.join(output, "10", "2_1.jpg")) as tile:
+            assert tile.size == (89, 45)
+        with Image.open(os.path.join(output, "9", "0_0.jpg")) as tile:
+            assert tile.size == (257, 150)
+        assert os.listdir(os.path.join(output, "0")) == ["0_0.jpg"]
+        assert json.load(open(os.path.join(output, "pyramid.json")))["levels"] == 11
+
+    def test_undecodable_image(self, temp_directory):
+        """Files that are not images get no pyramid."""
+        source = os.path.join(temp_directory, "broken.jpg")
+        with open(source, "wb") as fh:
+            fh.write(b"not an image")
+
+        assert build_pyramid(source, os.path.join(temp_directory, "out")) is None
+        assert not os.path.exists(os.path.join(temp_directory, "out"))
+
+
+class TestTileEndpoints:
+    """Large images get pyramids at ingest, served tile by tile."""
+
+    def test_descriptor_and_tiles(self, tiled):
+        """Only images above the threshold are tiled; tiles are revalidated by ETag."""
+        descriptor = tiled.get("/datasets/ds/image/aerial.jpg/tiles")
+        assert descriptor.status_code == 200
+        assert descriptor.json()["levels"] == 11
+
+        tile = tiled.get("/datasets/ds/image/aerial.jpg/tiles/10/2_1.jpg")
+        assert tile.status_code == 200 and tile.headers["content-type"] == "image/jpeg"
+        assert tile.headers["cache-control"] == "no-cache" and "etag" in tile.headers
+        revalidated = tiled.get("/datasets/ds/image/aerial.jpg/tiles/10/2_1.jpg", headers={"If-None-Match": tile.headers["etag"]})
+        assert revalidated.status_code == 304
+
+        assert tiled.get("/datasets/ds/image/aerial.jpg/tiles/10/9_9.jpg").status_code == 404
+        assert tiled.get("/datasets/ds/image/small.jpg/tiles").status_code == 404
+
+    def test_nothing_left_in_scratch(self, tiled):
+        """Pyramids are staged with the images and moved into place on publish."""
+        assert sorted(os.listdir("datasets")) == ["images", "labels", "tiles"]
+        assert os.listdir(os.path.join("datasets", "tiles", "ds")) == ["aerial.jpg"]
@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+
+import pytest
+from fastapi import UploadFile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tracing import Trace
+from dataset.services import handle_upload
+
+
+class TestTrace:
+    """Test cases for the span recorder."""
+
+    def test_span_records_wall_and_counts(self):
+        """Stage spans keep wall time and the counters set inside the block."""
+        trace = Trace()
+        with trace.span("parse") as span:
+            span.items = 3
+            span.bytes = 42
+
+        stage = trace.breakdown()["stages"][0]
+        assert stage["name"] == "parse"
+        assert stage["items"] == 3
+        assert stage["bytes"] == 42
+        assert stage["wall_s"] >= 0
+
+    def test_sampling_disabled_by_default(self):
+        """Without a sample rate no per-file spans are kept."""
+        trace = Trace()
+        assert not any(trace.sample() for _ in range(100))
+
+    def test_chrome_trace_format(self):
+        """Exported events use complete ("X") events with microsecond timestamps."""
+        trace = Trace(sample_rate=1.0)
+        with trace.span("extract"):
+            with trace.span("extract", "file") as span:
+                span.args["file"] = "a.jpg"
+
+        events = trace.to_chrome_trace()["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        assert {e["cat"] for e in complete} == {"stage", "file"}
+        assert all(e["dur"] >= 0 for e in complete)
+
+
+class TestUploadTiming:
+    """The upload result carries the per-stage breakdown."""
+
+    @pytest.mark.asyncio
+    async def test_upload_returns_stage_breakdown(self, workdir, dataset_zip):
+        """Every ingest stage appears in the timing breakdown."""
+        payload = dataset_zip(2, label=lambda i: i, split=lambda i: ("train", "valid")[i])
+        upload = UploadFile(file=io.BytesIO(payload), filename="ds.zip")
+
+        result = await handle_upload(upload, trace_sample=1.0, trace_format="chrome")
+
+        stages = {stage["name"]: stage for stage in result["timing"]["stages"]}
+        assert list(stages) == ["write", "dedupe", "reserve", "extract", "validate", "parse", "copy", "hash", "insert"]
+        assert stages["extract"]["items"] == 4
+        assert stages["copy"]["items"] == 2
+        assert len(result["timing"]["sampled_files"]) == 6
+        assert result["trace"]["traceEvents"]
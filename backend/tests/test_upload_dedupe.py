@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+
+
+def _upload(client, name, payload):
+    return client.post("/datasets/upload", files={"file": (name, io.BytesIO(payload), "application/zip")})
+
+
+@pytest.fixture
+def client(workdir):
+    return TestClient(app)
+
+
+class TestIdempotentUpload:
+    """Re-uploading an archive that was already ingested skips the pipeline."""
+
+    def test_archive_hash_is_recorded(self, client, fake_db, dataset_zip):
+        """The dataset keeps the SHA-256 of the archive it was built from."""
+        payload = dataset_zip()
+        assert _upload(client, "ds.zip", payload).status_code == 200
+
+        dataset = asyncio.run(fake_db.datasets.find_one({"name": "ds"}))
+        assert dataset["archive_sha256"] == hashlib.sha256(payload).hexdigest()
+
+    def test_same_name_same_archive_is_reused(self, client, fake_db, dataset_zip):
+        """An identical re-upload returns the existing dataset without ingesting again."""
+        payload = dataset_zip()
+        _upload(client, "ds.zip", payload)
+
+        response = _upload(client, "ds.zip", payload)
+
+        assert response.status_code == 200
+        assert response.json()["reused"] is True
+        stages = [stage["name"] for stage in response.json()["timing"]["stages"]]
+        assert stages == ["write", "dedupe"]
+        assert asyncio.run(fake_db.datasets.count_documents({})) == 1
+
+    def test_same_name_other_archive_conflicts(self, client, dataset_zip):
+        """A different archive under an existing name is still a conflict."""
+        _upload(client, "ds.zip", dataset_zip())
+        assert _upload(client, "ds.zip", dataset_zip(label="1")).status_code == 409
+
+    def test_new_name_clones_by_reference(self, client, fake_db, dataset_zip):
+        """The same archive under a new name shares the source's records and files."""
+        payload = dataset_zip()
+        _upload(client, "ds.zip", payload)
+
+        response = _upload(client, "copy.zip", payload)
+
+        assert response.status_code == 200
+        assert response.json()["cloned_from"] == "ds"
+        assert asyncio.run(fake_db.images.count_documents({})) == 3
+        assert os.path.islink(os.path.join("datasets", "images", "copy"))
+
+        page = client.get("/datasets/copy/images").json()
+        assert page["total_images"] == 3
+        assert page == client.get("/datasets/ds/images").json()
+        batch = client.post("/datasets/copy/images/batch", json={"image_names": ["image1.jpg"]}).json()
+        assert batch["missing"] == []
+        assert client.get("/datasets/copy/image/image1.jpg").content == b"fake image data"
+
+    def test_clone_is_published_in_one_write(self, client, fake_db, monkeypatch, dataset_zip):
+        """A clone is never left reserved: it is inserted completed, and dropped if its images cannot be linked."""
+        payload = dataset_zip()
+        _upload(client, "ds.zip", payload)
+        inserted = []
+        insert_one = fake_db.datasets.insert_one
+
+        async def record_insert(doc):
+            inserted.append(dict(doc))
+            return await insert_one(doc)
+
+        monkeypatch.setattr(fake_db.datasets, "insert_one", record_insert)
+        assert _upload(client, "copy.zip", payload).status_code == 200
+        assert [doc["status"] for doc in inserted if doc["name"] == "copy"] == ["completed"]
+
+        def fail_link(*args):
+            raise OSError("read-only file system")
+
+        monkeypatch.setattr(os, "symlink", fail_link)
+        with pytest.raises(OSError):
+            _upload(client, "other.zip", payload)
+        assert asyncio.run(fake_db.datasets.find_one({"name": "other"})) is None
+
+    def test_invalid_archive_rejected_before_lookup(self, client):
+        """Bytes that are not a ZIP archive fail fast with 400."""
+        response = _upload(client, "ds.zip", b"not a zip")
+        assert response.status_code == 400
@@ -251,7 +251,7 @@ class TestParseLabels:
         
         # Should only process jpg, jpeg, png
         assert len(images) == 3
-        image_names = [os.path.basename(img) for img in images]
+        image_names = [os.path.basename(img) for img, _ in images]
         assert "image1.jpg" in image_names
         assert "image2.jpeg" in image_names
         assert "image3.png" in image_names
@@ -0,0 +1,155 @@
+import asyncio, os, time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from math import ceil
+from typing import Callable, Optional
+
+from utils.metrics import INGEST_QUEUED, INGEST_REJECTED, INGEST_SCRATCH_BYTES
+
+INGEST_MAX_CONCURRENT = int(os.getenv("INGEST_MAX_CONCURRENT", "2"))
+INGEST_MAX_SCRATCH_BYTES = int(os.getenv("INGEST_MAX_SCRATCH_BYTES", str(20 * 1024 ** 3)))
+INGEST_MAX_PER_CLIENT = int(os.getenv("INGEST_MAX_PER_CLIENT", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+INGEST_QUEUE_TIMEOUT = float(os.getenv("INGEST_QUEUE_TIMEOUT_SECONDS", "600"))
+
+# The archive plus its extracted copy live in scratch until the ingest ends
+SCRATCH_FACTOR = 2
+
+
+class AdmissionRejected(Exception):
+    """An upload could not be admitted; ``retry_after`` is None when retrying cannot help."""
+
+    def __init__(self, reason: str, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("client", "nbytes", "future", "on_position")
+
+    def __init__(self, client: str, nbytes: int, future: asyncio.Future, on_position):
+        self.client = client
+        self.nbytes = nbytes
+        self.future = future
+        self.on_position = on_position
+
+
+class IngestScheduler:
+    """
+    Admission control for ingests within one process.
+
+    An upload runs when a concurrency slot is free and its scratch reservation
+    fits; otherwise it waits in a bounded FIFO queue (reporting its position)
+    or is rejected with a retry hint. Each client may only have a few uploads
+    running or queued at once so a single caller cannot fill the queue.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = INGEST_MAX_CONCURRENT,
+        max_scratch_bytes: int = INGEST_MAX_SCRATCH_BYTES,
+        max_per_client: int = INGEST_MAX_PER_CLIENT,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        queue_timeout: float = INGEST_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_scratch_bytes = max_scratch_bytes
+        self.max_per_client = max_per_client
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.scratch_bytes = 0
+        self.clients: Counter = Counter()
+        self._waiters: deque = deque()
+        self._avg_seconds = 30.0
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up, from the moving average ingest time."""
+        return max(1, ceil(self._avg_seconds * (len(self._waiters) + 1) / max(1, self.max_concurrent)))
+
+    def _fits(self, nbytes: int) -> bool:
+        return self.running < self.max_concurrent and self.scratch_bytes + nbytes <= self.max_scratch_bytes
+
+    def _reject(self, reason: str, detail: str, retry_after: Optional[int]):
+        INGEST_REJECTED.labels(reason).inc()
+        raise AdmissionRejected(reason, detail, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, client: str, nbytes: int, on_position: Optional[Callable[[Optional[int]], None]] = None):
+        if nbytes > self.max_scratch_bytes:
+            self._reject("too_large", "Upload is larger than the ingest scratch capacity", None)
+        if self.clients[client] >= self.max_per_client:
+            self._reject("client", "Too many concurrent uploads from this client", self.retry_after())
+        if self._waiters or not self._fits(nbytes):
+            if len(self._waiters) >= self.queue_size:
+                self._reject("queue_full", "Ingest queue is full", self.retry_after())
+            await self._wait(client, nbytes, on_position)
+        else:
+            self._acquire(client, nbytes)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.monotonic() - started)
+            self._release(client, nbytes)
+
+    async def _wait(self, client: str, nbytes: int, on_position):
+        waiter = _Waiter(client, nbytes, asyncio.get_running_loop().create_future(), on_position)
+        self._waiters.append(waiter)
+        self.clients[client] += 1
+        self._report_positions()
+        try:
+            done, _ = await asyncio.wait({waiter.future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            self._reject("timeout", "Timed out waiting for an ingest slot", self.retry_after())
+
+    def _abandon(self, waiter: _Waiter):
+        if waiter.future.done():
+            # Admitted just as we gave up: hand the slot back
+            self._release(waiter.client, waiter.nbytes)
+            return
+        waiter.future.cancel()
+        self._waiters.remove(waiter)
+        self.clients[waiter.client] -= 1
+        if not self.clients[waiter.client]:
+            del self.clients[waiter.client]
+        self._report_positions()
+
+    def _acquire(self, client: str, nbytes: int, counted: bool = False):
+        self.running += 1
+        self.scratch_bytes += nbytes
+        if not counted:
+            self.clients[client] += 1
+        INGEST_SCRATCH_BYTES.set(self.scratch_bytes)
+
+    def _release(self, client: str, nbytes: int):
+        self.running -= 1
+        self.scratch_bytes -= nbytes
+        self.clients[client] -= 1
+        if not self.clients[client]:
+            del self.clients[client]
+        INGEST_SCRATCH_BYTES.set(self.scratch_bytes)
+        self._admit_waiting()
+
+    def _admit_waiting(self):
+        # Strict FIFO: a large upload at the head is not starved by smaller ones behind it
+        while self._waiters and self._fits(self._waiters[0].nbytes):
+            waiter = self._waiters.popleft()
+            self._acquire(waiter.client, waiter.nbytes, counted=True)
+            if waiter.on_position:
+                waiter.on_position(None)
+            waiter.future.set_result(None)
+        self._report_positions()
+
+    def _report_positions(self):
+        INGEST_QUEUED.set(len(self._waiters))
+        for position, waiter in enumerate(self._waiters, start=1):
+            if waiter.on_position:
+                waiter.on_position(position)
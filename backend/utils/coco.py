@@ -0,0 +1,111 @@
+import os
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import ijson
+
+# Images and annotations handled per database round trip
+COCO_BATCH_SIZE = 5000
+
+
+def find_coco_annotations(base_path: str) -> List[str]:
+    """Every JSON file under ``base_path``, in a stable order; each is read as one COCO annotation file."""
+    found = []
+    for directory, _, files in os.walk(base_path):
+        found.extend(os.path.join(directory, name) for name in files if name.lower().endswith(".json"))
+    return sorted(found)
+
+
+def split_of(annotation_path: str) -> str:
+    """YOLO split for an annotation file, from its name (``instances_val2017.json`` -> ``valid``)."""
+    name = os.path.basename(annotation_path).lower()
+    if "val" in name:
+        return "valid"
+    if "test" in name:
+        return "test"
+    return "train"
+
+
+def read_categories(annotation_path: str) -> Dict[int, str]:
+    with open(annotation_path, "rb") as fh:
+        return {int(c["id"]): str(c.get("name", c["id"])) for c in ijson.items(fh, "categories.item", use_float=True)}
+
+
+def iter_images(annotation_path: str) -> Iterator[dict]:
+    """The ``images`` array, one entry at a time, without loading the file."""
+    with open(annotation_path, "rb") as fh:
+        for image in ijson.items(fh, "images.item", use_float=True):
+            yield {
+                "id": image["id"],
+                "file_name": image["file_name"],
+                "width": image.get("width"),
+                "height": image.get("height"),
+            }
+
+
+def iter_annotations(annotation_path: str) -> Iterator[dict]:
+    """The ``annotations`` array, one entry at a time; only what the YOLO representation keeps."""
+    with open(annotation_path, "rb") as fh:
+        for annotation in ijson.items(fh, "annotations.item", use_float=True):
+            yield {
+                "image_id": annotation["image_id"],
+                "category_id": int(annotation["category_id"]),
+                "bbox": annotation.get("bbox"),
+            }
+
+
+def batched(items: Iterable, size: int = COCO_BATCH_SIZE) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def resolve_image(file_name: str, search_dirs: List[str], root: str) -> Optional[str]:
+    """
+    Locate an image named in an annotation file under one of ``search_dirs``.
+
+    ``file_name`` comes from the uploaded file, so absolute names and names
+    with ``..`` are refused, and a candidate only counts if its real path,
+    links resolved, stays inside ``root``, the extraction directory.
+    """
+    parts = file_name.replace("\\", "/").split("/")
+    if not file_name or os.path.isabs(file_name) or ".." in parts:
+        return None
+    root = os.path.realpath(root)
+    for directory in search_dirs:
+        for candidate in (os.path.join(directory, file_name), os.path.join(directory, os.path.basename(file_name))):
+            if os.path.isfile(candidate) and os.path.realpath(candidate).startswith(root + os.sep):
+                return candidate
+    return None
+
+
+def search_dirs(base_path: str, annotation_path: str) -> List[str]:
+    """
+    Where images of an annotation file may live.
+
+    ``file_name`` is relative to an image directory the format does not name;
+    common layouts put it next to the annotation file, at the archive root, in
+    ``images/`` or in a folder named after the split (``train2017/``).
+    """
+    annotation_dir = os.path.dirname(annotation_path)
+    stem = os.path.splitext(os.path.basename(annotation_path))[0]
+    candidates = [
+        annotation_dir,
+        base_path,
+        os.path.join(base_path, "images"),
+        os.path.join(base_path, "images", stem.split("_")[-1]),
+        os.path.join(base_path, stem.split("_")[-1]),
+        os.path.join(os.path.dirname(annotation_dir), "images"),
+    ]
+    return list(dict.fromkeys(d for d in candidates if os.path.isdir(d)))
+
+
+def to_yolo_label(class_index: int, bbox, width: Optional[float], height: Optional[float]) -> Optional[dict]:
+    """COCO pixel ``x y w h`` to the stored YOLO label (normalized centre box); None when it cannot be converted."""
+    if not width or not height or not bbox or len(bbox) != 4:
+        return None
+    x, y, w, h = (float(v) for v in bbox)
+    return {
+        "class": str(class_index),
+        "bbox": [f"{(x + w / 2) / width:.6f}", f"{(y + h / 2) / height:.6f}", f"{w / width:.6f}", f"{h / height:.6f}"],
+    }
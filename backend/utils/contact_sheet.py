@@ -0,0 +1,57 @@
+import json
+import os
+from typing import Dict, List
+
+from PIL import Image, ImageOps
+
+SHEET_COLUMNS = 5
+SHEET_BACKGROUND = (243, 244, 246)
+SHEET_QUALITY = 80
+
+
+def render_sheet(dataset_dir: str, image_names: List[str], tile: int, columns: int, output_path: str) -> Dict:
+    """
+    Render a page of images into one JPEG grid and write its tile map next to it.
+
+    Each image is centre-cropped to a ``tile`` x ``tile`` square (the same framing
+    as ``object-cover`` in the grid UI). Images that are missing or unreadable keep
+    an empty tile and are flagged in the map. Runs in the shared process pool, so
+    it only takes and returns plain picklable values.
+    """
+    rows = max(1, -(-len(image_names) // columns))
+    sheet = Image.new("RGB", (columns * tile, rows * tile), SHEET_BACKGROUND)
+
+    tiles = []
+    for i, image_name in enumerate(image_names):
+        x, y = (i % columns) * tile, (i // columns) * tile
+        entry = {"image_name": image_name, "x": x, "y": y, "width": tile, "height": tile, "missing": False}
+        try:
+            with Image.open(os.path.join(dataset_dir, image_name)) as img:
+                img.draft("RGB", (tile, tile))
+                sheet.paste(ImageOps.fit(img.convert("RGB"), (tile, tile), Image.Resampling.BILINEAR), (x, y))
+        except (OSError, ValueError):
+            entry["missing"] = True
+        tiles.append(entry)
+
+    tile_map = {
+        "tile_size": tile,
+        "columns": columns,
+        "rows": rows,
+        "width": sheet.width,
+        "height": sheet.height,
+        "tiles": tiles,
+    }
+
+    # Write to temporaries and rename so concurrent readers never see a partial sheet
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_sheet, tmp_map = f"{output_path}.{os.getpid()}.tmp", f"{map_path(output_path)}.{os.getpid()}.tmp"
+    sheet.save(tmp_sheet, "JPEG", quality=SHEET_QUALITY)
+    with open(tmp_map, "w") as fh:
+        json.dump(tile_map, fh)
+    os.replace(tmp_sheet, output_path)
+    os.replace(tmp_map, map_path(output_path))
+    return tile_map
+
+
+def map_path(sheet_path: str) -> str:
+    return os.path.splitext(sheet_path)[0] + ".json"
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, features
+
+DERIVATIVE_DIR = os.path.join("datasets", "derivatives")
+# Budget for the whole derivative store; eviction trims it to LOW_WATER of that
+DERIVATIVE_CACHE_BYTES = int(os.getenv("DERIVATIVE_CACHE_BYTES", str(2 * 1024 ** 3)))
+LOW_WATER = 0.9
+# Hits refresh the file's mtime, which is what eviction orders by, at most this often
+TOUCH_INTERVAL = 60.0
+
+# Encoder settings are part of the cache key, so changing them never serves stale derivatives
+FORMATS = {
+    "avif": {"media_type": "image/avif", "params": {"quality": 60, "speed": 8}},
+    "webp": {"media_type": "image/webp", "params": {"quality": 80, "method": 4}},
+}
+# Preferred first: AVIF is smaller still, but only if this Pillow build can encode it
+PREFERENCE = ("avif", "webp")
+
+
+def _supported(name: str) -> bool:
+    return name in features.modules and features.check(name)
+
+
+AVAILABLE = [name for name in PREFERENCE if _supported(name)]
+
+
+def negotiate(accept: Optional[str], available: List[str] = AVAILABLE) -> Optional[str]:
+    """
+    The derivative format to serve for an ``Accept`` header, or None for the original.
+
+    Only formats the client names explicitly count: browsers list the ones they
+    decode, while ``image/*`` or ``*/*`` promise nothing in particular.
+    """
+    if not accept:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type.lower()] = quality
+    for name in available:
+        if accepted.get(FORMATS[name]["media_type"], 0) > 0:
+            return name
+    return None
+
+
+def derivative_key(source: str, size: int, mtime_ns: int, fmt: str) -> str:
+    """
+    Stable name of a derivative: changes whenever the original or the encoder settings do.
+
+    The original's real path is hashed, so clones and in-place datasets, whose
+    image directories are links, share the derivatives of the files behind them.
+    """
+    settings = sorted(FORMATS[fmt]["params"].items())
+    digest = hashlib.sha1(f"{os.path.realpath(source)}:{size}:{mtime_ns}:{settings}".encode()).hexdigest()[:20]
+    return f"{digest}.{fmt}"
+
+
+def transcode(source: str, target: str, fmt: str) -> Optional[int]:
+    """
+    Encode ``source`` as ``fmt`` into ``target``; returns the derivative's size.
+
+    When the derivative would not be smaller than the original an empty
+    marker is stored instead and None returned, so the original is served
+    and the encode is not attempted again. Runs in the shared process pool.
+    """
+    tmp = f"{target}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        with Image.open(source) as img:
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+            img.save(tmp, fmt.upper(), **FORMATS[fmt]["params"])
+    except (OSError, ValueError, Image.DecompressionBombError):
+        open(tmp, "wb").close()
+    size = os.path.getsize(tmp)
+    if not size or size >= os.path.getsize(source):
+        open(tmp, "wb").close()
+        size = 0
+    os.replace(tmp, target)
+    return size or None
+
+
+class DerivativeCache:
+    """
+    Size-bounded on-disk store of derivatives with least-recently-used eviction.
+
+    Recency is the file mtime, refreshed on hits, so every process sharing the
+    directory sees the same order. Each process tracks the store's size from
+    what it wrote; once that passes the budget, ``maintain`` rescans the
+    directory and evicts the oldest files down to the low-water mark. It only
+    touches the file system, so callers run it in a worker thread and install
+    its result with ``replace``.
+    """
+
+    def __init__(self, directory: str = DERIVATIVE_DIR, max_bytes: int = DERIVATIVE_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total: Optional[int] = None
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Path of a stored derivative (possibly an empty marker), refreshing its recency."""
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            return None
+        now = time.time()
+        if now - stat.st_mtime > TOUCH_INTERVAL:
+            os.utime(path, (now, now))
+        self._entries[key] = (stat.st_size, now)
+        self._entries.move_to_end(key)
+        return path
+
+    def added(self, key: str) -> bool:
+        """Account for a derivative just written to ``path(key)``; True when the store needs ``maintain``."""
+        if self._total is None:
+            return True
+        size = os.path.getsize(self.path(key))
+        self._entries[key] = (size, time.time())
+        self._entries.move_to_end(key)
+        self._total += size
+        return self._total > self.max_bytes
+
+    def maintain(self) -> Tuple["OrderedDict[str, Tuple[int, float]]", int]:
+        """Entries and total size of the store as found on disk, after evicting down to the low-water mark."""
+        entries, total = self._scan()
+        if total > self.max_bytes:
+            total = self._evict(entries, total)
+        return entries, total
+
+    def replace(self, entries: "OrderedDict[str, Tuple[int, float]]", total: int):
+        self._entries, self._total = entries, total
+
+    def _scan(self) -> Tuple["OrderedDict[str, Tuple[int, float]]", int]:
+        # Other processes write to and evict from the same directory
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        return OrderedDict((name, (size, mtime)) for mtime, name, size in entries), sum(size for _, _, size in entries)
+
+    def _evict(self, entries: "OrderedDict[str, Tuple[int, float]]", total: int) -> int:
+        target = self.max_bytes * LOW_WATER
+        while entries and total > target:
+            key, (size, _) = entries.popitem(last=False)
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
@@ -0,0 +1,159 @@
+import io
+import zipfile
+from typing import List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# YOLO split folders and the image set names VOC uses for them
+VOC_SPLITS = {"train": "train", "valid": "val", "test": "test"}
+
+
+def yolo_to_pixels(bbox: List[str], width: int, height: int) -> Optional[Tuple[float, float, float, float]]:
+    """Normalized YOLO ``cx cy w h`` to pixel ``x_min y_min w h``; None for values that do not parse."""
+    try:
+        cx, cy, w, h = (float(value) for value in bbox)
+    except (TypeError, ValueError):
+        return None
+    box_w, box_h = w * width, h * height
+    return (
+        round(cx * width - box_w / 2, 2),
+        round(cy * height - box_h / 2, 2),
+        round(box_w, 2),
+        round(box_h, 2),
+    )
+
+
+def class_id(label: dict) -> Optional[int]:
+    try:
+        return int(label["class"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def coco_image(image_id: int, doc: dict) -> dict:
+    return {
+        "id": image_id,
+        "file_name": doc["image_name"],
+        "width": doc.get("width"),
+        "height": doc.get("height"),
+    }
+
+
+def coco_annotations(image_id: int, first_id: int, doc: dict) -> List[dict]:
+    """
+    COCO annotations for one image document, numbered from ``first_id``.
+
+    Images whose dimensions could not be read at ingest have no pixel geometry
+    and contribute no annotations, as do malformed label lines.
+    """
+    width, height = doc.get("width"), doc.get("height")
+    if not width or not height:
+        return []
+    annotations = []
+    for label in doc.get("labels", []):
+        category, box = class_id(label), yolo_to_pixels(label.get("bbox"), width, height)
+        if category is None or box is None:
+            continue
+        annotations.append({
+            "id": first_id + len(annotations),
+            "image_id": image_id,
+            "category_id": category,
+            "bbox": list(box),
+            "area": round(box[2] * box[3], 2),
+            "iscrowd": 0,
+        })
+    return annotations
+
+
+def voc_annotation(dataset_name: str, doc: dict, class_names: Sequence[str] = ()) -> bytes:
+    """
+    Pascal VOC XML for one image document; objects need the image dimensions, like COCO.
+
+    Objects are named from ``class_names`` by class id; ids without a name are
+    written as the id itself.
+    """
+    width, height = doc.get("width") or 0, doc.get("height") or 0
+    objects = []
+    if width and height:
+        for label in doc.get("labels", []):
+            category, box = class_id(label), yolo_to_pixels(label.get("bbox"), width, height)
+            if category is None or box is None:
+                continue
+            x, y, w, h = box
+            # VOC boxes are 1-based inclusive pixel coordinates
+            xmin, ymin = max(1, round(x) + 1), max(1, round(y) + 1)
+            xmax, ymax = min(width, round(x + w)), min(height, round(y + h))
+            objects.append(
+                "  <object>\n"
+                f"    <name>{escape(class_names[category]) if 0 <= category < len(class_names) else category}</name>\n"
+                "    <pose>Unspecified</pose>\n"
+                "    <truncated>0</truncated>\n"
+                "    <difficult>0</difficult>\n"
+                "    <bndbox>\n"
+                f"      <xmin>{xmin}</xmin>\n"
+                f"      <ymin>{ymin}</ymin>\n"
+                f"      <xmax>{xmax}</xmax>\n"
+                f"      <ymax>{ymax}</ymax>\n"
+                "    </bndbox>\n"
+                "  </object>\n"
+            )
+    return (
+        "<annotation>\n"
+        f"  <folder>{escape(dataset_name)}</folder>\n"
+        f"  <filename>{escape(doc['image_name'])}</filename>\n"
+        "  <size>\n"
+        f"    <width>{width}</width>\n"
+        f"    <height>{height}</height>\n"
+        "    <depth>3</depth>\n"
+        "  </size>\n"
+        "  <segmented>0</segmented>\n"
+        + "".join(objects)
+        + "</annotation>\n"
+    ).encode()
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only sink that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    Build a zip archive entry by entry without holding it in memory.
+
+    The archive is written to an unseekable sink, so zipfile emits data
+    descriptors instead of seeking back; ``add`` and ``close`` return the bytes
+    ready to be sent.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._sink = _Chunks()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        self._zip.writestr(name, data)
+        return self._sink.drain()
+
+    def open(self, name: str):
+        """Writable handle for one large entry; collect its output with ``drain`` as it is written."""
+        return self._zip.open(name, "w")
+
+    def drain(self) -> bytes:
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.drain()
@@ -1,11 +1,57 @@
-import zipfile, os
+import asyncio, zipfile, os
+from contextlib import nullcontext
+from typing import AsyncIterator, Optional
+from utils.progress import Progress
+from utils.tracing import Trace
 
-async def extract_zip_async(zip_path: str, dest_path: str):
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(dest_path)
-        top_level = {member.filename.split("/")[0] for member in zip_ref.infolist() if "/" in member.filename}
+async def extract_zip_async(zip_path: str, dest_path: str, trace: Optional[Trace] = None, progress: Optional[Progress] = None):
+    # Extraction is blocking file I/O; keep it off the event loop so reads and progress streams stay live
+    return await asyncio.to_thread(extract_zip, zip_path, dest_path, trace, progress)
+
+
+def extract_zip(zip_path: str, dest_path: str, trace: Optional[Trace] = None, progress: Optional[Progress] = None):
+    trace = trace or Trace()
+    with trace.span("extract") as stage:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            members = zip_ref.infolist()
+            if progress:
+                progress.set_total("extracted", len(members))
+            if not trace.sample_rate and not progress:
+                zip_ref.extractall(dest_path)
+            else:
+                for member in members:
+                    sampled = trace.sample()
+                    with trace.span("extract", "file") if sampled else nullcontext() as span:
+                        zip_ref.extract(member, dest_path)
+                    if sampled:
+                        span.bytes, span.items, span.args["file"] = member.file_size, 1, member.filename
+                    if progress:
+                        progress.add("extracted")
+            stage.bytes = sum(member.file_size for member in members)
+            stage.items = len(members)
+            top_level = {member.filename.split("/")[0] for member in members if "/" in member.filename}
 
     if len(top_level) == 1:
         return os.path.join(dest_path, list(top_level)[0])
     return None
 
+
+class StreamedUpload:
+    """
+    A request body read as it arrives, with the parts of ``UploadFile`` that ingestion uses.
+
+    ``read`` returns the body in the chunks the server receives, so callers
+    that loop until an empty read see the whole archive without it ever being
+    spooled to disk first.
+    """
+
+    def __init__(self, filename: str, chunks: AsyncIterator[bytes], size: Optional[int] = None):
+        self.filename = filename
+        self.size = size
+        self._chunks = chunks
+
+    async def read(self, size: int = -1) -> bytes:
+        async for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
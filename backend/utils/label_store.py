@@ -0,0 +1,306 @@
+import os
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from utils.export import class_id
+
+LABEL_DIR = os.path.join("datasets", "labels")
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+# One row per box, each image's rows contiguous; images without a usable box keep one row with a null class so
+# image counts stay right. class_first marks the first box of its class in its image, which turns
+# "images per class" and class co-occurrence into plain filters instead of distinct counts.
+SCHEMA = pa.schema([
+    ("image_id", pa.int32()),
+    ("image_name", pa.string()),
+    ("split", pa.dictionary(pa.int8(), pa.string())),
+    ("class", pa.int32()),
+    ("class_first", pa.bool_()),
+    ("x", pa.float32()),
+    ("y", pa.float32()),
+    ("w", pa.float32()),
+    ("h", pa.float32()),
+    ("width", pa.int32()),
+    ("height", pa.int32()),
+])
+
+AREA_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+BOX_QUANTILES = [0.5, 0.9, 0.99]
+
+
+def label_store_path(dataset_name: str) -> str:
+    return os.path.join(LABEL_DIR, f"{dataset_name}.parquet")
+
+
+def class_index_paths(store_path: str) -> Tuple[str, str]:
+    """The image table and class -> image index written next to a label file."""
+    stem = os.path.splitext(store_path)[0]
+    return f"{stem}.images.arrow", f"{stem}.classes.arrow"
+
+
+def remove_label_store(dataset_name: str):
+    path = label_store_path(dataset_name)
+    for file in (path, *class_index_paths(path)):
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def _box(label: dict) -> Optional[tuple]:
+    category = class_id(label)
+    # The class column is int32; larger ids are not class ids any tool would produce
+    if category is None or not INT32_MIN <= category <= INT32_MAX:
+        return None
+    try:
+        x, y, w, h = (float(value) for value in label["bbox"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return category, x, y, w, h
+
+
+class LabelStoreWriter:
+    """
+    Write image records to a dataset's Parquet label file, one row group per split of each batch.
+
+    Rows go to a temporary file that replaces ``path`` on ``close``, after the
+    class index derived from it, so a label file's presence means both are
+    complete. Image ids are assigned in the order the records arrive.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Unique per writer: a re-sync and a lazy build of the same store may overlap in one process
+        self.tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = pq.ParquetWriter(self.tmp, SCHEMA)
+        self._next_id = 0
+
+    def write(self, image_docs: Iterable[dict]):
+        # Each row group holds one split, so split filters skip the others by their statistics
+        by_split: Dict[Optional[str], Dict[str, list]] = {}
+        for doc in image_docs:
+            columns = by_split.get(doc.get("split"))
+            if columns is None:
+                columns = by_split[doc.get("split")] = {field.name: [] for field in SCHEMA}
+            image_id = self._next_id
+            self._next_id += 1
+            boxes = [box for box in map(_box, doc.get("labels") or []) if box] or [(None,) * 5]
+            seen = set()
+            for category, x, y, w, h in boxes:
+                columns["image_id"].append(image_id)
+                columns["image_name"].append(doc["image_name"])
+                columns["split"].append(doc.get("split"))
+                columns["class"].append(category)
+                columns["class_first"].append(category is not None and category not in seen)
+                seen.add(category)
+                columns["x"].append(x)
+                columns["y"].append(y)
+                columns["w"].append(w)
+                columns["h"].append(h)
+                columns["width"].append(doc.get("width"))
+                columns["height"].append(doc.get("height"))
+        for columns in by_split.values():
+            self._writer.write_table(pa.table(columns, schema=SCHEMA))
+
+    def close(self):
+        self._writer.close()
+        indexes = write_class_index(self.tmp)
+        for tmp, path in zip(indexes, class_index_paths(self.path)):
+            os.replace(tmp, path)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self._writer.close()
+        for tmp in (self.tmp, *class_index_paths(self.tmp)):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _write_arrow(path: str, table: pa.Table):
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _image_runs(table: pa.Table) -> Tuple[pa.Array, pa.Array]:
+    """First and one-past-last row of every image."""
+    # An image's rows are written together, so every image is one run of image ids
+    runs = pc.run_end_encode(table["image_id"].combine_chunks())
+    ends = pc.cast(runs.run_ends, pa.int64())
+    return (pa.concat_arrays([pa.array([0], pa.int64()), ends[:-1]]) if len(ends) else ends), ends
+
+
+def write_class_index(store_path: str) -> Tuple[str, str]:
+    """
+    Derive the sampling index from a label file: an image table and a class -> image index.
+
+    The image table has one row per image in image id order (``image_name``,
+    ``split``); the class index one row per image and class it contains,
+    sorted by class, so each class's images are one contiguous slice. Both
+    are uncompressed Arrow files, read back memory-mapped without a copy.
+    """
+    table = pq.read_table(store_path, columns=["image_id", "image_name", "split", "class", "class_first"])
+    starts, _ = _image_runs(table)
+    images = pa.table({
+        "image_id": pc.take(table["image_id"], starts),
+        "image_name": pc.take(table["image_name"], starts),
+        "split": pc.cast(pc.take(table["split"], starts), pa.string()),
+    }).sort_by("image_id").drop_columns(["image_id"])
+    classes = table.filter(table["class_first"]).select(["class", "image_id"]).sort_by([("class", "ascending"), ("image_id", "ascending")])
+
+    paths = class_index_paths(store_path)
+    _write_arrow(paths[0], images)
+    _write_arrow(paths[1], classes.combine_chunks())
+    return paths
+
+
+def read_class_index(store_path: str) -> Tuple[pa.Table, pa.Table]:
+    """The image table and class index of a label file, memory-mapped."""
+    return tuple(pa.ipc.open_file(pa.memory_map(path)).read_all() for path in class_index_paths(store_path))
+
+
+def read_label_store(path: str, columns: List[str], split: Optional[str] = None) -> pa.Table:
+    """The requested columns of a label file, only the rows of ``split`` if given."""
+    store = pq.ParquetFile(path, memory_map=True)
+    if not split:
+        # Every row group has its own split dictionary; kernels grouping by split need one
+        return store.read(columns=columns).unify_dictionaries()
+    # Row groups hold one split each (see LabelStoreWriter), so their statistics tell which to read
+    index = store.schema_arrow.get_field_index("split")
+    groups = []
+    for group in range(store.num_row_groups):
+        stats = store.metadata.row_group(group).column(index).statistics
+        if stats is not None and stats.has_min_max and stats.min == stats.max == split:
+            groups.append(group)
+    return store.read_row_groups(groups, columns=columns).unify_dictionaries()
+
+
+def _quantiles(values: pa.ChunkedArray, quantiles: List[float]) -> Dict[str, Optional[float]]:
+    result = pc.quantile(values, q=quantiles) if len(values) else [None] * len(quantiles)
+    return {f"p{round(q * 100)}": (value.as_py() if hasattr(value, "as_py") else value) for q, value in zip(quantiles, result)}
+
+
+def class_counts(table: pa.Table) -> List[dict]:
+    """Boxes and images per class."""
+    grouped = table.group_by("class").aggregate([("class", "count"), ("class_first", "sum")])
+    return [
+        {"class": row["class"], "boxes": row["class_count"], "images": row["class_first_sum"]}
+        for row in grouped.sort_by("class").to_pylist()
+        # The null group is the images without boxes
+        if row["class"] is not None
+    ]
+
+
+def boxes_per_image(table: pa.Table) -> List[dict]:
+    """Image and box counts per split, with the distribution of boxes per image (images without boxes count as 0)."""
+    starts, ends = _image_runs(table)
+    # Only images without boxes have a row with a null class, and exactly one
+    counts = pc.subtract(
+        pc.subtract(ends, starts),
+        pc.cast(pc.is_null(pc.take(table["class"], starts)), pa.int64()),
+    )
+    splits = pc.cast(pc.take(table["split"], starts), pa.string())
+    results = []
+    for split in sorted(pc.unique(splits).to_pylist(), key=lambda s: (s is None, s)):
+        split_counts = counts.filter(pc.is_null(splits) if split is None else pc.equal(splits, split))
+        min_max = pc.min_max(split_counts).as_py()
+        results.append({
+            "split": split,
+            "images": len(split_counts),
+            "boxes": pc.sum(split_counts).as_py(),
+            "mean": pc.mean(split_counts).as_py(),
+            "min": min_max["min"],
+            "max": min_max["max"],
+            **_quantiles(split_counts, BOX_QUANTILES),
+        })
+    return results
+
+
+def bbox_area(table: pa.Table, group_by: Optional[str] = None) -> List[dict]:
+    """
+    Percentiles of box area in pixels, with the mean area as a fraction of the image.
+
+    Boxes of images whose size could not be read at ingest have no pixel area.
+    With ``group_by`` ("class" or "split") there is one entry per group.
+    """
+    # Null classes (images without boxes) have null geometry too, so both drop out of the aggregates
+    fraction = pc.multiply(table["w"], table["h"])
+    pixels = pc.multiply(
+        fraction, pc.multiply(pc.cast(table["width"], pa.float32()), pc.cast(table["height"], pa.float32()))
+    )
+    if group_by is None:
+        pixels = pc.drop_null(pixels)
+        return [{
+            "boxes": pc.count(fraction).as_py(),
+            "mean_fraction": pc.mean(fraction).as_py(),
+            "mean": pc.mean(pixels).as_py(),
+            **_quantiles(pixels, AREA_QUANTILES),
+        }]
+
+    group = table[group_by]
+    if pa.types.is_dictionary(group.type):
+        # Splits are dictionary-encoded, which sorting does not support
+        group = group.cast(pa.string())
+    areas = pa.table({"group": group, "fraction": fraction, "pixels": pixels}).filter(pc.is_valid(fraction))
+    grouped = areas.group_by("group").aggregate([
+        ("fraction", "count"), ("fraction", "mean"), ("pixels", "mean"),
+        ("pixels", "tdigest", pc.TDigestOptions(q=AREA_QUANTILES, skip_nulls=True)),
+    ])
+    labels = [f"p{round(q * 100)}" for q in AREA_QUANTILES]
+    return [
+        {
+            group_by: row["group"],
+            "boxes": row["fraction_count"],
+            "mean_fraction": row["fraction_mean"],
+            "mean": row["pixels_mean"],
+            **dict(zip(labels, row["pixels_tdigest"] or [None] * len(labels))),
+        }
+        for row in grouped.sort_by("group").to_pylist()
+    ]
+
+
+def cooccurrence(table: pa.Table) -> List[dict]:
+    """Pairs of classes that appear in the same image, with how many images they share, most frequent first."""
+    present = table.filter(table["class_first"])
+    image_ids = present["image_id"].combine_chunks()
+    classes = present["class"].combine_chunks()
+    # Each image's classes are adjacent, so comparing every row with the one ``shift`` rows later yields
+    # each pair once; no image has more classes than the first shift that finds no pair
+    low, high = [], []
+    for shift in range(1, len(image_ids)):
+        same = pc.equal(image_ids[shift:], image_ids[:-shift])
+        if not pc.any(same).as_py():
+            break
+        a, b = classes[:-shift].filter(same), classes[shift:].filter(same)
+        low.append(pc.min_element_wise(a, b))
+        high.append(pc.max_element_wise(a, b))
+    pairs = pa.table({
+        "class_a": pa.chunked_array(low, pa.int32()),
+        "class_b": pa.chunked_array(high, pa.int32()),
+    })
+    counted = pairs.group_by(["class_a", "class_b"]).aggregate([([], "count_all")])
+    counted = counted.sort_by([("count_all", "descending"), ("class_a", "ascending"), ("class_b", "ascending")])
+    return [
+        {"classes": [row["class_a"], row["class_b"]], "images": row["count_all"]}
+        for row in counted.to_pylist()
+    ]
+
+
+# Name -> (columns read from the store, aggregation)
+AGGREGATIONS = {
+    "class_counts": (["class", "class_first"], class_counts),
+    "boxes_per_image": (["image_id", "split", "class"], boxes_per_image),
+    "bbox_area": (["w", "h", "width", "height"], bbox_area),
+    "cooccurrence": (["image_id", "class", "class_first"], cooccurrence),
+}
+
+
+def run_aggregation(path: str, aggregation: str, split: Optional[str] = None, group_by: Optional[str] = None) -> List[dict]:
+    """Run one of ``AGGREGATIONS`` over a label file, reading only the columns it needs."""
+    columns, aggregate = AGGREGATIONS[aggregation]
+    if aggregation == "bbox_area":
+        # Percentiles grouped by class or split are t-digest estimates; ungrouped ones are exact
+        return aggregate(read_label_store(path, columns + [group_by] if group_by else columns, split), group_by)
+    return aggregate(read_label_store(path, columns, split))
@@ -0,0 +1,76 @@
+import asyncio, os, socket, uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import PyMongoError
+
+LEASE_SECONDS = float(os.getenv("INGEST_LEASE_SECONDS", "60"))
+
+
+class LeaseLost(Exception):
+    """Another process took the document over after our lease expired."""
+
+
+class Lease:
+    """
+    Time-limited ownership of one Mongo document, shared by every worker and replica.
+
+    The owner writes ``lease_owner``/``lease_expires`` onto the document (see
+    ``claim``) and renews the expiry in the background while the lease is held
+    (``async with lease``). Writes that must only happen while we still own the
+    document filter on ``guard()``. If the holder dies, the expiry lapses and
+    another process may claim the document.
+    """
+
+    def __init__(self, collection, ttl: float = LEASE_SECONDS):
+        self.collection = collection
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.document_id = None
+        self.lost = False
+        # Set once ``release`` succeeded: the document is no longer ours to clean up
+        self.released = False
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def claim(self) -> dict:
+        return {"lease_owner": self.owner, "lease_expires": datetime.utcnow() + timedelta(seconds=self.ttl)}
+
+    def guard(self) -> dict:
+        return {"_id": self.document_id, "lease_owner": self.owner}
+
+    async def renew(self):
+        result = await self.collection.update_one(self.guard(), {"$set": self.claim()})
+        if not result.matched_count:
+            self.lost = True
+            raise LeaseLost(f"Lease on {self.document_id} was lost")
+
+    async def release(self, update: dict) -> bool:
+        """Apply ``update`` and drop the lease in one write; False if the lease was already lost."""
+        update = dict(update)
+        update["$unset"] = {**update.get("$unset", {}), "lease_owner": "", "lease_expires": ""}
+        result = await self.collection.update_one(self.guard(), update)
+        self.lost = not result.matched_count
+        self.released = not self.lost
+        return self.released
+
+    async def _renew_forever(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self.renew()
+            except LeaseLost:
+                return
+            except PyMongoError:
+                # Transient; the lease survives until it expires, so keep trying
+                continue
+
+    async def __aenter__(self):
+        self._heartbeat = asyncio.create_task(self._renew_forever())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except (asyncio.CancelledError, Exception):
+            pass
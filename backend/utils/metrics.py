@@ -0,0 +1,79 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_duration_seconds",
+    "Time spent in each ingest stage per upload",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+INGEST_BYTES = Counter("ingest_bytes_total", "Archive bytes received for ingestion")
+INGEST_IMAGES = Counter("ingest_images_total", "Images ingested")
+UPLOADS_IN_FLIGHT = Gauge("ingest_uploads_in_flight", "Uploads currently being processed")
+INGEST_QUEUED = Gauge("ingest_uploads_queued", "Uploads waiting for admission")
+INGEST_SCRATCH_BYTES = Gauge("ingest_scratch_bytes_reserved", "Scratch disk bytes reserved by admitted uploads")
+INGEST_REJECTED = Counter("ingest_uploads_rejected_total", "Uploads turned away by admission control", ["reason"])
+INGEST_JOBS = Counter("ingest_jobs_total", "Ingest job transitions by resulting status", ["status"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+
+
+def observe_stage(stage: str, seconds: float):
+    INGEST_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template.
+
+    Labels use the matched route path (``/datasets/{dataset_name}/images``) rather
+    than the raw URL so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], _route_template(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def _route_template(scope) -> str:
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    # Routes of an included router may only know their path relative to the router prefix;
+    # the prefix segments are the leading static segments of the request path.
+    parts = scope["path"].split("/")
+    depth = len(parts) - len(template.split("/")) + 1
+    return "/".join(parts[:depth]) + template if depth > 1 else template
@@ -0,0 +1,113 @@
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import orjson
+
+from utils.yolo import IMAGE_EXTENSIONS, SPLITS, parse_label_lines, unique_image_name
+
+INDEX_DIR = os.path.join("datasets", "index")
+
+# image name -> [split, image size, image mtime_ns, label size (-1 without a label), label mtime_ns],
+# followed by the file name when the image is stored under a split-qualified name
+Index = Dict[str, list]
+
+
+def scan_yolo_dir(base_path: str) -> Index:
+    """
+    Stat every image and label file of a YOLO directory, without reading any of them.
+
+    Like ``parse_labels``, only splits with both ``images/`` and ``labels/`` count
+    and a later split's image is keyed by a split-qualified name when an
+    earlier split holds one of the same file name.
+    """
+    index: Index = {}
+    for split in SPLITS:
+        images_dir = os.path.join(base_path, split, "images")
+        labels_dir = os.path.join(base_path, split, "labels")
+        if not os.path.isdir(images_dir) or not os.path.isdir(labels_dir):
+            continue
+
+        labels = {}
+        with os.scandir(labels_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".txt") and entry.is_file():
+                    stat = entry.stat()
+                    labels[entry.name[:-4]] = (stat.st_size, stat.st_mtime_ns)
+
+        with os.scandir(images_dir) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                label_size, label_mtime = labels.get(os.path.splitext(entry.name)[0], (-1, 0))
+                name = unique_image_name(entry.name, split, index)
+                index[name] = [split, stat.st_size, stat.st_mtime_ns, label_size, label_mtime]
+                if name != entry.name:
+                    index[name].append(entry.name)
+    return index
+
+
+def diff_index(previous: Index, current: Index) -> Tuple[List[str], List[str]]:
+    """Images that are new or whose image or label file changed, and images that are gone."""
+    changed = [name for name, entry in current.items() if previous.get(name) != entry]
+    removed = [name for name in previous if name not in current]
+    return changed, removed
+
+
+def _file_name(name: str, entry: list) -> str:
+    return entry[5] if len(entry) > 5 else name
+
+
+def image_path(base_path: str, name: str, entry: list) -> str:
+    return os.path.join(base_path, entry[0], "images", _file_name(name, entry))
+
+
+def read_labels(base_path: str, index: Index, names: Iterable[str]) -> Dict[str, List[Dict[str, str]]]:
+    labels = {}
+    for name in names:
+        entry = index[name]
+        if entry[3] < 0:
+            labels[name] = []
+            continue
+        with open(os.path.join(base_path, entry[0], "labels", os.path.splitext(_file_name(name, entry))[0] + ".txt")) as fh:
+            labels[name] = parse_label_lines(fh)
+    return labels
+
+
+def index_path(dataset_name: str) -> str:
+    return os.path.join(INDEX_DIR, f"{dataset_name}.json")
+
+
+def load_index(path: str) -> Index:
+    """The index saved by the last sync; empty if there is none."""
+    try:
+        with open(path, "rb") as fh:
+            return orjson.loads(fh.read())
+    except FileNotFoundError:
+        return {}
+
+
+def save_index(path: str, index: Index):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(orjson.dumps(index))
+    os.replace(tmp, path)
+
+
+def link_images(target_dir: str, sources: Dict[str, str]):
+    """Point ``target_dir/<name>`` at each source image, replacing older links of the same name."""
+    os.makedirs(target_dir, exist_ok=True)
+    for name, source in sources.items():
+        link = os.path.join(target_dir, name)
+        tmp = f"{link}.link"
+        os.symlink(os.path.abspath(source), tmp)
+        os.replace(tmp, link)
+
+
+def unlink_images(target_dir: str, names: Iterable[str]):
+    for name in names:
+        try:
+            os.unlink(os.path.join(target_dir, name))
+        except FileNotFoundError:
+            pass
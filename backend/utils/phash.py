@@ -0,0 +1,142 @@
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from utils.pool import get_process_pool
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Below this many files the pool start-up costs more than hashing inline.
+POOL_THRESHOLD = 64
+
+# Beyond this radius the index chunks shrink below 8 bits, buckets fill up and a lookup is
+# close to a scan of every stored hash.
+MAX_DISTANCE = 8
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale thumbnail."""
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def fingerprint_file(path: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Return ``(hash, width, height)``; all None when the file is not a decodable image."""
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            # Let the JPEG decoder downscale while decoding, it is much cheaper than a full decode.
+            image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+            return dhash(image), width, height
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None, None, None
+
+
+def fingerprint_files(paths: Sequence[str]) -> List[Tuple[Optional[int], Optional[int], Optional[int]]]:
+    if len(paths) < POOL_THRESHOLD:
+        return [fingerprint_file(p) for p in paths]
+    chunksize = max(1, len(paths) // 256)
+    return list(get_process_pool().map(fingerprint_file, paths, chunksize=chunksize))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def format_hash(value: int) -> str:
+    return f"{value:016x}"
+
+
+def parse_hash(value: str) -> int:
+    return int(value, 16)
+
+
+class HashIndex:
+    """
+    Multi-index hashing over 64-bit hashes.
+
+    Each hash is split into ``max_distance + 1`` disjoint bit chunks. Two hashes
+    within ``max_distance`` bits of each other must agree exactly on at least one
+    chunk (pigeonhole), so candidates come from a handful of bucket lookups
+    instead of a scan over every stored hash.
+    """
+
+    def __init__(self, max_distance: int = 4, bits: int = HASH_BITS):
+        if not 0 <= max_distance <= min(MAX_DISTANCE, bits - 1):
+            raise ValueError(f"max_distance must be between 0 and {min(MAX_DISTANCE, bits - 1)}")
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        widths = [bits // chunks + (1 if i < bits % chunks else 0) for i in range(chunks)]
+        self._chunks: List[Tuple[int, int]] = []
+        shift = bits
+        for width in widths:
+            shift -= width
+            self._chunks.append((shift, (1 << width) - 1))
+        self._tables: List[Dict[int, List[int]]] = [defaultdict(list) for _ in widths]
+        self._items: Dict[int, List[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._items.values())
+
+    def _keys(self, value: int) -> Iterable[Tuple[int, int]]:
+        for i, (shift, mask) in enumerate(self._chunks):
+            yield i, (value >> shift) & mask
+
+    def add(self, key: Hashable, value: int):
+        keys = self._items.get(value)
+        if keys is None:
+            self._items[value] = [key]
+            for i, chunk in self._keys(value):
+                self._tables[i][chunk].append(value)
+        else:
+            keys.append(key)
+
+    def _candidates(self, value: int) -> set:
+        found = set()
+        for i, chunk in self._keys(value):
+            found.update(self._tables[i].get(chunk, ()))
+        return found
+
+    def query(self, value: int, radius: Optional[int] = None) -> List[Tuple[int, Hashable]]:
+        """Return ``(distance, key)`` for every stored hash within ``radius`` bits of ``value``."""
+        radius = self.max_distance if radius is None else radius
+        if radius > self.max_distance:
+            raise ValueError(f"radius {radius} exceeds the index max_distance {self.max_distance}")
+        results = []
+        for candidate in self._candidates(value):
+            distance = hamming(value, candidate)
+            if distance <= radius:
+                results.extend((distance, key) for key in self._items[candidate])
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def clusters(self, radius: Optional[int] = None) -> List[List[Hashable]]:
+        """Group keys into connected components of hashes within ``radius`` bits of each other."""
+        radius = self.max_distance if radius is None else radius
+        parent = {value: value for value in self._items}
+
+        def find(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        for value in self._items:
+            for candidate in self._candidates(value):
+                if candidate > value and hamming(value, candidate) <= radius:
+                    ra, rb = find(value), find(candidate)
+                    if ra != rb:
+                        parent[rb] = ra
+
+        groups: Dict[int, List[Hashable]] = defaultdict(list)
+        for value, keys in self._items.items():
+            groups[find(value)].extend(keys)
+        return [keys for keys in groups.values() if len(keys) > 1]
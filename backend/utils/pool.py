@@ -0,0 +1,22 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", "0")) or None
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound image work (hashing, resizing, encoding)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS)
+    return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,107 @@
+import asyncio, os, time
+from typing import AsyncIterator, Dict, Optional
+
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL_SECONDS", "0.25"))
+PROGRESS_RETENTION = float(os.getenv("PROGRESS_RETENTION_SECONDS", "60"))
+
+COUNTERS = ("extracted", "parsed", "placed", "written")
+
+
+class Progress:
+    """
+    Live progress of one ingest, shared between the pipeline and its subscribers.
+
+    The pipeline only assigns attributes and bumps integers, so updates are safe
+    from worker threads and never wait on a slow client. Subscribers sample the
+    state at a fixed interval and only emit when it changed, which coalesces any
+    number of updates into at most one event per interval.
+    """
+
+    def __init__(self, upload_id: str):
+        self.upload_id = upload_id
+        self.stage = "pending"
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.totals: Dict[str, int] = {}
+        self.done = False
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.queue_position: Optional[int] = None
+        self.version = 0
+        self.finished_at: Optional[float] = None
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+        self.version += 1
+
+    def set_queue_position(self, position: Optional[int]):
+        self.queue_position = position
+        self.version += 1
+
+    def add(self, counter: str, n: int = 1):
+        self.counters[counter] += n
+        self.version += 1
+
+    def set_total(self, counter: str, total: int):
+        self.totals[counter] = total
+        self.version += 1
+
+    def finish(self, result: Optional[dict] = None, error: Optional[str] = None):
+        self.stage = "failed" if error else "completed"
+        self.result, self.error = result, error
+        self.done = True
+        self.finished_at = time.monotonic()
+        self.version += 1
+
+    def snapshot(self) -> dict:
+        data = {
+            "upload_id": self.upload_id,
+            "stage": self.stage,
+            "counters": dict(self.counters),
+            "totals": dict(self.totals),
+        }
+        if self.queue_position is not None:
+            data["queue_position"] = self.queue_position
+        if self.error:
+            data["error"] = self.error
+        if self.result is not None:
+            data["result"] = self.result
+        return data
+
+    async def updates(self, interval: float = PROGRESS_INTERVAL) -> AsyncIterator[dict]:
+        """Snapshots whenever the state changed, at most one per ``interval``, until the ingest ends."""
+        seen = -1
+        while True:
+            # Read done first: a finish landing after it is picked up by the next pass
+            done = self.done
+            if self.version != seen:
+                seen = self.version
+                yield self.snapshot()
+            if done:
+                return
+            await asyncio.sleep(interval)
+
+
+_uploads: Dict[str, Progress] = {}
+
+
+def _prune():
+    now = time.monotonic()
+    for upload_id, progress in list(_uploads.items()):
+        if progress.done and now - progress.finished_at > PROGRESS_RETENTION:
+            del _uploads[upload_id]
+
+
+def lookup(upload_id: str) -> Optional[Progress]:
+    """Progress of an ingest running (or recently finished) in this process."""
+    _prune()
+    return _uploads.get(upload_id)
+
+
+def start(upload_id: str) -> Optional[Progress]:
+    """Claim ``upload_id`` for a new ingest; None if another ingest in this process already uses it."""
+    _prune()
+    if upload_id in _uploads:
+        return None
+    progress = _uploads[upload_id] = Progress(upload_id)
+    progress.set_stage("queued")
+    return progress
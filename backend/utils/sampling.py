@@ -0,0 +1,89 @@
+import random
+from typing import Dict, List, Optional, Set
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils.label_store import read_class_index
+
+
+def _draw(rng: random.Random, candidates: pa.Array, count: int, taken: Set[int]) -> List[int]:
+    """
+    ``count`` random entries of ``candidates`` not in ``taken``, fewer if there are not enough.
+
+    A few more positions than needed are drawn up front, which is enough
+    unless most candidates are taken already; only then are the remaining
+    ones shuffled whole. The result depends on nothing but the rng state.
+    """
+    size = len(candidates)
+    drawn = rng.sample(range(size), min(size, 2 * count + 16))
+    picked = []
+    for image_id in pc.take(candidates, pa.array(drawn, pa.int64())).to_pylist():
+        if image_id not in taken:
+            picked.append(image_id)
+            taken.add(image_id)
+            if len(picked) == count:
+                return picked
+    if len(drawn) < size:
+        seen = set(drawn)
+        rest = [position for position in range(size) if position not in seen]
+        rng.shuffle(rest)
+        for image_id in pc.take(candidates, pa.array(rest, pa.int64())).to_pylist():
+            if image_id not in taken:
+                picked.append(image_id)
+                taken.add(image_id)
+                if len(picked) == count:
+                    break
+    return picked
+
+
+def sample_images(
+    store_path: str,
+    seed: int,
+    count: Optional[int] = None,
+    per_class: Optional[int] = None,
+    split: Optional[str] = None,
+) -> Dict:
+    """
+    Draw a deterministic sample of a dataset from its class index.
+
+    With ``count``, that many images uniformly at random. With ``per_class``,
+    up to that many images of every class in every split, each image picked
+    for one class only; the rarest classes pick first so common classes do
+    not use up the images they share. ``split`` limits either to one split.
+    The same seed over the same dataset gives the same sample. Returns the
+    picked images, by name, with their split and the sample size per stratum.
+    """
+    images, classes = read_class_index(store_path)
+    splits = images["split"]
+    rng = random.Random(seed)
+    picked: List[int] = []
+
+    if per_class is None:
+        # Positions in the image table are image ids; names are never null, so this is every id
+        candidates = pc.indices_nonzero(pc.equal(splits, split) if split else pc.is_valid(images["image_name"]))
+        picked = _draw(rng, candidates, count, set())
+        strata = [{"split": split, "images": len(picked)}]
+    else:
+        pair_splits = pc.take(splits, classes["image_id"])
+        strata = []
+        for stratum_split in [split] if split else sorted(pc.unique(splits).drop_null().to_pylist()):
+            in_split = classes.filter(pc.equal(pair_splits, stratum_split))
+            counts = pc.value_counts(in_split["class"]).to_pylist()
+            offsets, start = {}, 0
+            # The index is sorted by class, so each class is one slice
+            for entry in sorted(counts, key=lambda entry: entry["values"]):
+                offsets[entry["values"]] = (start, entry["counts"])
+                start += entry["counts"]
+            taken: Set[int] = set()
+            for class_id, (start, length) in sorted(offsets.items(), key=lambda item: (item[1][1], item[0])):
+                chosen = _draw(rng, in_split["image_id"].slice(start, length), per_class, taken)
+                picked.extend(chosen)
+                strata.append({"split": stratum_split, "class": class_id, "images": len(chosen)})
+
+    chosen = pc.take(images, pa.array(picked, pa.int64())) if picked else images.slice(0, 0)
+    chosen = chosen.sort_by("image_name")
+    return {
+        "images": chosen.to_pylist(),
+        "strata": strata,
+    }
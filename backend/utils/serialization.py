@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _bson_default(value):
+    # Same shapes as bson.json_util in relaxed mode, which the frontend already parses
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if value.year < 1970:
+            millis = int((value.replace(tzinfo=timezone.utc) - _EPOCH).total_seconds() * 1000)
+            return {"$date": {"$numberLong": str(millis)}}
+        if value.microsecond >= 1000:
+            return {"$date": value.isoformat(timespec="milliseconds") + "Z"}
+        return {"$date": value.isoformat(timespec="seconds") + "Z"}
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode documents straight from BSON types to JSON bytes in one pass."""
+    return orjson.dumps(content, default=_bson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+class BSONJSONResponse(Response):
+    """
+    JSON response for Mongo documents, skipping FastAPI's jsonable_encoder pass.
+
+    Accepts either content to encode or bytes that were already encoded, e.g. a
+    page body precomputed at ingest.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,246 @@
+import os, queue, shutil, tarfile, threading, zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import zstandard
+
+from utils.progress import Progress
+from utils.tracing import Trace
+from utils.yolo import IMAGE_EXTENSIONS, SPLITS, parse_label_lines, unique_image_name
+
+# Compression of each supported tar suffix
+TAR_SUFFIXES = {".tar": "", ".tar.gz": "gz", ".tgz": "gz", ".tar.zst": "zst", ".tzst": "zst"}
+
+PIPE_CHUNKS = 16
+READ_SIZE = 1024 * 1024
+
+
+def archive_kind(filename: str) -> Optional[str]:
+    """``zip``, ``tar``, ``tar.gz`` or ``tar.zst`` for a supported archive name, else None."""
+    name = filename.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    for suffix, compression in TAR_SUFFIXES.items():
+        if name.endswith(suffix):
+            return f"tar.{compression}" if compression else "tar"
+    return None
+
+
+def archive_stem(filename: str) -> str:
+    """Dataset name for an archive: the file name without its archive suffix."""
+    name = filename.lower()
+    for suffix in (".zip", *TAR_SUFFIXES):
+        if name.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+class ChunkPipe:
+    """
+    Bounded byte pipe from the event loop to a thread reading a file object.
+
+    ``feed`` blocks while ``PIPE_CHUNKS`` chunks are waiting, which throttles
+    the upload to the pace of decompression. Once the reader is done, further
+    chunks are dropped, or the reader's error is raised if it failed.
+    """
+
+    def __init__(self, max_chunks: int = PIPE_CHUNKS):
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(max_chunks)
+        self._buffer = b""
+        self._reader_done = threading.Event()
+        self._reader_error: Optional[BaseException] = None
+        self._aborted = threading.Event()
+
+    # Writer side (called through asyncio.to_thread)
+
+    def feed(self, chunk: Optional[bytes]):
+        """Queue ``chunk``; None marks the end of the stream."""
+        while not self._reader_done.is_set():
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        if self._reader_error is not None:
+            raise self._reader_error
+
+    def abort(self):
+        """The upload broke off; the reader fails instead of waiting for more bytes."""
+        self._aborted.set()
+
+    # Reader side
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._buffer:
+            try:
+                chunk = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._aborted.is_set():
+                    raise OSError("Upload was interrupted")
+                continue
+            if chunk is None:
+                self._queue.put(None)  # stay at EOF for further reads
+                return b""
+            self._buffer = chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close_reader(self, error: Optional[BaseException] = None):
+        self._reader_error = error
+        self._reader_done.set()
+
+
+class _Decompressed:
+    """
+    Read-only view of a compressed stream, decompressed as it is read.
+
+    Unlike tarfile's own gzip handling, a stream that ends before its trailer
+    raises ``EOFError``, so a truncated upload is never taken for a short
+    archive. Concatenated gzip members and zstd frames are read back to back.
+    """
+
+    def __init__(self, fileobj, decompressor: Callable):
+        self._fileobj = fileobj
+        self._new = decompressor
+        self._decompressor = decompressor()
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._buffer and not self._eof:
+            data = self._fileobj.read(READ_SIZE)
+            if not data:
+                if not self._decompressor.eof:
+                    raise EOFError("Compressed archive ended before the end of its stream")
+                self._eof = True
+                break
+            if self._decompressor.eof:
+                self._decompressor = self._new()
+            self._buffer = self._decompressor.decompress(data)
+            while self._decompressor.eof and self._decompressor.unused_data:
+                rest, self._decompressor = self._decompressor.unused_data, self._new()
+                self._buffer += self._decompressor.decompress(rest)
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+DECOMPRESSORS = {
+    "tar.gz": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    "tar.zst": lambda: zstandard.ZstdDecompressor().decompressobj(),
+}
+
+
+class TarContents:
+    """What a tar archive held: YOLO images placed in staging and their labels, anything else extracted."""
+
+    __slots__ = ("images", "labels", "extracted")
+
+    def __init__(self, images: List[Tuple[str, str]], labels: Dict[str, List[Dict[str, str]]], extracted: str):
+        self.images = images
+        self.labels = labels
+        self.extracted = extracted
+
+
+def _parts(name: str) -> List[str]:
+    return [part for part in name.split("/") if part not in ("", ".")]
+
+
+def _yolo_member(name: str) -> Optional[Tuple[str, str, str]]:
+    # <anything>/<split>/(images|labels)/<file>  ->  (split, kind, file)
+    parts = _parts(name)
+    if len(parts) >= 3 and parts[-2] in ("images", "labels") and parts[-3] in SPLITS:
+        return parts[-3], parts[-2], parts[-1]
+    return None
+
+
+def read_tar(
+    fileobj,
+    kind: str,
+    staged_images: str,
+    extracted: str,
+    trace: Optional[Trace] = None,
+    progress: Optional[Progress] = None,
+) -> TarContents:
+    """
+    Unpack a tar archive in one sequential pass, as its bytes arrive.
+
+    ``fileobj`` only needs ``read``: the archive is decompressed as a stream
+    (gzip by zlib, zstd by zstandard), so it can be a pipe fed by an upload
+    that is still in progress. Members in the YOLO layout are handled on the
+    fly: label files are parsed and images are written straight into
+    ``staged_images``. Every other member is extracted under ``extracted``
+    for the COCO import to pick up.
+
+    Like ``parse_labels``, a split only counts if it has a labels directory
+    and labels are keyed by image name; when several splits hold an image of
+    the same file name, the first one in the archive keeps it and the others
+    are stored under split-qualified names.
+    """
+    trace = trace or Trace()
+    os.makedirs(staged_images, exist_ok=True)
+    os.makedirs(extracted, exist_ok=True)
+    # (split, file name) -> stored image name; a member repeated within a split is skipped
+    names: Dict[Tuple[str, str], str] = {}
+    taken = set()
+    images: List[Tuple[str, str, str]] = []
+    split_labels: Dict[Tuple[str, str], List[Dict[str, str]]] = {}
+    labelled_splits = set()
+
+    with trace.span("extract") as span:
+        if kind in DECOMPRESSORS:
+            fileobj = _Decompressed(fileobj, DECOMPRESSORS[kind])
+        with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+            for member in tar:
+                if progress:
+                    progress.add("extracted")
+                if member.isdir():
+                    # Directories are created on demand; a labels directory still marks its split as labelled
+                    parts = _parts(member.name)
+                    if len(parts) >= 2 and parts[-1] == "labels" and parts[-2] in SPLITS:
+                        labelled_splits.add(parts[-2])
+                    continue
+                role = _yolo_member(member.name)
+                if role and role[1] == "labels":
+                    labelled_splits.add(role[0])
+                if not member.isfile():
+                    tar.extract(member, extracted, filter="data")
+                    continue
+                span.items += 1
+                span.bytes += member.size
+
+                if role and role[1] == "labels" and role[2].endswith(".txt"):
+                    text = tar.extractfile(member).read().decode()
+                    split_labels[(role[0], os.path.splitext(role[2])[0])] = parse_label_lines(text.splitlines())
+                    if progress:
+                        progress.add("parsed")
+                elif role and role[1] == "images" and role[2].lower().endswith(IMAGE_EXTENSIONS):
+                    if (role[0], role[2]) in names:
+                        continue
+                    image_name = unique_image_name(role[2], role[0], taken)
+                    names[(role[0], role[2])] = image_name
+                    taken.add(image_name)
+                    target = os.path.join(staged_images, image_name)
+                    with tar.extractfile(member) as source, open(target, "wb") as out:
+                        shutil.copyfileobj(source, out)
+                    images.append((target, role[0], role[2]))
+                    if progress:
+                        progress.add("placed")
+                else:
+                    tar.extract(member, extracted, filter="data")
+        # tarfile stops at the end-of-archive marker; read the rest so compressed trailers are checked
+        while fileobj.read(READ_SIZE):
+            pass
+
+    kept: List[Tuple[str, str]] = []
+    labels: Dict[str, List[Dict[str, str]]] = {}
+    for target, split, file_name in images:
+        if split not in labelled_splits:
+            # parse_labels skips a split without labels; so do its images
+            os.remove(target)
+            continue
+        kept.append((target, split))
+        labels[os.path.basename(target)] = split_labels.get((split, os.path.splitext(file_name)[0]), [])
+    return TarContents(kept, labels, extracted)
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+from math import ceil
+from typing import Dict, Optional
+
+from PIL import Image
+
+# Images at least this many pixels on their longer side get a tile pyramid at ingest; 0 disables pyramids
+TILE_MIN_SIZE = int(os.getenv("INGEST_TILE_MIN_SIZE", "4096"))
+TILE_SIZE = 256
+TILE_OVERLAP = 1
+TILE_QUALITY = 85
+DESCRIPTOR = "pyramid.json"
+
+
+def max_level(width: int, height: int) -> int:
+    """DeepZoom numbering: level 0 is 1x1 pixel, each level doubles, the last one is full size."""
+    return (max(width, height) - 1).bit_length()
+
+
+def build_pyramid(image_path: str, output_dir: str, tile_size: int = TILE_SIZE, overlap: int = TILE_OVERLAP) -> Optional[Dict]:
+    """
+    Cut an image into a DeepZoom-style pyramid of JPEG tiles under ``output_dir``.
+
+    Tiles are ``<level>/<column>_<row>.jpg``, ``tile_size`` pixels square plus
+    ``overlap`` pixels shared with each neighbour, and every level is half the
+    size of the next. The descriptor is written as ``pyramid.json``. Returns it,
+    or None if the image cannot be decoded. Runs in the shared process pool.
+    """
+    tmp = f"{output_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        with Image.open(image_path) as img:
+            level_image = img.convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+    width, height = level_image.size
+    top = max_level(width, height)
+    for level in range(top, -1, -1):
+        level_width, level_height = level_image.size
+        level_dir = os.path.join(tmp, str(level))
+        os.makedirs(level_dir)
+        for row in range(ceil(level_height / tile_size)):
+            for col in range(ceil(level_width / tile_size)):
+                box = (
+                    max(0, col * tile_size - overlap),
+                    max(0, row * tile_size - overlap),
+                    min(level_width, (col + 1) * tile_size + overlap),
+                    min(level_height, (row + 1) * tile_size + overlap),
+                )
+                level_image.crop(box).save(os.path.join(level_dir, f"{col}_{row}.jpg"), "JPEG", quality=TILE_QUALITY)
+        if level:
+            # ceil keeps every level the size DeepZoom expects: ceil(full size / 2 ** (top - level))
+            level_image = level_image.resize(
+                (ceil(level_width / 2), ceil(level_height / 2)), Image.Resampling.BOX
+            )
+
+    descriptor = {
+        "width": width,
+        "height": height,
+        "tile_size": tile_size,
+        "overlap": overlap,
+        "format": "jpg",
+        "levels": top + 1,
+    }
+    with open(os.path.join(tmp, DESCRIPTOR), "w") as fh:
+        json.dump(descriptor, fh)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    os.replace(tmp, output_dir)
+    return descriptor
@@ -0,0 +1,101 @@
+import os, random, time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from utils.metrics import observe_stage
+
+
+class Span:
+    __slots__ = ("name", "category", "start", "wall", "cpu", "bytes", "items", "args")
+
+    def __init__(self, name: str, category: str, start: float):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.bytes = 0
+        self.items = 0
+        self.args: Dict[str, str] = {}
+
+    def as_dict(self) -> Dict:
+        data = {
+            "name": self.name,
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "bytes": self.bytes,
+            "items": self.items,
+        }
+        data.update(self.args)
+        return data
+
+
+class Trace:
+    """
+    Lightweight span recorder for one ingest.
+
+    Stage spans are always recorded (and feed the ``ingest_stage_duration_seconds``
+    histogram); per-file spans are only kept for a ``sample_rate`` fraction of files.
+    CPU time is the CPU time of the calling thread, so work handed to a process
+    pool shows up as wall time only.
+    """
+
+    def __init__(self, sample_rate: float = 0.0):
+        self.sample_rate = sample_rate
+        self.origin = time.perf_counter()
+        self.stages: List[Span] = []
+        self.files: List[Span] = []
+
+    def sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage"):
+        span = Span(name, category, time.perf_counter())
+        cpu_start = time.thread_time()
+        try:
+            yield span
+        finally:
+            span.wall = time.perf_counter() - span.start
+            span.cpu = time.thread_time() - cpu_start
+            self._record(span)
+
+    def add(self, name: str, wall: float, cpu: float, bytes: int = 0, items: int = 0, start: Optional[float] = None):
+        """Record a stage whose time was accumulated piecewise (e.g. copies interleaved with parsing)."""
+        span = Span(name, "stage", self.origin if start is None else start)
+        span.wall, span.cpu, span.bytes, span.items = wall, cpu, bytes, items
+        self._record(span)
+
+    def _record(self, span: Span):
+        if span.category == "stage":
+            self.stages.append(span)
+            observe_stage(span.name, span.wall)
+        else:
+            self.files.append(span)
+
+    def breakdown(self) -> Dict:
+        return {
+            "total_wall_s": round(time.perf_counter() - self.origin, 6),
+            "stages": [s.as_dict() for s in self.stages],
+            "sampled_files": [s.as_dict() for s in self.files],
+        }
+
+    def to_chrome_trace(self) -> Dict:
+        """Trace Event Format, loadable in chrome://tracing and Perfetto."""
+        pid = os.getpid()
+        events = []
+        for tid, spans in ((1, self.stages), (2, self.files)):
+            for s in spans:
+                events.append({
+                    "name": s.name,
+                    "cat": s.category,
+                    "ph": "X",
+                    "ts": round((s.start - self.origin) * 1e6, 3),
+                    "dur": round(s.wall * 1e6, 3),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"cpu_s": s.cpu, "bytes": s.bytes, "items": s.items, **s.args},
+                })
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": 1, "args": {"name": "stages"}})
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": 2, "args": {"name": "sampled files"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
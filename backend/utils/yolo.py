@@ -1,16 +1,21 @@
-import os, shutil
-from typing import List, Dict, Tuple
+import os, shutil, time
+from contextlib import nullcontext
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+from utils.progress import Progress
+from utils.tracing import Trace
 
-def validate_yolo_structure(base_path: str):
+SPLITS = ("train", "valid", "test")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def has_yolo_structure(base_path: str) -> bool:
     def exists(p): return os.path.isdir(os.path.join(base_path, p))
 
-    groups = {
-        "train": exists("train/images") and exists("train/labels"),
-        "valid": exists("valid/images") and exists("valid/labels"),
-        "test": exists("test/images") and exists("test/labels"),
-    }
+    return any(exists(f"{group}/images") and exists(f"{group}/labels") for group in SPLITS)
+
 
-    if not any(groups.values()):
+def validate_yolo_structure(base_path: str):
+    if not has_yolo_structure(base_path):
         raise ValueError(
             "At least one of the following directory groups must exist:\n"
             "- train/images + train/labels\n"
@@ -19,16 +24,57 @@ def validate_yolo_structure(base_path: str):
         )
 
 
-def parse_labels(base_path: str, dataset_name: str) -> Tuple[List[str], Dict[str, List[Dict[str, str]]]]:
-    groups = ["train", "valid", "test"]
-    image_extensions = (".jpg", ".jpeg", ".png")
+def parse_label_lines(lines: Iterable[str]) -> List[Dict[str, str]]:
+    """YOLO label lines to stored labels; lines that do not have exactly five fields are skipped."""
+    label_data = []
+    for line in lines:
+        parts = line.strip().split()
+        if len(parts) == 5:
+            cls, x, y, w, h = parts
+            label_data.append({"class": cls, "bbox": [x, y, w, h]})
+    return label_data
+
+
+def unique_image_name(file_name: str, split: str, taken: Collection[str]) -> str:
+    """
+    Name to store an image under: its file name, unless another split already holds an image of that name.
 
-    all_images: List[str] = []
+    Image names key records, files and URLs within a dataset, so a same-named
+    image of a later split is prefixed with its split instead of replacing the first.
+    """
+    name = file_name
+    while name in taken:
+        name = f"{split}_{name}"
+    return name
+
+
+def parse_labels(
+    base_path: str,
+    dataset_name: str,
+    trace: Optional[Trace] = None,
+    progress: Optional[Progress] = None,
+    output_dir: Optional[str] = None,
+) -> Tuple[List[Tuple[str, str]], Dict[str, List[Dict[str, str]]]]:
+    """
+    Copy the images of a YOLO directory into ``output_dir`` and parse their labels.
+
+    Returns the placed images as ``(path, split)`` pairs and the labels keyed
+    by image name, the placed file's name; see ``unique_image_name``.
+    """
+    groups = SPLITS
+    image_extensions = IMAGE_EXTENSIONS
+
+    all_images: List[Tuple[str, str]] = []
     label_dict: Dict[str, List[Dict[str, str]]] = {}
 
-    output_dir = os.path.join("datasets", "images", dataset_name)
+    output_dir = output_dir or os.path.join("datasets", "images", dataset_name)
     os.makedirs(output_dir, exist_ok=True)
 
+    trace = trace or Trace()
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    copy_wall = copy_cpu = 0.0
+    copy_bytes = copied = label_bytes = 0
+
     for group in groups:
         images_path = os.path.join(base_path, group, "images")
         labels_path = os.path.join(base_path, group, "labels")
@@ -47,17 +93,34 @@ def parse_labels(base_path: str, dataset_name: str) -> Tuple[List[str], Dict[str
             label_data = []
             if os.path.exists(label_file):
                 with open(label_file, "r") as lf:
-                    for line in lf:
-                        parts = line.strip().split()
-                        if len(parts) == 5:
-                            cls, x, y, w, h = parts
-                            label_data.append({"class": cls, "bbox": [x, y, w, h]})
+                    label_bytes += os.fstat(lf.fileno()).st_size
+                    label_data = parse_label_lines(lf)
 
-            all_images.append(img_path)
-            label_dict[os.path.basename(img_path)] = label_data
+            image_name = unique_image_name(img_file, group, label_dict)
+            dest_img_path = os.path.join(output_dir, image_name)
+            all_images.append((dest_img_path, group))
+            label_dict[image_name] = label_data
+            if progress:
+                progress.add("parsed")
 
-            dest_img_path = os.path.join(output_dir, img_file)
             if not os.path.exists(dest_img_path):
-                shutil.copy(img_path, dest_img_path)
+                sampled = trace.sample()
+                with trace.span("copy", "file") if sampled else nullcontext() as span:
+                    wall, cpu = time.perf_counter(), time.thread_time()
+                    shutil.copy(img_path, dest_img_path)
+                    size = os.path.getsize(img_path)
+                    copy_wall += time.perf_counter() - wall
+                    copy_cpu += time.thread_time() - cpu
+                if sampled:
+                    span.bytes, span.items, span.args["file"] = size, 1, img_file
+                copy_bytes += size
+                copied += 1
+            if progress:
+                progress.add("placed")
+
+    wall, cpu = time.perf_counter() - started, time.thread_time() - cpu_started
+    trace.add("parse", wall - copy_wall, cpu - copy_cpu, bytes=label_bytes, items=len(all_images), start=started)
+    trace.add("copy", copy_wall, copy_cpu, bytes=copy_bytes, items=copied, start=started)
 
     return all_images, label_dict
+
@@ -0,0 +1,104 @@
+"""
+Standalone ingestion worker.
+
+    python worker.py --concurrency 2 [--watch-interval 30]
+
+Claims ingest jobs that the API enqueued (``INGEST_MODE=queue``) from the
+``ingest_jobs`` collection and runs them. Each claimed job is held under a
+lease renewed by a heartbeat; a job whose worker dies is claimed again once its
+lease expires, up to ``INGEST_JOB_MAX_ATTEMPTS`` times. Run as many workers as
+ingestion needs, independently of the API replicas; they must share MongoDB and
+the ``datasets/`` directory with the API.
+
+With ``--watch-interval`` the worker also re-syncs datasets ingested from a
+directory with ``watch`` set, polling each one for changes at that interval.
+"""
+
+import argparse, asyncio, logging, os, signal
+
+from prometheus_client import start_http_server
+
+from dataset import services
+from utils.lease import Lease
+from utils.pool import shutdown_process_pool
+
+POLL_INTERVAL = float(os.getenv("INGEST_WORKER_POLL_SECONDS", "1.0"))
+WATCH_INTERVAL = float(os.getenv("SYNC_WATCH_SECONDS", "0"))
+
+logger = logging.getLogger("worker")
+
+
+async def work(stop: asyncio.Event, poll_interval: float = POLL_INTERVAL) -> int:
+    """Run claimed jobs one at a time until ``stop`` is set; returns how many ran."""
+    handled = 0
+    while not stop.is_set():
+        lease = Lease(services.job_collection)
+        job = await services.claim_ingest_job(lease)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        logger.info("job %s: ingesting '%s' (attempt %d)", job["_id"], job["dataset"], job["attempts"])
+        outcome = await services.run_ingest_job(job, lease)
+        logger.info("job %s: %s%s", job["_id"], outcome["status"], f" ({outcome['error']})" if outcome.get("error") else "")
+        handled += 1
+    return handled
+
+
+async def watch(stop: asyncio.Event, interval: float = WATCH_INTERVAL) -> int:
+    """Re-sync watched directories every ``interval`` seconds until ``stop`` is set; returns the passes made."""
+    passes = 0
+    while not stop.is_set():
+        for result in await services.sync_watched():
+            if "error" in result:
+                logger.warning("sync %s: %s", result["dataset"], result["error"])
+            elif result["added"] or result["updated"] or result["removed"]:
+                logger.info(
+                    "sync %s: %d added, %d updated, %d removed",
+                    result["dataset"], result["added"], result["updated"], result["removed"]
+                )
+        passes += 1
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+    return passes
+
+
+async def run(concurrency: int, poll_interval: float = POLL_INTERVAL, watch_interval: float = WATCH_INTERVAL):
+    await services.ensure_indexes()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish the jobs in hand, then exit; unfinished ones are retried after their lease expires
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        tasks = [work(stop, poll_interval) for _ in range(concurrency)]
+        if watch_interval > 0:
+            tasks.append(watch(stop, watch_interval))
+        await asyncio.gather(*tasks)
+    finally:
+        shutdown_process_pool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("INGEST_WORKER_CONCURRENCY", "1")),
+                        help="jobs run at once by this process")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--watch-interval", type=float, default=WATCH_INTERVAL,
+                        help="seconds between re-syncs of watched directories (0 disables watching)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on this port")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    asyncio.run(run(args.concurrency, args.poll_interval, args.watch_interval))
+
+
+if __name__ == "__main__":
+    main()
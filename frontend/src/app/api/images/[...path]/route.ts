@@ -2,6 +2,103 @@ import { NextRequest, NextResponse } from 'next/server';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8080';
 
+// Request headers the backend needs for format negotiation, revalidation and ranges
+const FORWARDED_REQUEST_HEADERS = ['accept', 'if-none-match', 'if-modified-since', 'range', 'if-range'];
+// Response headers passed back to the browser untouched
+const FORWARDED_RESPONSE_HEADERS = [
+  'content-type', 'content-length', 'content-range', 'accept-ranges',
+  'etag', 'last-modified', 'cache-control', 'vary',
+];
+const DEFAULT_CACHE_CONTROL = 'public, max-age=31536000, immutable';
+// Only successful image responses get the long default; errors must not stick in browser caches
+const CACHEABLE_STATUSES = [200, 206, 304];
+
+// Hot images are kept in memory so repeated requests skip the backend; larger ones are only streamed
+const CACHE_MAX_BYTES = 64 * 1024 * 1024;
+const CACHE_MAX_ENTRY_BYTES = 1024 * 1024;
+const CACHE_TTL_MS = 60 * 1000;
+
+interface CachedImage {
+  body: Uint8Array;
+  headers: Headers;
+  expires: number;
+}
+
+// Map iteration order is insertion order, so re-inserting on a hit makes the first key the least recently used
+const cache = new Map<string, CachedImage>();
+let cachedBytes = 0;
+
+const cacheGet = (key: string): CachedImage | undefined => {
+  const entry = cache.get(key);
+  if (!entry) return undefined;
+  cache.delete(key);
+  if (entry.expires < Date.now()) {
+    cachedBytes -= entry.body.byteLength;
+    return undefined;
+  }
+  cache.set(key, entry);
+  return entry;
+};
+
+const cacheSet = (key: string, entry: CachedImage) => {
+  const previous = cache.get(key);
+  if (previous) {
+    cache.delete(key);
+    cachedBytes -= previous.body.byteLength;
+  }
+  cache.set(key, entry);
+  cachedBytes += entry.body.byteLength;
+  for (const [oldest, evicted] of cache) {
+    if (cachedBytes <= CACHE_MAX_BYTES) break;
+    cache.delete(oldest);
+    cachedBytes -= evicted.body.byteLength;
+  }
+};
+
+// Collect the cache's branch of a tee'd body; gives up on bodies larger than one entry may be
+const collect = async (stream: ReadableStream<Uint8Array>, key: string, headers: Headers) => {
+  const reader = stream.getReader();
+  const chunks: Uint8Array[] = [];
+  let size = 0;
+  try {
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      size += value.byteLength;
+      if (size > CACHE_MAX_ENTRY_BYTES) {
+        await reader.cancel();
+        return;
+      }
+      chunks.push(value);
+    }
+  } catch {
+    // The client or the backend went away; nothing to cache
+    return;
+  }
+  const body = new Uint8Array(size);
+  let offset = 0;
+  for (const chunk of chunks) {
+    body.set(chunk, offset);
+    offset += chunk.byteLength;
+  }
+  cacheSet(key, { body, headers, expires: Date.now() + CACHE_TTL_MS });
+};
+
+const pickHeaders = (source: Headers, status: number): Headers => {
+  const headers = new Headers();
+  for (const name of FORWARDED_RESPONSE_HEADERS) {
+    const value = source.get(name);
+    if (value !== null) headers.set(name, value);
+  }
+  if (!headers.has('cache-control') && CACHEABLE_STATUSES.includes(status)) {
+    headers.set('cache-control', DEFAULT_CACHE_CONTROL);
+  }
+  return headers;
+};
+
+const etagMatches = (ifNoneMatch: string | null, etag: string | null) =>
+  !!ifNoneMatch && !!etag && ifNoneMatch.split(',').some(tag => tag.trim().replace(/^W\//, '') === etag);
+
 export async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ path: string[] }> }
@@ -9,34 +106,57 @@ export async function GET(
   try {
     // Await params before using them (Next.js 15 requirement)
     const resolvedParams = await params;
-    
+
     // Reconstruct the full path
     const imagePath = resolvedParams.path.join('/');
-    
+
     // Construct the backend URL for the image using the correct endpoint pattern
     const backendUrl = `${API_BASE_URL}/${imagePath}`;
-    
-    // Fetch the image from the backend
-    const response = await fetch(backendUrl);
-    
-    if (!response.ok) {
+
+    // The backend varies images on Accept, so the cache does too
+    const cacheKey = `${backendUrl}\n${request.headers.get('accept') || ''}`;
+    const ranged = request.headers.has('range');
+    const cached = ranged ? undefined : cacheGet(cacheKey);
+    if (cached) {
+      if (etagMatches(request.headers.get('if-none-match'), cached.headers.get('etag'))) {
+        return new NextResponse(null, { status: 304, headers: new Headers(cached.headers) });
+      }
+      return new NextResponse(cached.body, { status: 200, headers: new Headers(cached.headers) });
+    }
+
+    const forwarded = new Headers();
+    for (const name of FORWARDED_REQUEST_HEADERS) {
+      const value = request.headers.get(name);
+      if (value !== null) forwarded.set(name, value);
+    }
+
+    // Fetch the image from the backend; the body is streamed through, never buffered whole
+    // no-store keeps Next's fetch cache from buffering bodies of its own
+    const response = await fetch(backendUrl, { headers: forwarded, signal: request.signal, cache: 'no-store' });
+
+    if (response.status === 404) {
       return new NextResponse('Image not found', { status: 404 });
     }
-    
-    // Get the image data and content type
-    const imageBuffer = await response.arrayBuffer();
-    const contentType = response.headers.get('content-type') || 'image/jpeg';
-    
-    // Return the image with appropriate headers
-    return new NextResponse(imageBuffer, {
-      status: 200,
-      headers: {
-        'Content-Type': contentType,
-        'Cache-Control': 'public, max-age=31536000, immutable',
-      },
-    });
+
+    const headers = pickHeaders(response.headers, response.status);
+    if (!response.body || response.status === 304) {
+      return new NextResponse(null, { status: response.status, headers });
+    }
+
+    let body = response.body;
+    const length = Number(response.headers.get('content-length'));
+    if (response.status === 200 && !ranged && length > 0 && length <= CACHE_MAX_ENTRY_BYTES) {
+      const [toClient, toCache] = body.tee();
+      body = toClient;
+      void collect(toCache, cacheKey, new Headers(headers));
+    }
+
+    return new NextResponse(body, { status: response.status, headers });
   } catch (error) {
+    if (request.signal.aborted) {
+      return new NextResponse(null, { status: 499 });
+    }
     console.error('Error proxying image:', error);
     return new NextResponse('Internal Server Error', { status: 500 });
   }
-} 
\ No newline at end of file
+}
@@ -4,7 +4,9 @@ import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import { Dataset } from '@/types/dataset';
 import { DatasetAPI } from '@/services/api';
-import { Calendar, Image, AlertCircle, Loader2 } from 'lucide-react';
+import { Calendar, Image, AlertCircle, Loader2, Download } from 'lucide-react';
+
+const DATASETS_PER_PAGE = 50;
 
 interface DatasetsTableProps {
   refreshTrigger?: number;
@@ -14,17 +16,22 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
   const [datasets, setDatasets] = useState<Dataset[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [prefix, setPrefix] = useState('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
-    fetchDatasets();
-  }, [refreshTrigger]);
+    const timer = setTimeout(fetchDatasets, prefix ? 250 : 0);
+    return () => clearTimeout(timer);
+  }, [refreshTrigger, prefix]);
 
   const fetchDatasets = async () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await DatasetAPI.getAllDatasets();
-      setDatasets(data);
+      const page = await DatasetAPI.getDatasetsPage({ limit: DATASETS_PER_PAGE, prefix });
+      setDatasets(page.datasets);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch datasets');
     } finally {
@@ -32,6 +39,20 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await DatasetAPI.getDatasetsPage({ limit: DATASETS_PER_PAGE, prefix, cursor: nextCursor });
+      setDatasets(prev => [...prev, ...page.datasets]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to fetch datasets');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDate = (dateString: string | any) => {
     try {
       let date: Date;
@@ -80,7 +101,7 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
     }
   };
 
-  if (loading) {
+  if (loading && !prefix) {
     return (
       <div className="flex items-center justify-center py-12">
         <Loader2 className="h-8 w-8 animate-spin text-blue-500" />
@@ -104,7 +125,7 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
     );
   }
 
-  if (datasets.length === 0) {
+  if (datasets.length === 0 && !prefix) {
     return (
       <div className="text-center py-12">
         <Image className="h-12 w-12 text-gray-400 mx-auto mb-4" />
@@ -116,8 +137,15 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
 
   return (
     <div className="bg-white shadow rounded-lg overflow-hidden">
-      <div className="px-6 py-4 border-b border-gray-200">
+      <div className="px-6 py-4 border-b border-gray-200 flex items-center justify-between">
         <h2 className="text-lg font-medium text-gray-900">Datasets</h2>
+        <input
+          type="search"
+          value={prefix}
+          onChange={(e) => setPrefix(e.target.value)}
+          placeholder="Search by name prefix"
+          className="border border-gray-300 rounded px-3 py-1 text-sm"
+        />
       </div>
       
       <div className="overflow-x-auto">
@@ -136,6 +164,9 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
               <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                 Created At
               </th>
+              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
+                Export
+              </th>
             </tr>
           </thead>
           <tbody className="bg-white divide-y divide-gray-200">
@@ -166,11 +197,34 @@ export default function DatasetsTable({ refreshTrigger }: DatasetsTableProps) {
                     {formatDate(dataset.created_at)}
                   </div>
                 </td>
+                <td className="px-6 py-4 whitespace-nowrap text-sm">
+                  <div className="flex items-center space-x-3">
+                    <Download className="h-4 w-4 text-gray-400" />
+                    <a href={DatasetAPI.getExportUrl(dataset.name, 'coco')} className="text-blue-600 hover:underline">
+                      COCO
+                    </a>
+                    <a href={DatasetAPI.getExportUrl(dataset.name, 'voc')} className="text-blue-600 hover:underline">
+                      VOC
+                    </a>
+                  </div>
+                </td>
               </tr>
             ))}
           </tbody>
         </table>
       </div>
+
+      {nextCursor && (
+        <div className="px-6 py-4 border-t border-gray-200 text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 text-sm font-medium text-gray-700 rounded-md hover:bg-gray-100 disabled:text-gray-400"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 } 
\ No newline at end of file
@@ -1,8 +1,9 @@
 'use client';
 
 import { useState, useEffect } from 'react';
-import { ImageData } from '@/types/dataset';
+import { ContactSheetMap, ImageData } from '@/types/dataset';
 import { DatasetAPI } from '@/services/api';
+import { GridPage, SHEET_TILE_SIZE, cachedPage, loadPage, prefetchAround } from '@/services/pageCache';
 import { Eye, Tag, ChevronLeft, ChevronRight } from 'lucide-react';
 import ImagePreviewModal from './ImagePreviewModal';
 
@@ -20,15 +21,28 @@ export default function ImageGrid({ datasetName }: ImageGridProps) {
   const [totalPages, setTotalPages] = useState(1);
   const [totalImages, setTotalImages] = useState(0);
   const [loading, setLoading] = useState(true);
+  const [sheet, setSheet] = useState<ContactSheetMap | null>(null);
+
+  const showPage = (res: GridPage) => {
+    setImages(res.images);
+    setSheet(res.sheet);
+    setTotalPages(res.total_pages);
+    setTotalImages(res.total_images);
+    setCurrentPage(res.current_page);
+  };
 
   const fetchImages = async (page: number) => {
+    // Pages seen or prefetched before render at once, without a loading state
+    const cached = cachedPage(datasetName, page);
+    if (cached) {
+      showPage(cached);
+      // A remount starts in the loading state even when the page is already cached
+      setLoading(false);
+      return;
+    }
     setLoading(true);
     try {
-      const res = await DatasetAPI.getPaginatedImages(datasetName, page);
-      setImages(res.images);
-      setTotalPages(res.total_pages);
-      setTotalImages(res.total_images);
-      setCurrentPage(res.current_page);
+      showPage(await loadPage(datasetName, page));
     } catch (err) {
       console.error('Failed to load images:', err);
     } finally {
@@ -40,6 +54,28 @@ export default function ImageGrid({ datasetName }: ImageGridProps) {
     fetchImages(currentPage);
   }, [currentPage]);
 
+  // Once a page is shown, load its neighbours in idle time so the next flip is instant
+  useEffect(() => {
+    if (loading) return;
+    return prefetchAround(datasetName, currentPage, totalPages);
+  }, [datasetName, currentPage, totalPages, loading]);
+
+  const sheetTile = (imageName: string) => {
+    const tile = sheet?.tiles.find(t => t.image_name === imageName);
+    return tile && !tile.missing ? tile : undefined;
+  };
+
+  const sheetTileStyle = (tile: ContactSheetMap['tiles'][number]) => {
+    const { columns, rows } = sheet!;
+    const col = tile.x / tile.width;
+    const row = tile.y / tile.height;
+    return {
+      backgroundImage: `url(${DatasetAPI.getContactSheetUrl(datasetName, currentPage, SHEET_TILE_SIZE)})`,
+      backgroundSize: `${columns * 100}% ${rows * 100}%`,
+      backgroundPosition: `${columns > 1 ? (col / (columns - 1)) * 100 : 0}% ${rows > 1 ? (row / (rows - 1)) * 100 : 0}%`,
+    };
+  };
+
   const handleImageClick = (image: ImageData) => {
     setSelectedImage(image);
     setIsModalOpen(true);
@@ -116,24 +152,33 @@ export default function ImageGrid({ datasetName }: ImageGridProps) {
             className="group bg-white rounded-lg shadow-sm border border-gray-200 overflow-hidden hover:shadow-md transition-shadow cursor-pointer"
             onClick={() => handleImageClick(image)}
           >
-            <div className="relative aspect-square bg-gray-100">
-              <img
-                src={DatasetAPI.getImageUrl(datasetName, image.image_name)}
-                alt={image.image_name}
-                className="w-full h-full absolute object-cover group-hover:scale-105 transition-transform duration-200"
-                onError={(e) => {
-                  const target = e.target as HTMLImageElement;
-                  const currentSrc = target.src;
-                  if (!currentSrc.includes('placeholder')) {
-                    const altUrl = DatasetAPI.getImageUrl(datasetName, image.image_name.replace('.jpg', '.JPG'));
-                    if (currentSrc !== altUrl) {
-                      target.src = altUrl;
-                      return;
+            <div className="relative aspect-square bg-gray-100 overflow-hidden">
+              {sheetTile(image.image_name) ? (
+                <div
+                  role="img"
+                  aria-label={image.image_name}
+                  className="w-full h-full absolute group-hover:scale-105 transition-transform duration-200"
+                  style={sheetTileStyle(sheetTile(image.image_name)!)}
+                />
+              ) : (
+                <img
+                  src={DatasetAPI.getImageUrl(datasetName, image.image_name)}
+                  alt={image.image_name}
+                  className="w-full h-full absolute object-cover group-hover:scale-105 transition-transform duration-200"
+                  onError={(e) => {
+                    const target = e.target as HTMLImageElement;
+                    const currentSrc = target.src;
+                    if (!currentSrc.includes('placeholder')) {
+                      const altUrl = DatasetAPI.getImageUrl(datasetName, image.image_name.replace('.jpg', '.JPG'));
+                      if (currentSrc !== altUrl) {
+                        target.src = altUrl;
+                        return;
+                      }
+                      target.src = '/images/placeholder.svg';
                     }
-                    target.src = '/images/placeholder.svg';
-                  }
-                }}
-              />
+                  }}
+                />
+              )}
 
               <div className="absolute inset-0 bg-opacity-0 group-hover:bg-opacity-30 transition-all duration-200 flex items-center justify-center">
                 <div className="opacity-0 group-hover:opacity-100 transition-opacity duration-200">
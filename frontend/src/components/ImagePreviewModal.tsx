@@ -2,8 +2,9 @@
 
 import { useEffect, useState, useRef } from 'react';
 import { X } from 'lucide-react';
-import { ImageData, BoundingBox } from '@/types/dataset';
+import { ImageData, BoundingBox, TilePyramid } from '@/types/dataset';
 import { DatasetAPI } from '@/services/api';
+import TiledImageViewer from './TiledImageViewer';
 
 interface ImagePreviewModalProps {
   isOpen: boolean;
@@ -21,6 +22,8 @@ const COLORS = [
 export default function ImagePreviewModal({ isOpen, onClose, imageData, datasetName }: ImagePreviewModalProps) {
   const [imageLoaded, setImageLoaded] = useState(false);
   const [imageDimensions, setImageDimensions] = useState({ width: 0, height: 0 });
+  // undefined while the lookup is in flight, null for images small enough to load whole
+  const [pyramid, setPyramid] = useState<TilePyramid | null | undefined>(undefined);
   const imageRef = useRef<HTMLImageElement>(null);
 
   useEffect(() => {
@@ -29,6 +32,22 @@ export default function ImagePreviewModal({ isOpen, onClose, imageData, datasetN
     }
   }, [isOpen, imageData]);
 
+  useEffect(() => {
+    if (!isOpen || !imageData) return;
+    let cancelled = false;
+    setPyramid(undefined);
+    DatasetAPI.getTilePyramid(datasetName, imageData.image_name)
+      .catch(() => null)
+      .then(result => {
+        if (cancelled) return;
+        setPyramid(result);
+        if (result) {
+          setImageDimensions({ width: result.width, height: result.height });
+        }
+      });
+    return () => { cancelled = true; };
+  }, [isOpen, imageData, datasetName]);
+
   const handleImageLoad = () => {
     if (imageRef.current) {
       setImageDimensions({
@@ -90,75 +109,117 @@ export default function ImagePreviewModal({ isOpen, onClose, imageData, datasetN
         {/* Image Container */}
         <div className="flex-1 overflow-auto bg-gradient-to-br from-gray-100 to-gray-200 min-h-0">
           <div className="flex items-center justify-center min-h-full p-4">
-            <div className="relative inline-block bg-white rounded-lg shadow-lg p-2">
-              {!imageLoaded && (
-                <div className="w-96 h-64 bg-gray-200 rounded-lg flex items-center justify-center">
-                  <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-500"></div>
-                </div>
-              )}
-              <img
-                ref={imageRef}
-                src={imageUrl}
-                alt={imageData.image_name}
-                onLoad={handleImageLoad}
-                className={`rounded-lg transition-opacity duration-300 ${imageLoaded ? 'opacity-100' : 'opacity-0'}`}
-                style={{
-                  maxWidth: '800px',
-                  maxHeight: '600px',
-                  width: 'auto',
-                  height: 'auto'
-                }}
-                onError={(e) => {
-                  const target = e.target as HTMLImageElement;
-                  if (!target.src.includes('placeholder')) {
-                    target.src = '/images/placeholder.svg';
-                    setImageLoaded(true); // Show placeholder
-                  }
-                }}
-              />
+            {pyramid ? (
+              <div className="relative inline-block bg-white rounded-lg shadow-lg p-2">
+                <TiledImageViewer
+                  datasetName={datasetName}
+                  imageName={imageData.image_name}
+                  pyramid={pyramid}
+                  maxWidth={800}
+                  maxHeight={600}
+                >
+                  {/* Boxes in percentages of the image, so they follow zoom and pan */}
+                  {imageData.labels.map((label: BoundingBox, index: number) => {
+                    const [x_center, y_center, width, height] = label.bbox;
+                    const color = getColorForClass(label.class);
+                    return (
+                      <div
+                        key={index}
+                        className="absolute border-3 rounded-sm"
+                        style={{
+                          left: `${(x_center - width / 2) * 100}%`,
+                          top: `${(y_center - height / 2) * 100}%`,
+                          width: `${width * 100}%`,
+                          height: `${height * 100}%`,
+                          borderColor: color,
+                          backgroundColor: `${color}15`,
+                          boxShadow: `0 0 0 2px ${color}`,
+                        }}
+                      >
+                        <div
+                          className="absolute -top-8 left-0 px-3 py-1 text-sm font-bold text-white rounded-md shadow-lg"
+                          style={{ backgroundColor: color }}
+                        >
+                          Class {label.class}
+                        </div>
+                      </div>
+                    );
+                  })}
+                </TiledImageViewer>
+              </div>
+            ) : (
+              <div className="relative inline-block bg-white rounded-lg shadow-lg p-2">
+                {!imageLoaded && (
+                  <div className="w-96 h-64 bg-gray-200 rounded-lg flex items-center justify-center">
+                    <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-500"></div>
+                  </div>
+                )}
+                {pyramid === null && (
+                  <img
+                    ref={imageRef}
+                    src={imageUrl}
+                    alt={imageData.image_name}
+                    onLoad={handleImageLoad}
+                    className={`rounded-lg transition-opacity duration-300 ${imageLoaded ? 'opacity-100' : 'opacity-0'}`}
+                    style={{
+                      maxWidth: '800px',
+                      maxHeight: '600px',
+                      width: 'auto',
+                      height: 'auto'
+                    }}
+                    onError={(e) => {
+                      const target = e.target as HTMLImageElement;
+                      if (!target.src.includes('placeholder')) {
+                        target.src = '/images/placeholder.svg';
+                        setImageLoaded(true); // Show placeholder
+                      }
+                    }}
+                  />
+                )}
               
-              {/* Bounding Box Overlays */}
-              {imageLoaded && imageData.labels.map((label: BoundingBox, index: number) => {
-                const { x, y, width, height } = convertYoloToPixel(
-                  label.bbox,
-                  imageDimensions.width,
-                  imageDimensions.height
-                );
+                {/* Bounding Box Overlays */}
+                {imageLoaded && imageData.labels.map((label: BoundingBox, index: number) => {
+                  const { x, y, width, height } = convertYoloToPixel(
+                    label.bbox,
+                    imageDimensions.width,
+                    imageDimensions.height
+                  );
                 
-                // Calculate scale factor based on displayed image size vs natural size
-                const displayedImage = imageRef.current;
-                const scaleX = displayedImage ? displayedImage.clientWidth / imageDimensions.width : 1;
-                const scaleY = displayedImage ? displayedImage.clientHeight / imageDimensions.height : 1;
+                  // Calculate scale factor based on displayed image size vs natural size
+                  const displayedImage = imageRef.current;
+                  const scaleX = displayedImage ? displayedImage.clientWidth / imageDimensions.width : 1;
+                  const scaleY = displayedImage ? displayedImage.clientHeight / imageDimensions.height : 1;
                 
-                const color = getColorForClass(label.class);
+                  const color = getColorForClass(label.class);
                 
-                return (
-                  <div
-                    key={index}
-                    className="absolute border-3 pointer-events-none rounded-sm"
-                    style={{
-                      left: `${x * scaleX + 8}px`, // +8 for padding
-                      top: `${y * scaleY + 8}px`,   // +8 for padding
-                      width: `${width * scaleX}px`,
-                      height: `${height * scaleY}px`,
-                      borderColor: color,
-                      backgroundColor: `${color}15`,
-                      boxShadow: `0 0 0 2px ${color}`,
-                    }}
-                  >
-                    {/* Class Label */}
+                  return (
                     <div
-                      className="absolute -top-8 left-0 px-3 py-1 text-sm font-bold text-white rounded-md shadow-lg"
-                      style={{ 
-                        backgroundColor: color,
+                      key={index}
+                      className="absolute border-3 pointer-events-none rounded-sm"
+                      style={{
+                        left: `${x * scaleX + 8}px`, // +8 for padding
+                        top: `${y * scaleY + 8}px`,   // +8 for padding
+                        width: `${width * scaleX}px`,
+                        height: `${height * scaleY}px`,
+                        borderColor: color,
+                        backgroundColor: `${color}15`,
+                        boxShadow: `0 0 0 2px ${color}`,
                       }}
                     >
-                      Class {label.class}
+                      {/* Class Label */}
+                      <div
+                        className="absolute -top-8 left-0 px-3 py-1 text-sm font-bold text-white rounded-md shadow-lg"
+                        style={{ 
+                          backgroundColor: color,
+                        }}
+                      >
+                        Class {label.class}
+                      </div>
                     </div>
-                  </div>
-                );
-              })}
-            </div>
+                  );
+                })}
+              </div>
+            )}
           </div>
         </div>
 
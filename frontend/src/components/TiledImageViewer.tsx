@@ -0,0 +1,162 @@
+'use client';
+
+import { ReactNode, useCallback, useMemo, useRef, useState } from 'react';
+import { ZoomIn, ZoomOut } from 'lucide-react';
+import { TilePyramid } from '@/types/dataset';
+import { DatasetAPI } from '@/services/api';
+
+interface TiledImageViewerProps {
+  datasetName: string;
+  imageName: string;
+  pyramid: TilePyramid;
+  maxWidth: number;
+  maxHeight: number;
+  // Rendered over the image at its displayed size, so overlays can be positioned in percentages
+  children?: ReactNode;
+}
+
+const MAX_ZOOM = 32;
+
+// Pixel size of a DeepZoom level: level 0 is 1x1, the last level is full size
+const levelSize = (pyramid: TilePyramid, level: number) => {
+  const scale = 2 ** (pyramid.levels - 1 - level);
+  return { width: Math.ceil(pyramid.width / scale), height: Math.ceil(pyramid.height / scale) };
+};
+
+export default function TiledImageViewer({
+  datasetName, imageName, pyramid, maxWidth, maxHeight, children,
+}: TiledImageViewerProps) {
+  const fit = Math.min(maxWidth / pyramid.width, maxHeight / pyramid.height, 1);
+  const viewWidth = Math.round(pyramid.width * fit);
+  const viewHeight = Math.round(pyramid.height * fit);
+
+  const [zoom, setZoom] = useState(1);
+  const [offset, setOffset] = useState({ x: 0, y: 0 });
+  const drag = useRef<{ x: number; y: number } | null>(null);
+
+  const displayWidth = viewWidth * zoom;
+  const displayHeight = viewHeight * zoom;
+
+  const clampOffset = useCallback((x: number, y: number, z: number) => ({
+    x: Math.min(Math.max(0, x), viewWidth * z - viewWidth),
+    y: Math.min(Math.max(0, y), viewHeight * z - viewHeight),
+  }), [viewWidth, viewHeight]);
+
+  const zoomTo = (next: number, anchorX = viewWidth / 2, anchorY = viewHeight / 2) => {
+    const z = Math.min(Math.max(1, next), MAX_ZOOM);
+    // Keep the point under the anchor where it is
+    const ratio = z / zoom;
+    setOffset(clampOffset((offset.x + anchorX) * ratio - anchorX, (offset.y + anchorY) * ratio - anchorY, z));
+    setZoom(z);
+  };
+
+  // The lowest level with at least one level pixel per screen pixel, and a one-tile level to show first
+  const { level, placeholderLevel } = useMemo(() => {
+    const dpr = typeof window === 'undefined' ? 1 : window.devicePixelRatio || 1;
+    let chosen = pyramid.levels - 1;
+    let placeholder = 0;
+    for (let l = 0; l < pyramid.levels; l++) {
+      const size = levelSize(pyramid, l);
+      if (size.width <= pyramid.tile_size && size.height <= pyramid.tile_size) placeholder = l;
+      if (size.width >= displayWidth * dpr && chosen === pyramid.levels - 1) chosen = l;
+    }
+    return { level: chosen, placeholderLevel: placeholder };
+  }, [pyramid, displayWidth]);
+
+  // Only the tiles intersecting the viewport are requested
+  const tiles = useMemo(() => {
+    const size = levelSize(pyramid, level);
+    const scale = displayWidth / size.width;
+    const { tile_size: tileSize, overlap } = pyramid;
+    const columns = Math.ceil(size.width / tileSize);
+    const rows = Math.ceil(size.height / tileSize);
+    const firstCol = Math.max(0, Math.floor(offset.x / scale / tileSize));
+    const lastCol = Math.min(columns - 1, Math.floor((offset.x + viewWidth - 1) / scale / tileSize));
+    const firstRow = Math.max(0, Math.floor(offset.y / scale / tileSize));
+    const lastRow = Math.min(rows - 1, Math.floor((offset.y + viewHeight - 1) / scale / tileSize));
+
+    const visible = [];
+    for (let row = firstRow; row <= lastRow; row++) {
+      for (let col = firstCol; col <= lastCol; col++) {
+        const x0 = Math.max(0, col * tileSize - overlap);
+        const y0 = Math.max(0, row * tileSize - overlap);
+        const x1 = Math.min(size.width, (col + 1) * tileSize + overlap);
+        const y1 = Math.min(size.height, (row + 1) * tileSize + overlap);
+        visible.push({
+          key: `${level}/${col}_${row}`,
+          url: DatasetAPI.getTileUrl(datasetName, imageName, level, col, row),
+          left: x0 * scale,
+          top: y0 * scale,
+          width: (x1 - x0) * scale,
+          height: (y1 - y0) * scale,
+        });
+      }
+    }
+    return visible;
+  }, [pyramid, level, displayWidth, offset, viewWidth, viewHeight, datasetName, imageName]);
+
+  return (
+    <div className="relative">
+      <div
+        className="relative overflow-hidden rounded-lg bg-gray-100 cursor-grab select-none"
+        style={{ width: viewWidth, height: viewHeight }}
+        onWheel={(e) => {
+          const rect = e.currentTarget.getBoundingClientRect();
+          zoomTo(zoom * (e.deltaY < 0 ? 1.25 : 0.8), e.clientX - rect.left, e.clientY - rect.top);
+        }}
+        onMouseDown={(e) => { drag.current = { x: e.clientX, y: e.clientY }; }}
+        onMouseMove={(e) => {
+          if (!drag.current) return;
+          const dx = drag.current.x - e.clientX;
+          const dy = drag.current.y - e.clientY;
+          drag.current = { x: e.clientX, y: e.clientY };
+          setOffset(current => clampOffset(current.x + dx, current.y + dy, zoom));
+        }}
+        onMouseUp={() => { drag.current = null; }}
+        onMouseLeave={() => { drag.current = null; }}
+      >
+        <div
+          className="absolute left-0 top-0"
+          style={{ width: displayWidth, height: displayHeight, transform: `translate(${-offset.x}px, ${-offset.y}px)` }}
+        >
+          {/* A single tile of the whole image shows at once while the sharp tiles load over it */}
+          <img
+            src={DatasetAPI.getTileUrl(datasetName, imageName, placeholderLevel, 0, 0)}
+            alt={imageName}
+            draggable={false}
+            className="absolute left-0 top-0"
+            style={{ width: displayWidth, height: displayHeight }}
+          />
+          {tiles.map(tile => (
+            <img
+              key={tile.key}
+              src={tile.url}
+              alt=""
+              draggable={false}
+              className="absolute"
+              style={{ left: tile.left, top: tile.top, width: tile.width, height: tile.height }}
+            />
+          ))}
+          <div className="absolute inset-0 pointer-events-none">{children}</div>
+        </div>
+      </div>
+
+      <div className="absolute right-2 top-2 flex space-x-1">
+        <button
+          onClick={() => zoomTo(zoom * 2)}
+          className="p-1.5 rounded-md bg-white/90 text-gray-700 shadow hover:bg-white"
+          title="Zoom in"
+        >
+          <ZoomIn className="h-4 w-4" />
+        </button>
+        <button
+          onClick={() => zoomTo(zoom / 2)}
+          className="p-1.5 rounded-md bg-white/90 text-gray-700 shadow hover:bg-white"
+          title="Zoom out"
+        >
+          <ZoomOut className="h-4 w-4" />
+        </button>
+      </div>
+    </div>
+  );
+}
@@ -4,6 +4,7 @@ import { useCallback, useState } from 'react';
 import { useDropzone } from 'react-dropzone';
 import { Upload, FileArchive, X, CheckCircle, AlertCircle } from 'lucide-react';
 import { DatasetAPI } from '@/services/api';
+import { UploadProgress } from '@/types/dataset';
 
 interface UploadZoneProps {
   onUploadSuccess?: () => void;
@@ -13,6 +14,7 @@ export default function UploadZone({ onUploadSuccess }: UploadZoneProps) {
   const [uploading, setUploading] = useState(false);
   const [uploadStatus, setUploadStatus] = useState<'idle' | 'success' | 'error'>('idle');
   const [uploadMessage, setUploadMessage] = useState('');
+  const [progress, setProgress] = useState<UploadProgress | null>(null);
 
   const onDrop = useCallback(async (acceptedFiles: File[]) => {
     const file = acceptedFiles[0];
@@ -21,9 +23,22 @@ export default function UploadZone({ onUploadSuccess }: UploadZoneProps) {
     setUploading(true);
     setUploadStatus('idle');
     setUploadMessage('');
+    setProgress(null);
+
+    const uploadId = crypto.randomUUID();
+    let onFinished: (progress: UploadProgress) => void = () => {};
+    const finished = new Promise<UploadProgress>(resolve => { onFinished = resolve; });
+    const unsubscribe = DatasetAPI.subscribeToUploadProgress(uploadId, setProgress, onFinished);
 
     try {
-      await DatasetAPI.uploadDataset(file);
+      const response = await DatasetAPI.uploadDataset(file, uploadId);
+      if (response.job_id) {
+        // Queued for an ingestion worker: the upload is only done when the stream says so
+        const final = await finished;
+        if (final.stage === 'failed') {
+          throw new Error(final.error || 'Ingest failed');
+        }
+      }
       setUploadStatus('success');
       setUploadMessage('Dataset uploaded successfully!');
       onUploadSuccess?.();
@@ -31,14 +46,34 @@ export default function UploadZone({ onUploadSuccess }: UploadZoneProps) {
       setUploadStatus('error');
       setUploadMessage(error instanceof Error ? error.message : 'Upload failed');
     } finally {
+      unsubscribe();
       setUploading(false);
     }
   }, [onUploadSuccess]);
 
+  const progressLine = (p: UploadProgress) => {
+    const { counters, totals } = p;
+    switch (p.stage) {
+      case 'queued':
+        return p.queue_position ? `Queued (position ${p.queue_position})` : 'Queued...';
+      case 'extract':
+        return `Extracting ${counters.extracted}${totals.extracted ? ` / ${totals.extracted}` : ''} files`;
+      case 'parse':
+        return `Parsed ${counters.parsed} labels, placed ${counters.placed} images`;
+      case 'insert':
+        return `Writing ${counters.written}${totals.written ? ` / ${totals.written}` : ''} records`;
+      default:
+        return p.stage.charAt(0).toUpperCase() + p.stage.slice(1) + '...';
+    }
+  };
+
   const { getRootProps, getInputProps, isDragActive } = useDropzone({
     onDrop,
     accept: {
       'application/zip': ['.zip'],
+      'application/x-tar': ['.tar'],
+      'application/gzip': ['.tar.gz', '.tgz'],
+      'application/zstd': ['.tar.zst'],
     },
     maxFiles: 1,
     disabled: uploading,
@@ -74,13 +109,16 @@ export default function UploadZone({ onUploadSuccess }: UploadZoneProps) {
             <h3 className="text-lg font-medium text-gray-900">
               {uploading ? 'Uploading...' : 'Upload Dataset'}
             </h3>
+            {uploading && progress && (
+              <p className="text-sm text-blue-600 mt-1">{progressLine(progress)}</p>
+            )}
             <p className="text-gray-500 mt-1">
               {isDragActive
-                ? 'Drop the ZIP file here'
-                : 'Drag and drop a ZIP file here, or click to select'}
+                ? 'Drop the archive here'
+                : 'Drag and drop a ZIP or tar archive here, or click to select'}
             </p>
             <p className="text-sm text-gray-400 mt-2">
-              Supports ZIP files containing YOLO format datasets
+              Supports ZIP, .tar, .tar.gz and .tar.zst archives of YOLO or COCO datasets
             </p>
           </div>
         </div>
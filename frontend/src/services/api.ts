@@ -1,16 +1,37 @@
-import { Dataset, ImageData, UploadResponse } from '@/types/dataset';
+import {
+  ContactSheetMap, Dataset, ImageData, Split, SplitCounts, TilePyramid, UploadProgress, UploadResponse,
+} from '@/types/dataset';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://0.0.0.0:8000';
 
 export class DatasetAPI {
-  static async uploadDataset(file: File): Promise<UploadResponse> {
-    const formData = new FormData();
-    formData.append('file', file);
+  static async uploadDataset(file: File, uploadId?: string): Promise<UploadResponse> {
+    const params = new URLSearchParams();
+    if (uploadId) params.set('upload_id', uploadId);
 
-    const response = await fetch(`${API_BASE_URL}/datasets/upload`, {
-      method: 'POST',
-      body: formData,
-    });
+    let response: Response;
+    if (file.name.toLowerCase().endsWith('.zip')) {
+      const formData = new FormData();
+      formData.append('file', file);
+      const query = params.toString() ? `?${params}` : '';
+      response = await fetch(`${API_BASE_URL}/datasets/upload${query}`, {
+        method: 'POST',
+        body: formData,
+      });
+    } else {
+      // Tar archives go as the raw body so the server unpacks them while they upload
+      params.set('filename', file.name);
+      response = await fetch(`${API_BASE_URL}/datasets/upload/stream?${params}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/octet-stream' },
+        body: file,
+      });
+    }
+
+    if (response.status === 429) {
+      const retryAfter = response.headers.get('Retry-After');
+      throw new Error(`Server is busy ingesting other datasets${retryAfter ? `, retry in ${retryAfter}s` : ''}`);
+    }
 
     if (!response.ok) {
       throw new Error(`Upload failed: ${response.statusText}`);
@@ -19,6 +40,25 @@ export class DatasetAPI {
     return response.json();
   }
 
+  static subscribeToUploadProgress(
+    uploadId: string,
+    onProgress: (progress: UploadProgress) => void,
+    onFinished?: (progress: UploadProgress) => void,
+  ): () => void {
+    const source = new EventSource(`${API_BASE_URL}/datasets/uploads/${encodeURIComponent(uploadId)}/progress`);
+    const handle = (event: MessageEvent) => onProgress(JSON.parse(event.data));
+    source.addEventListener('progress', handle as EventListener);
+    ['done', 'failed'].forEach(name =>
+      source.addEventListener(name, ((event: MessageEvent) => {
+        const progress: UploadProgress = JSON.parse(event.data);
+        onProgress(progress);
+        onFinished?.(progress);
+        source.close();
+      }) as EventListener)
+    );
+    return () => source.close();
+  }
+
   static async getAllDatasets(): Promise<Dataset[]> {
     const response = await fetch(`${API_BASE_URL}/datasets/`);
     
@@ -28,13 +68,37 @@ export class DatasetAPI {
 
     return response.json();
   }
-    static async getPaginatedImages(datasetName: string, page: number): Promise<{
+  static async getDatasetsPage(params: {
+    limit?: number;
+    cursor?: string | null;
+    sort?: 'created_at' | 'name' | 'total_images';
+    order?: 'asc' | 'desc';
+    prefix?: string;
+  }): Promise<{ datasets: Dataset[]; nextCursor: string | null }> {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') query.set(key, String(value));
+    });
+
+    const response = await fetch(`${API_BASE_URL}/datasets/?${query}`);
+
+    if (!response.ok) {
+      throw new Error(`Failed to fetch datasets: ${response.statusText}`);
+    }
+
+    return { datasets: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+  }
+
+    static async getPaginatedImages(datasetName: string, page: number, split?: Split): Promise<{
         images: ImageData[];
         total_pages: number;
         total_images: number;
         current_page: number;
+        // Missing from pages stored before splits were counted
+        split_counts?: SplitCounts;
     }> {
-        const response = await fetch(`${API_BASE_URL}/datasets/${datasetName}/images?page=${page}`);
+        const splitParam = split ? `&split=${split}` : '';
+        const response = await fetch(`${API_BASE_URL}/datasets/${datasetName}/images?page=${page}${splitParam}`);
 
         if (!response.ok) {
         throw new Error(`Failed to fetch images: ${response.statusText}`);
@@ -53,7 +117,44 @@ export class DatasetAPI {
     return response.json();
   }
 
+  static async getContactSheetMap(datasetName: string, page: number, tile: number): Promise<ContactSheetMap> {
+    const response = await fetch(`${API_BASE_URL}/datasets/${datasetName}/images/sheet/map?page=${page}&tile=${tile}`);
+
+    if (!response.ok) {
+      throw new Error(`Failed to fetch contact sheet: ${response.statusText}`);
+    }
+
+    return response.json();
+  }
+
+  static getContactSheetUrl(datasetName: string, page: number, tile: number): string {
+    return `${API_BASE_URL}/datasets/${datasetName}/images/sheet?page=${page}&tile=${tile}`;
+  }
+
+  static getExportUrl(datasetName: string, format: 'coco' | 'voc', split?: Split): string {
+    const splitParam = split ? `&split=${split}` : '';
+    return `${API_BASE_URL}/datasets/${encodeURIComponent(datasetName)}/export?format=${format}${splitParam}`;
+  }
+
   static getImageUrl(datasetName: string, imageName: string): string {
     return `${API_BASE_URL}/datasets/${datasetName}/image/${imageName}`;
   }
+
+  // Large images have a tile pyramid; null means the original is small enough to load whole
+  static async getTilePyramid(datasetName: string, imageName: string): Promise<TilePyramid | null> {
+    const response = await fetch(`${API_BASE_URL}/datasets/${datasetName}/image/${imageName}/tiles`);
+
+    if (response.status === 404) {
+      return null;
+    }
+    if (!response.ok) {
+      throw new Error(`Failed to fetch tile pyramid: ${response.statusText}`);
+    }
+
+    return response.json();
+  }
+
+  static getTileUrl(datasetName: string, imageName: string, level: number, col: number, row: number): string {
+    return `${API_BASE_URL}/datasets/${datasetName}/image/${imageName}/tiles/${level}/${col}_${row}.jpg`;
+  }
 }
\ No newline at end of file
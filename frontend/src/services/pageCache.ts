@@ -0,0 +1,124 @@
+import { ContactSheetMap, ImageData } from '@/types/dataset';
+import { DatasetAPI } from '@/services/api';
+
+export interface GridPage {
+  images: ImageData[];
+  total_pages: number;
+  total_images: number;
+  current_page: number;
+  // Null when the dataset has no contact sheet for the page; tiles then load one image each
+  sheet: ContactSheetMap | null;
+}
+
+export const SHEET_TILE_SIZE = 256;
+
+// Pages kept across flips; the least recently viewed one is dropped beyond this
+const MAX_PAGES = 12;
+
+interface Entry {
+  promise: Promise<GridPage>;
+  value?: GridPage;
+}
+
+// Map iteration order is insertion order, so re-inserting on use keeps the first key the least recently used
+const pages = new Map<string, Entry>();
+const keyOf = (datasetName: string, page: number) => `${datasetName}\n${page}`;
+
+const remember = (key: string, entry: Entry) => {
+  pages.delete(key);
+  pages.set(key, entry);
+  while (pages.size > MAX_PAGES) {
+    pages.delete(pages.keys().next().value!);
+  }
+};
+
+/** A page already loaded, or undefined; lets revisits render without a loading state. */
+export const cachedPage = (datasetName: string, page: number): GridPage | undefined => {
+  const key = keyOf(datasetName, page);
+  const entry = pages.get(key);
+  if (entry?.value) remember(key, entry);
+  return entry?.value;
+};
+
+/** Load a page's JSON and contact sheet map once; concurrent callers share the request. */
+export const loadPage = (datasetName: string, page: number): Promise<GridPage> => {
+  const key = keyOf(datasetName, page);
+  const existing = pages.get(key);
+  if (existing) {
+    remember(key, existing);
+    return existing.promise;
+  }
+
+  const entry: Entry = {
+    // One contact sheet per page instead of a request per thumbnail; tiles fall back to single images without it
+    promise: Promise.all([
+      DatasetAPI.getPaginatedImages(datasetName, page),
+      DatasetAPI.getContactSheetMap(datasetName, page, SHEET_TILE_SIZE).catch(() => null),
+    ]).then(([res, sheet]) => {
+      entry.value = { ...res, sheet };
+      return entry.value;
+    }),
+  };
+  // Failed loads are not cached, so the next visit retries
+  entry.promise.catch(() => {
+    if (pages.get(key) === entry) pages.delete(key);
+  });
+  remember(key, entry);
+  return entry.promise;
+};
+
+// Warm the browser cache with a page's thumbnails: its contact sheet, or each image when it has none
+const preloadThumbnails = (datasetName: string, page: GridPage) => {
+  const urls = page.sheet
+    ? [DatasetAPI.getContactSheetUrl(datasetName, page.current_page, SHEET_TILE_SIZE)]
+    : page.images.map(image => DatasetAPI.getImageUrl(datasetName, image.image_name));
+  return Promise.all(urls.map(url => new Promise<void>(resolve => {
+    const img = new Image();
+    img.onload = img.onerror = () => resolve();
+    img.src = url;
+  })));
+};
+
+const whenIdle = (callback: () => void) => {
+  if (typeof window.requestIdleCallback === 'function') {
+    const handle = window.requestIdleCallback(callback, { timeout: 2000 });
+    return () => window.cancelIdleCallback(handle);
+  }
+  const handle = window.setTimeout(callback, 200);
+  return () => window.clearTimeout(handle);
+};
+
+/**
+ * Prefetch the neighbours of the page in view while the browser is idle.
+ *
+ * The next page goes first, then the previous one, one at a time, and only
+ * pages not cached yet are requested, so flipping through a dataset never
+ * has more than one prefetch in flight. Returns a function cancelling what
+ * has not started yet, for when the user moves on.
+ */
+export const prefetchAround = (datasetName: string, page: number, totalPages: number): (() => void) => {
+  const connection = (navigator as Navigator & { connection?: { saveData?: boolean } }).connection;
+  if (connection?.saveData) return () => {};
+
+  const neighbours = [page + 1, page - 1].filter(p => p >= 1 && p <= totalPages && !cachedPage(datasetName, p));
+  let cancelled = false;
+  let cancelIdle = () => {};
+
+  const next = () => {
+    const target = neighbours.shift();
+    if (target === undefined || cancelled) return;
+    cancelIdle = whenIdle(() => {
+      if (cancelled) return;
+      loadPage(datasetName, target)
+        .then(loaded => preloadThumbnails(datasetName, loaded))
+        .catch(() => undefined)
+        .then(next);
+    });
+  };
+  next();
+
+  return () => {
+    cancelled = true;
+    cancelIdle();
+  };
+};
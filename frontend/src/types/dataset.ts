@@ -8,6 +8,10 @@ export interface ImageData {
   labels: BoundingBox[];
 }
 
+export type Split = 'train' | 'valid' | 'test';
+
+export type SplitCounts = Record<Split, number>;
+
 export interface Dataset {
   _id: string;
   name: string;
@@ -19,4 +23,42 @@ export interface Dataset {
 
 export interface UploadResponse {
   message: string;
-} 
\ No newline at end of file
+  dataset?: string;
+  job_id?: string;
+}
+
+export interface UploadProgress {
+  upload_id: string;
+  stage: string;
+  counters: { extracted: number; parsed: number; placed: number; written: number };
+  totals: { extracted?: number; written?: number };
+  queue_position?: number;
+  error?: string;
+}
+
+export interface ContactSheetTile {
+  image_name: string;
+  x: number;
+  y: number;
+  width: number;
+  height: number;
+  missing: boolean;
+}
+
+export interface ContactSheetMap {
+  tile_size: number;
+  columns: number;
+  rows: number;
+  width: number;
+  height: number;
+  tiles: ContactSheetTile[];
+}
+
+export interface TilePyramid {
+  width: number;
+  height: number;
+  tile_size: number;
+  overlap: number;
+  format: string;
+  levels: number;
+}